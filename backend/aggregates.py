@@ -0,0 +1,121 @@
+"""
+Rollup counters behind /api/complaint-aggregates.
+
+Every complaint contributes +1 to a fixed set of counters derived from its
+current fields:
+
+    summary/total
+    summary/by_status/<status>        (also by_department, by_issue_type, by_priority)
+    daily/<YYYY-MM-DD>/total           daily/<YYYY-MM-DD>/by_status/<status>
+    weekly/<YYYY>-W<ww>/total          weekly/<YYYY>-W<ww>/by_status/<status>
+
+(trend buckets go by creation date, ISO weeks for weekly). Because the counters
+are a pure function of the records, a write only needs the difference between
+the counter sets of the old and new version of a record (count_deltas), which
+Firebase applies with server-side increments (increment_updates) so concurrent
+workers never overwrite each other. rollup() computes the same tree from
+scratch for the rebuild command.
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+GROUP_FIELDS = ('status', 'department', 'issue_type', 'priority')
+TREND_INTERVALS = ('daily', 'weekly')
+UNKNOWN = 'unknown'
+_KEY_TRANSLATION = str.maketrans({ch: '_' for ch in '.$#[]/'})
+
+
+def counter_key(value):
+    """A group value as a Firebase key."""
+    if value is None or value == '':
+        return UNKNOWN
+    return str(value).translate(_KEY_TRANSLATION)
+
+
+def created_day(created_at):
+    """Creation date of a complaint, or None if created_at does not parse."""
+    try:
+        return datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).date()
+    except ValueError:
+        return None
+
+
+def period_key(day, interval):
+    if interval == 'daily':
+        return day.isoformat()
+    year, week, _ = day.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def counter_paths(complaint):
+    """Counters a normalized complaint adds 1 to."""
+    status = counter_key(complaint.get('status'))
+    paths = ['summary/total']
+    paths.extend(f'summary/by_{field}/{counter_key(complaint.get(field))}' for field in GROUP_FIELDS)
+    day = created_day(complaint.get('created_at'))
+    if day is not None:
+        for interval in TREND_INTERVALS:
+            bucket = f'{interval}/{period_key(day, interval)}'
+            paths.append(f'{bucket}/total')
+            paths.append(f'{bucket}/by_status/{status}')
+    return paths
+
+
+def count_deltas(old, new, into=None):
+    """
+    Counter changes for one record going from `old` to `new` (either may be
+    None for a create/delete), added into `into` if given. Zero deltas are left out.
+    """
+    deltas = into if into is not None else Counter()
+    if old is not None:
+        for path in counter_paths(old):
+            deltas[path] -= 1
+    if new is not None:
+        for path in counter_paths(new):
+            deltas[path] += 1
+    for path in [path for path, delta in deltas.items() if delta == 0]:
+        del deltas[path]
+    return deltas
+
+
+def increment_updates(deltas):
+    """Multi-path update applying `deltas` with Firebase server-side increments."""
+    return {path: {'.sv': {'increment': delta}} for path, delta in deltas.items() if delta}
+
+
+def rollup(complaints):
+    """The full counter tree for `complaints`, in the layout of the stats node."""
+    tree = {}
+    for complaint in complaints:
+        for path in counter_paths(complaint):
+            node = tree
+            *parents, leaf = path.split('/')
+            for part in parents:
+                node = node.setdefault(part, {})
+            node[leaf] = node.get(leaf, 0) + 1
+    return tree
+
+
+def period_keys(interval, periods, today=None):
+    """Keys of the last `periods` daily or weekly buckets, oldest first."""
+    today = today or date.today()
+    if interval == 'weekly':
+        monday = today - timedelta(days=today.weekday())
+        days = [monday - timedelta(weeks=n) for n in range(periods - 1, -1, -1)]
+    else:
+        days = [today - timedelta(days=n) for n in range(periods - 1, -1, -1)]
+    return [period_key(day, interval) for day in days]
+
+
+def trend_series(buckets, keys):
+    """[{period, total, by_status}] for bucket `keys` in order, zero-filled."""
+    series = []
+    for key in keys:
+        bucket = buckets.get(key) or {}
+        series.append({
+            'period': key,
+            'total': bucket.get('total', 0),
+            'by_status': {status: count for status, count in (bucket.get('by_status') or {}).items() if count},
+        })
+    return series
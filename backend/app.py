@@ -1,23 +1,48 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, stream_with_context, send_file, send_from_directory
 from flask_cors import CORS
 import os
+import sys
 import base64
 import traceback
-import cv2
-import numpy as np
 from PIL import Image
 import io
-import requests
 import json
-import uuid
-import re
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+import bisect
+import itertools
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
 import google.generativeai as genai
 import firebase_admin
 from firebase_admin import credentials, db as firebase_db
 from dotenv import load_dotenv
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+
+# Make the repo-level `shared` package importable (mirrors hf-classifier/app.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from shared import metrics  # noqa: E402
+from shared.prediction_cache import PredictionCache, file_fingerprint  # noqa: E402
+from classifier_client import ClassifierClient  # noqa: E402
+from local_classifier import LocalClassifier  # noqa: E402
+from shared.preprocessing import INPUT_SIZE, open_image  # noqa: E402
+from spatial_index import GridSpatialIndex, HeatmapGrid  # noqa: E402
+from department_index import DepartmentQueueIndex  # noqa: E402
+from complaint_mirror import ComplaintMirror  # noqa: E402
+from geocoding import (  # noqa: E402
+    ADDRESS_NOT_FOUND, GeocodeCache, GeocodingUnavailable, ReverseGeocoder, TokenBucket, create_provider
+)
+from submission_pipeline import SubmissionPipeline  # noqa: E402
+from image_store import ImageStore, ImageTooLarge, UnsupportedImage  # noqa: E402
+from image_variants import USE_ORIGINAL, VARIANT_PRESETS, VariantCache  # noqa: E402
+from complaint_letter import render_complaint_letter  # noqa: E402
+from push_ids import generate_push_id  # noqa: E402
+from aggregates import GROUP_FIELDS, count_deltas, increment_updates, period_keys, trend_series  # noqa: E402
 
 load_dotenv()
 
@@ -57,6 +82,30 @@ def ensure_cors_headers(response):
 
     return response
 
+
+# Per-route latency, in-flight and error metrics (shared/metrics.py), labelled
+# with the route template. Finished in teardown so streamed responses and
+# unhandled exceptions are counted too.
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    g.metrics_started = metrics.request_started(request.method, g.metrics_route)
+
+
+@app.after_request
+def remember_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    status = 500 if exc is not None else g.get('metrics_status', 500)
+    metrics.request_finished(request.method, g.metrics_route, status, started)
+
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 
 # Firebase Admin configuration
@@ -120,9 +169,40 @@ def require_firebase():
         raise RuntimeError('Firebase Realtime Database is not configured. Set FIREBASE_SERVICE_ACCOUNT_* and FIREBASE_DATABASE_URL.')
 
 
+class TimedReference:
+    """
+    A firebase_admin Reference or Query whose network calls are timed as
+    firebase_<method> stages. References and queries it returns (child(),
+    push(), order_by_*(), ...) are wrapped as well; everything else passes
+    straight through.
+    """
+
+    TIMED_METHODS = ('get', 'set', 'push', 'update', 'delete', 'transaction')
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        stage = f'firebase_{name}' if name in self.TIMED_METHODS else None
+
+        def call(*args, **kwargs):
+            if stage is None:
+                result = attr(*args, **kwargs)
+            else:
+                with metrics.stage(stage):
+                    result = attr(*args, **kwargs)
+            if isinstance(result, (firebase_db.Reference, firebase_db.Query)):
+                return TimedReference(result)
+            return result
+        return call
+
+
 def get_db_reference(path=''):
     require_firebase()
-    return firebase_db.reference(path, app=firebase_app)
+    return TimedReference(firebase_db.reference(path, app=firebase_app))
 
 
 def get_complaints_snapshot():
@@ -133,7 +213,26 @@ def get_complaints_snapshot():
     return snapshot
 
 
+# Compact storage layout: one key per field. Older records also carry the
+# alias of some fields and the rendered letter (formal_complaint and
+# formalComplaint); normalize_complaint reads both layouts and
+# migrate_compact_schema.py rewrites old records. The submitter stays under
+# `userId` because the web app queries complaints with orderByChild('userId').
+COMPLAINT_FIELD_ALIASES = {
+    # alias -> canonical key
+    'user_id': 'userId',
+    'issueType': 'issue_type',
+    'imagePath': 'image_path',
+    'formalComplaint': 'formal_complaint',
+}
+
+
 def normalize_complaint(complaint_id, payload):
+    """
+    API representation of a stored complaint (old or compact layout).
+    `formal_complaint` is only set for records that still store their letter;
+    see complaint_letter_for().
+    """
     payload = payload or {}
 
     def to_float(value):
@@ -163,13 +262,38 @@ def normalize_complaint(complaint_id, payload):
         'formal_complaint': payload.get('formal_complaint') or payload.get('formalComplaint'),
         'image_path': payload.get('image_path') or payload.get('imagePath'),
         'created_at': created_at,
-        'updated_at': updated_at
+        'updated_at': updated_at,
+        'processing': payload.get('processing')
     }
 
     return normalized
 
 
+# In-memory mirror of `complaints`, fed by a Firebase listen() stream. Reads are
+# served from it once the initial sync has arrived; until then (or when it is
+# disabled) they fall back to a full ref.get().
+COMPLAINT_MIRROR_ENABLED = os.getenv('COMPLAINT_MIRROR_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+complaint_mirror = ComplaintMirror(
+    lambda: get_db_reference('complaints'),
+    normalize_complaint,
+    resync_interval=float(os.getenv('COMPLAINT_MIRROR_RESYNC_INTERVAL', '900')),
+    check_interval=float(os.getenv('COMPLAINT_MIRROR_CHECK_INTERVAL', '5'))
+)
+
+
+def get_complaint_mirror():
+    """The mirror if it is enabled and synced, else None."""
+    if not COMPLAINT_MIRROR_ENABLED or not firebase_ready:
+        return None
+    complaint_mirror.ensure_started()
+    return complaint_mirror if complaint_mirror.ready else None
+
+
 def fetch_all_complaints():
+    """All normalized complaints. The mirror's list is shared: do not mutate it."""
+    mirror = get_complaint_mirror()
+    if mirror is not None:
+        return mirror.complaints()
     snapshot = get_complaints_snapshot()
     complaints = []
     for complaint_id, payload in snapshot.items():
@@ -177,8 +301,37 @@ def fetch_all_complaints():
     return complaints
 
 
+def iter_complaint_pages(batch_size, after=None):
+    """
+    Raw complaints as lists of (id, payload) in key order, starting after
+    `after`: one order_by_key + limit query per page, so maintenance scripts
+    never hold the whole tree.
+    """
+    while True:
+        query = get_db_reference('complaints').order_by_key()
+        if after is not None:
+            query = query.start_at(after)
+        snapshot = query.limit_to_first(batch_size + 1).get() or {}
+        page = [(key, snapshot[key]) for key in sorted(snapshot) if key != after][:batch_size]
+        if not page:
+            return
+        yield page
+        after = page[-1][0]
+
+
+def is_valid_complaint_id(complaint_id):
+    """Usable as a single Firebase key (no path separators or reserved characters)."""
+    return isinstance(complaint_id, str) and bool(complaint_id) and not any(ch in complaint_id for ch in './#$[]')
+
+
 def get_complaint_or_404(complaint_id):
     ref = get_db_reference(f'complaints/{complaint_id}')
+    mirror = get_complaint_mirror()
+    if mirror is not None:
+        complaint = mirror.get(complaint_id)
+        if complaint is not None:
+            return complaint, ref
+    # Not mirrored (yet): a complaint written moments ago may still be in flight
     payload = ref.get()
     if not payload:
         raise ValueError('Complaint not found')
@@ -188,7 +341,208 @@ def get_complaint_or_404(complaint_id):
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 HF_CLASSIFIER_URL = os.getenv('HF_CLASSIFIER_URL', 'https://kartik9737-naagriknivedan.hf.space/predict')
 HF_CLASSIFIER_TOKEN = os.getenv('HF_CLASSIFIER_TOKEN')
-HF_CLASSIFIER_TIMEOUT = int(os.getenv('HF_CLASSIFIER_TIMEOUT', '60'))
+# HF_CLASSIFIER_TIMEOUT is the legacy single timeout; it now only sets the read timeout
+HF_CLASSIFIER_CONNECT_TIMEOUT = float(os.getenv('HF_CLASSIFIER_CONNECT_TIMEOUT', '3.05'))
+HF_CLASSIFIER_READ_TIMEOUT = float(os.getenv('HF_CLASSIFIER_READ_TIMEOUT', os.getenv('HF_CLASSIFIER_TIMEOUT', '15')))
+HF_CLASSIFIER_MAX_RETRIES = int(os.getenv('HF_CLASSIFIER_MAX_RETRIES', '2'))
+HF_CLASSIFIER_POOL_SIZE = int(os.getenv('HF_CLASSIFIER_POOL_SIZE', '10'))
+HF_CLASSIFIER_BREAKER_THRESHOLD = int(os.getenv('HF_CLASSIFIER_BREAKER_THRESHOLD', '5'))
+HF_CLASSIFIER_BREAKER_RESET = float(os.getenv('HF_CLASSIFIER_BREAKER_RESET', '30'))
+# Binary variant of the classifier endpoint (raw image bytes instead of base64 JSON)
+HF_CLASSIFIER_UPLOAD_URL = os.getenv('HF_CLASSIFIER_UPLOAD_URL') or (
+    HF_CLASSIFIER_URL.rstrip('/') + '/upload' if HF_CLASSIFIER_URL else None
+)
+
+classifier_client = ClassifierClient(
+    HF_CLASSIFIER_URL,
+    upload_url=HF_CLASSIFIER_UPLOAD_URL,
+    token=HF_CLASSIFIER_TOKEN,
+    connect_timeout=HF_CLASSIFIER_CONNECT_TIMEOUT,
+    read_timeout=HF_CLASSIFIER_READ_TIMEOUT,
+    max_retries=HF_CLASSIFIER_MAX_RETRIES,
+    pool_size=HF_CLASSIFIER_POOL_SIZE,
+    failure_threshold=HF_CLASSIFIER_BREAKER_THRESHOLD,
+    reset_timeout=HF_CLASSIFIER_BREAKER_RESET
+)
+
+# Where /api/classify-issue runs the model:
+#   remote - HF classifier Space over HTTP (default)
+#   local  - in-process IssueClassifier, loaded once per worker
+#   auto   - try the sources in CLASSIFIER_AUTO_ORDER until one succeeds
+CLASSIFIER_MODE = os.getenv('CLASSIFIER_MODE', 'remote').lower()
+if CLASSIFIER_MODE not in ('remote', 'local', 'auto'):
+    raise ValueError(f"CLASSIFIER_MODE must be remote, local or auto, got {CLASSIFIER_MODE!r}")
+CLASSIFIER_AUTO_ORDER = [
+    source.strip() for source in os.getenv('CLASSIFIER_AUTO_ORDER', 'local,remote').split(',') if source.strip()
+]
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH') or os.getenv(
+    'MODEL_PATH', os.path.join(PROJECT_ROOT, 'model', 'best_urban_mobilenet.pth')
+)
+
+local_classifier = LocalClassifier(
+    LOCAL_MODEL_PATH,
+    num_classes=int(os.getenv('MODEL_NUM_CLASSES', '6')),
+    backend=os.getenv('MODEL_BACKEND', 'torch').lower(),
+    quantization=os.getenv('MODEL_QUANTIZATION', 'none').lower()
+)
+
+# Cache of classifier results keyed by image hash (0 disables). Bump
+# HF_CLASSIFIER_MODEL_VERSION when the Space's weights change.
+CLASSIFY_CACHE_SIZE = int(os.getenv('CLASSIFY_CACHE_SIZE', '512'))
+CLASSIFY_CACHE_TTL = float(os.getenv('CLASSIFY_CACHE_TTL', '3600'))
+HF_CLASSIFIER_MODEL_VERSION = os.getenv('HF_CLASSIFIER_MODEL_VERSION', '')
+
+
+def classifier_identity():
+    # Remote results are scoped to the Space URL/version, local ones to the weights file
+    local = file_fingerprint(LOCAL_MODEL_PATH) if CLASSIFIER_MODE != 'remote' else ''
+    return f"{CLASSIFIER_MODE}|{HF_CLASSIFIER_URL}|{HF_CLASSIFIER_MODEL_VERSION}|{local}"
+
+
+classify_cache = (
+    PredictionCache(
+        max_entries=CLASSIFY_CACHE_SIZE,
+        ttl_seconds=CLASSIFY_CACHE_TTL,
+        identity=classifier_identity
+    )
+    if CLASSIFY_CACHE_SIZE > 0 else None
+)
+
+# Images whose longer edge exceeds this are downscaled to the model's 224x224
+# input and re-encoded once before they are forwarded to the classifier
+CLASSIFY_DOWNSCALE_ABOVE = int(os.getenv('CLASSIFY_DOWNSCALE_ABOVE', '320'))
+CLASSIFY_JPEG_QUALITY = int(os.getenv('CLASSIFY_JPEG_QUALITY', '90'))
+
+# Multipart / raw image uploads
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+# The photo plus the complaint's form fields
+UPLOAD_MAX_FORM_PARTS = 32
+
+# Complaint photos: uploads/<aa>/<bb>/<sha256>.<ext>, served as immutable
+image_store = ImageStore(
+    os.path.join(backend_dir, 'uploads'),
+    max_bytes=MAX_UPLOAD_BYTES,
+    chunk_size=UPLOAD_CHUNK_SIZE
+)
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600
+
+# Resized variants for /api/image/<path>?w=<px> or ?size=thumb|small|medium|large
+image_variants = VariantCache(
+    os.getenv('IMAGE_VARIANT_CACHE_DIR', os.path.join(backend_dir, 'variant_cache')),
+    widths=[int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '160,320,640,1280').split(',') if w.strip()],
+    max_bytes=int(os.getenv('IMAGE_VARIANT_CACHE_MAX_BYTES', str(512 * 1024 * 1024))),
+    workers=int(os.getenv('IMAGE_VARIANT_WORKERS', '2')),
+    max_pending=int(os.getenv('IMAGE_VARIANT_MAX_PENDING', '32'))
+)
+# Variants (preset names or widths) generated in the background at submit time
+IMAGE_VARIANT_PREGENERATE = [
+    image_variants.resolve_width(preset=v) if v in VARIANT_PRESETS else image_variants.resolve_width(int(v))
+    for v in (v.strip() for v in os.getenv('IMAGE_VARIANT_PREGENERATE', '').split(',')) if v
+]
+
+# Grid indexes behind /api/complaints-map and /api/heatmap-data, and the
+# department queues behind /api/department/<name>/queue. Writes from
+# this worker are applied immediately; the full tree is re-read at most every
+# SPATIAL_INDEX_MAX_AGE seconds to pick up writes made by other workers or the
+# frontend.
+SPATIAL_INDEX_CELL_DEG = float(os.getenv('SPATIAL_INDEX_CELL_DEG', '0.01'))
+SPATIAL_INDEX_MAX_AGE = float(os.getenv('SPATIAL_INDEX_MAX_AGE', '60'))
+HEATMAP_CELL_DEG = float(os.getenv('HEATMAP_CELL_DEG', '0.001'))  # ~100m clusters
+spatial_index = GridSpatialIndex(cell_size_deg=SPATIAL_INDEX_CELL_DEG)
+heatmap_grid = HeatmapGrid(cell_size_deg=HEATMAP_CELL_DEG)
+department_queues = DepartmentQueueIndex()
+# Statuses left out of a department queue unless asked for (?status=)
+DEPARTMENT_QUEUE_CLOSED_STATUSES = [
+    s.strip() for s in os.getenv('DEPARTMENT_QUEUE_CLOSED_STATUSES', 'resolved,rejected').split(',') if s.strip()
+]
+DEPARTMENT_QUEUE_DEFAULT_LIMIT = int(os.getenv('DEPARTMENT_QUEUE_DEFAULT_LIMIT', '50'))
+DEPARTMENT_QUEUE_MAX_LIMIT = int(os.getenv('DEPARTMENT_QUEUE_MAX_LIMIT', '500'))
+
+
+def ensure_complaint_indexes():
+    if get_complaint_mirror() is not None:
+        return  # kept current by on_mirror_change
+    if (spatial_index.is_stale(SPATIAL_INDEX_MAX_AGE) or heatmap_grid.is_stale(SPATIAL_INDEX_MAX_AGE)
+            or department_queues.is_stale(SPATIAL_INDEX_MAX_AGE)):
+        complaints = fetch_all_complaints()
+        spatial_index.rebuild(complaints)
+        heatmap_grid.rebuild(complaints)
+        department_queues.rebuild(complaints)
+
+
+def index_complaint(complaint):
+    spatial_index.upsert(complaint)
+    heatmap_grid.upsert(complaint)
+    department_queues.upsert(complaint)
+
+
+def on_mirror_change(changed_ids, full):
+    if full:
+        complaints = complaint_mirror.complaints()
+        spatial_index.rebuild(complaints)
+        heatmap_grid.rebuild(complaints)
+        department_queues.rebuild(complaints)
+        return
+    for complaint_id in changed_ids:
+        complaint = complaint_mirror.get(complaint_id)
+        if complaint is None:
+            spatial_index.remove(complaint_id)
+            heatmap_grid.remove(complaint_id)
+            department_queues.remove(complaint_id)
+        else:
+            index_complaint(complaint)
+
+
+complaint_mirror.add_listener(on_mirror_change)
+
+# Dashboard rollups (aggregates.py) under their own node, adjusted with
+# server-side increments by every backend write path. Writes the web app makes
+# straight to Firebase bypass them; rebuild_aggregates.py recomputes the node.
+AGGREGATES_PATH = 'complaint_stats'
+AGGREGATES_MAX_PERIODS = int(os.getenv('AGGREGATES_MAX_PERIODS', '366'))
+
+
+def record_aggregates(deltas):
+    """Apply counter deltas. A failure is only logged: the rebuild command repairs drift."""
+    if not deltas:
+        return
+    try:
+        get_db_reference(AGGREGATES_PATH).update(increment_updates(deltas))
+    except Exception as exc:
+        print(f"[WARN] Could not update complaint aggregates: {exc}")
+
+# Reverse geocoding: one shared provider client, an LRU + SQLite cache keyed on
+# coordinates rounded to GEOCODE_PRECISION decimals, and a token bucket (the
+# public Nominatim allows 1 request/s; the bucket is per worker process)
+GEOCODER_PROVIDER = os.getenv('GEOCODER_PROVIDER', 'nominatim').lower()
+GEOCODE_PRECISION = int(os.getenv('GEOCODE_PRECISION', '4'))
+GEOCODE_CACHE_PATH = os.getenv('GEOCODE_CACHE_PATH', os.path.join(backend_dir, 'geocode_cache.sqlite3'))
+GEOCODE_RATE = float(os.getenv('GEOCODE_RATE', '1'))
+GEOCODE_BURST = int(os.getenv('GEOCODE_BURST', '1'))
+GEOCODE_WAIT_TIMEOUT = float(os.getenv('GEOCODE_WAIT_TIMEOUT', '5'))
+
+if GEOCODER_PROVIDER == 'nominatim':
+    geocoding_provider = create_provider(
+        'nominatim',
+        user_agent=os.getenv('NOMINATIM_USER_AGENT', 'civic_issue_app/1.0 (contact: support@example.com)'),
+        timeout=float(os.getenv('NOMINATIM_TIMEOUT', '5')),
+        domain=os.getenv('NOMINATIM_DOMAIN')
+    )
+else:
+    geocoding_provider = create_provider(GEOCODER_PROVIDER, precision=GEOCODE_PRECISION)
+
+reverse_geocoder = ReverseGeocoder(
+    geocoding_provider,
+    cache=GeocodeCache(
+        GEOCODE_CACHE_PATH or None,
+        max_entries=int(os.getenv('GEOCODE_CACHE_SIZE', '4096'))
+    ),
+    limiter=TokenBucket(GEOCODE_RATE, GEOCODE_BURST) if GEOCODE_RATE > 0 else None,
+    precision=GEOCODE_PRECISION,
+    wait_timeout=GEOCODE_WAIT_TIMEOUT
+)
 
 # Initialize AI services
 if GEMINI_API_KEY:
@@ -203,11 +557,24 @@ def root():
         'endpoints': {
             'health': '/health',
             'classify_issue': 'POST /api/classify-issue',
+            'classify_issue_upload': 'POST /api/classify-issue/upload',
+            'classifier_stats': 'GET /api/classifier-stats',
+            'mirror_stats': 'GET /api/mirror-stats',
+            'geocoder_stats': 'GET /api/geocoder-stats',
+            'submission_stats': 'GET /api/submission-stats',
+            'image_stats': 'GET /api/image-stats',
             'submit_complaint': 'POST /api/submit-complaint',
+            'submit_complaint_upload': 'POST /api/submit-complaint/upload',
+            'submit_complaint_bulk': 'POST /api/submit-complaint/bulk',
             'track_complaint': 'GET /api/track-complaint/<id>',
+            'complaint_letter': 'GET /api/complaint/<id>/letter[?format=text]',
             'complaints_map': 'GET /api/complaints-map?lat=<>&lon=<>',
-            'heatmap_data': 'GET /api/heatmap-data',
-            'all_complaints': 'GET /api/all-complaints'
+            'heatmap_data': 'GET /api/heatmap-data[?summary=true]',
+            'complaint_aggregates': 'GET /api/complaint-aggregates[?trend=daily|weekly|none&periods=<n>]',
+            'department_queue': 'GET /api/department/<name>/queue[?status=<s,...>|all&limit=<n>]',
+            'all_complaints': 'GET /api/all-complaints?limit=&cursor=&status=&fields=&format=json|ndjson',
+            'bulk_update_status': 'PATCH /api/complaints/bulk-update-status',
+            'metrics': 'GET /metrics'
         }
     })
 
@@ -222,54 +589,44 @@ def api_root():
 def health():
     return jsonify({'status': 'ok'})
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request and stage metrics in the Prometheus text format."""
+    body, content_type = metrics.render()
+    return app.response_class(body, content_type=content_type)
+
+@app.route('/api/mirror-stats', methods=['GET'])
+def mirror_stats():
+    return jsonify({
+        'enabled': COMPLAINT_MIRROR_ENABLED,
+        'mirror': complaint_mirror.stats()
+    })
+
+@app.route('/api/image-stats', methods=['GET'])
+def image_stats():
+    return jsonify({'variants': image_variants.stats()})
+
+@app.route('/api/submission-stats', methods=['GET'])
+def submission_stats():
+    return jsonify(submission_pipeline.stats())
+
+@app.route('/api/geocoder-stats', methods=['GET'])
+def geocoder_stats():
+    return jsonify(reverse_geocoder.stats())
+
+@app.route('/api/classifier-stats', methods=['GET'])
+def classifier_stats():
+    return jsonify({
+        'mode': CLASSIFIER_MODE,
+        'local': local_classifier.status(),
+        'client': classifier_client.stats(),
+        'cache': classify_cache.stats() if classify_cache is not None else None
+    })
+
 # Utility Functions
 def get_address_from_coords(lat, lon):
-    try:
-        geolocator = Nominatim(user_agent="civic_issue_app/1.0 (contact: support@example.com)")
-        # Request detailed address with higher zoom for POI-level names
-        location = geolocator.reverse(
-            (lat, lon),
-            exactly_one=True,
-            addressdetails=True,
-            zoom=18,
-            language='en'
-        )
-        if not location:
-            return "Address not found"
-        # Prefer a friendly place name if available
-        addr = location.raw.get('address', {}) if hasattr(location, 'raw') else {}
-        parts = []
-        for key in ['name', 'amenity', 'building', 'shop', 'poi']:
-            val = addr.get(key)
-            if val:
-                parts.append(val)
-                break
-        # Road / house no
-        road_bits = []
-        if addr.get('house_number'):
-            road_bits.append(addr.get('house_number'))
-        if addr.get('road'):
-            road_bits.append(addr.get('road'))
-        if road_bits:
-            parts.append(' '.join(road_bits))
-        # Area / city
-        for key in ['neighbourhood', 'suburb', 'city_district', 'city', 'town', 'village']:
-            val = addr.get(key)
-            if val:
-                parts.append(val)
-                break
-        # State / postcode / country
-        if addr.get('state'):
-            parts.append(addr.get('state'))
-        if addr.get('postcode'):
-            parts.append(addr.get('postcode'))
-        if addr.get('country'):
-            parts.append(addr.get('country'))
-        friendly = ', '.join([p for p in parts if p])
-        return friendly or (location.address if hasattr(location, 'address') else "Address not found")
-    except Exception as e:
-        print(f"Reverse geocoding error: {e}")
-        return "Address not found"
+    """Address or "Address not found"; raises GeocodingUnavailable if the lookup could not be made."""
+    return reverse_geocoder.lookup(lat, lon)
 
 def get_department_for_issue(issue_type):
     """Assign department based on issue type"""
@@ -320,10 +677,11 @@ def get_department_for_issue(issue_type):
     }
     return department_mapping.get(issue_type, 'Public Works')  # Always return a valid department
 
-def generate_formal_complaint(issue_type, description, location, latitude=None, longitude=None, priority='normal', department=None, user_id='anonymous'):
+def generate_formal_complaint(issue_type, description, location, latitude=None, longitude=None, priority='normal', department=None, user_id='anonymous', date=None):
     """
     Generate a professional, formal complaint letter with actual details.
-    Uses 100% template-based approach - NO placeholders, all actual data.
+    Uses 100% template-based approach - NO placeholders, all actual data
+    (see complaint_letter.py for the template and address parsing).
     
     Args:
         issue_type: Type of issue (e.g., 'potholes')
@@ -334,251 +692,307 @@ def generate_formal_complaint(issue_type, description, location, latitude=None,
         priority: Priority level (low, normal, high, urgent)
         department: Assigned department name
         user_id: User identifier
+        date: Date printed on the letter (defaults to today)
     
     Returns:
         str: Complete complaint letter with no placeholders
     """
-    
-    # Format issue type for display
-    issue_type_display = issue_type.replace('_', ' ').title()
-    
-    # Extract city and state from location if available
-    # Format: "Jajmau, Kanpur, Kanpur Nagar, Uttar Pradesh, 208015, India"
-    location_parts = [part.strip() for part in location.split(',')] if location else []
-    
-    # Try to extract city and state from location parts
-    city = "Kanpur"  # Default
-    state = "Uttar Pradesh"  # Default
-    
-    if len(location_parts) >= 4:
-        # Usually format: Area, City, District, State, Pincode, Country
-        for i, part in enumerate(location_parts):
-            # Check for common state names in India
-            state_names = ['Uttar Pradesh', 'Maharashtra', 'Karnataka', 'Gujarat', 'Rajasthan', 'Punjab', 
-                          'West Bengal', 'Tamil Nadu', 'Andhra Pradesh', 'Madhya Pradesh', 'Bihar', 'Odisha', 
-                          'Assam', 'Haryana', 'Kerala', 'Jharkhand', 'Chhattisgarh', 'Delhi', 
-                          'Himachal Pradesh', 'Uttarakhand', 'Goa', 'Manipur', 'Meghalaya', 'Mizoram', 
-                          'Nagaland', 'Sikkim', 'Tripura', 'Arunachal Pradesh', 'Telangana']
-            if any(state_name in part for state_name in state_names):
-                state = part
-                # City is usually the part before state
-                if i > 0:
-                    city = location_parts[i-1]
-                break
-    
-    # Fallback: use index-based extraction
-    if city == "Kanpur" and len(location_parts) >= 2:
-        # Try to find city (usually second to last before pincode)
-        for i, part in enumerate(location_parts):
-            if part.lower() in ['kanpur', 'delhi', 'mumbai', 'bangalore', 'chennai', 'kolkata', 'hyderabad', 'pune', 'ahmedabad']:
-                city = part
-                break
-        if city == "Kanpur" and len(location_parts) >= 2:
-            city = location_parts[-3] if len(location_parts) >= 3 else location_parts[-2]
-    
-    if state == "Uttar Pradesh" and len(location_parts) >= 2:
-        # Skip pincode and country, get state
-        for part in reversed(location_parts):
-            if not part.isdigit() and part.lower() not in ['india', 'indian']:
-                if any(s in part for s in ['Pradesh', 'Bengal', 'Nadu', 'Kerala', 'Gujarat', 'Rajasthan']):
-                    state = part
-                    break
-    
-    # Format coordinates
-    coordinates_text = ""
-    if latitude and longitude:
-        coordinates_text = f"Latitude: {latitude:.6f}° N\nLongitude: {longitude:.6f}° E"
-    
-    # Priority mapping
-    priority_map = {
-        'low': 'Low',
-        'normal': 'Normal',
-        'high': 'High',
-        'urgent': 'Urgent'
-    }
-    priority_display = priority_map.get(priority, 'Normal')
-    
-    # Department name
-    dept_name = department or get_department_for_issue(issue_type)
-    
-    # Current date
-    current_date = datetime.now().strftime('%B %d, %Y')
-    
-    # Build description text
-    if description:
-        description_text = description
-    else:
-        # Generate default description based on issue type
-        issue_descriptions = {
-            'potholes': f'The road surface in {location} has multiple potholes that are causing significant disruption to traffic flow and posing safety risks to vehicles and pedestrians.',
-            'damaged_signs': f'Traffic signs or road signs in {location} are damaged, missing, or illegible, which poses safety risks to motorists and pedestrians.',
-            'fallen_trees': f'Fallen trees or tree branches in {location} are blocking roads or pathways, creating obstacles and potential safety hazards.',
-            'garbage': f'Garbage and waste accumulation in {location} is causing health and environmental concerns, requiring immediate cleanup and waste management.',
-            'graffiti': f'Unauthorized graffiti and vandalism in {location} is affecting the aesthetic appearance of public spaces and may indicate security concerns.',
-            'illegal_parking': f'Illegal parking in {location} is obstructing traffic flow and creating safety hazards for vehicles and pedestrians.',
-            'street_light': f'Street lights in {location} are not functioning properly, creating safety concerns especially during nighttime hours.',
-            'water_leak': f'Water leaks in {location} are causing water wastage and potential damage to infrastructure and surrounding areas.',
-            'traffic_signal': f'Traffic signals in {location} are malfunctioning or not working, creating traffic congestion and safety risks.',
-            'sidewalk_damage': f'Sidewalk damage in {location} is creating hazards for pedestrians and requires immediate repair.',
-            'drainage': f'Drainage issues in {location} are causing water accumulation and potential flooding risks.',
-        }
-        description_text = issue_descriptions.get(issue_type, f'Civic infrastructure issue of type {issue_type_display.lower()} has been identified in {location} and requires immediate attention to ensure public safety.')
-    
-    # Build complaint letter using template (NO placeholders - all actual data)
-    complaint_letter = f"""Nagrik Nivedan Platform
-Complaint Reference: {user_id}
+    with metrics.stage('letter_render'):
+        return render_complaint_letter(
+            issue_type, description, location,
+            latitude=latitude,
+            longitude=longitude,
+            priority=priority,
+            department=department or get_department_for_issue(issue_type),
+            user_id=user_id,
+            now=date
+        )
 
-{current_date}
 
-To,
-The Municipal Commissioner,
-{city} Municipal Corporation,
-{city}, {state}, India.
+# Letters are rendered on demand from the stored record (compact layout) and
+# memoized on their inputs, so an edit to the record yields a fresh letter
+LETTER_CACHE_SIZE = int(os.getenv('LETTER_CACHE_SIZE', '1024'))
 
-**Subject: Formal Complaint Regarding {issue_type_display} Issue in {location}**
 
-Dear Sir/Madam,
+@lru_cache(maxsize=LETTER_CACHE_SIZE)
+def render_letter_cached(*inputs):
+    return generate_formal_complaint(*inputs)
 
-This letter serves as a formal complaint regarding a {issue_type_display.lower()} issue that has been identified in {location} and requires immediate attention.
 
-**COMPLAINT DETAILS:**
+def letter_date(created_at):
+    """Submission date of a record (the date its letter carries), or today."""
+    try:
+        return datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).date()
+    except ValueError:
+        return datetime.now().date()
+
+
+def letter_inputs(complaint):
+    """generate_formal_complaint() arguments for a normalized complaint, in order."""
+    return (
+        complaint['issue_type'],
+        complaint['description'],
+        complaint['address'] or "Location not provided",
+        complaint['latitude'],
+        complaint['longitude'],
+        complaint['priority'],
+        complaint['department'],
+        complaint['user_id'] or 'anonymous',
+        letter_date(complaint['created_at'])
+    )
+
+
+def complaint_letter_for(complaint):
+    """The letter stored with an older record, or one rendered from its fields."""
+    if complaint.get('formal_complaint'):
+        return complaint['formal_complaint']
+    inputs = letter_inputs(complaint)
+    try:
+        return render_letter_cached(*inputs)
+    except TypeError:
+        # Unhashable input (e.g. a non-string description): render uncached
+        return generate_formal_complaint(*inputs)
 
-**Issue Type:** {issue_type_display} (AI-Identified)
-**Priority:** {priority_display} Priority
-**Location:** {location}
-{f'**Coordinates:**\n{coordinates_text}' if coordinates_text else ''}
-**Date:** {current_date}
-**Assigned Department:** {dept_name}
-**Complaint ID:** {user_id}
 
-**DESCRIPTION:**
+def call_hf_classifier(image_payload):
+    """
+    Forward a base64 image payload to the Hugging Face classifier Space.
+    """
+    with metrics.stage('hf_classifier'):
+        return classifier_client.predict_base64(image_payload)
+
 
-{description_text}
+def call_hf_classifier_bytes(image_bytes, content_type='application/octet-stream'):
+    """
+    Forward raw image bytes to the classifier's binary /predict/upload endpoint.
+    Falls back to the base64 JSON endpoint if the Space does not expose it yet.
+    """
+    with metrics.stage('hf_classifier'):
+        return classifier_client.predict_bytes(image_bytes, content_type)
 
-**LOCATION DETAILS:**
 
-- **Full Address:** {location}
-{f'- **GPS Coordinates:** {coordinates_text}' if coordinates_text else ''}
-{f'- **Captured from user\'s device GPS**' if coordinates_text else ''}
+def run_classifier(image_bytes, content_type='application/octet-stream'):
+    """Classify raw image bytes with the source(s) selected by CLASSIFIER_MODE."""
+    if CLASSIFIER_MODE == 'remote':
+        return call_hf_classifier_bytes(image_bytes, content_type)
+    if CLASSIFIER_MODE == 'local':
+        return local_classifier.classify(image_bytes)
 
-**URGENCY ASSESSMENT:**
+    errors = []
+    for source in CLASSIFIER_AUTO_ORDER:
+        try:
+            if source == 'local':
+                return local_classifier.classify(image_bytes)
+            if source == 'remote':
+                return call_hf_classifier_bytes(image_bytes, content_type)
+            errors.append(f'unknown classifier source {source!r}')
+        except Exception as exc:
+            print(f"[WARN] {source} classifier failed, trying next: {exc}")
+            errors.append(f'{source}: {exc}')
+    raise RuntimeError('All classifier sources failed: ' + ' | '.join(errors))
+
+
+def classify_image_bytes(image_bytes, content_type='application/octet-stream', image=None):
+    """
+    Classify raw image bytes, answering repeated photos from classify_cache.
+    The cache is keyed on the original bytes; only misses pay for the
+    downscale/re-encode in prepare_for_classifier().
+    """
+    def compute():
+        header = image if image is not None else inspect_image(image_bytes, content_type)
+        return run_classifier(*prepare_for_classifier(image_bytes, header, content_type))
 
-We consider this issue to be of **{priority_display.lower()} priority**. The condition of the {issue_type_display.lower()} in {location} requires attention to ensure public safety and maintain service standards. {'Given the ' + priority_display.lower() + ' priority level, we request immediate action to address this matter.' if priority in ['high', 'urgent'] else 'Prompt action is necessary to prevent further deterioration and ensure the safety of residents and commuters.'}
+    if classify_cache is None:
+        return compute()
+    return classify_cache.get_or_compute(image_bytes, compute)
 
-**POTENTIAL SAFETY CONCERNS:**
 
-The presence of this {issue_type_display.lower()} issue presents several potential safety concerns, including:
-- Increased risk of accidents, particularly for vehicles and pedestrians
-- Potential damage to vehicles and infrastructure
-- Disruption to traffic flow and public safety
-- Risk of injury to residents and commuters
+class UploadTooLarge(Exception):
+    pass
 
-**REQUEST FOR IMMEDIATE ACTION:**
 
-We respectfully request that the {dept_name} take immediate action to address this critical issue. Specifically, we request the following:
+class LimitedStream:
+    """Read-through wrapper raising UploadTooLarge once more than `limit` bytes were read."""
 
-1. **Immediate Inspection:** Conduct a thorough inspection of the location in {location} to assess the extent of the {issue_type_display.lower()} issue.
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.consumed = 0
 
-2. **Assessment and Remediation:** Implement appropriate measures to resolve the {issue_type_display.lower()} issue and restore the area to a safe and usable condition.
+    def read(self, size=-1):
+        remaining = self.limit - self.consumed + 1
+        chunk = self.stream.read(remaining if size is None or size < 0 else min(size, remaining))
+        self.consumed += len(chunk)
+        if self.consumed > self.limit:
+            raise UploadTooLarge()
+        return chunk
 
-3. **Preventative Measures:** Explore and implement preventative measures to prevent the recurrence of similar issues in the future, such as improved maintenance and use of durable materials.
 
-4. **Status Updates:** Provide updates on the progress through our tracking system (Complaint ID: {user_id}).
+def parse_upload_form():
+    """
+    (form, files) of a multipart upload. Parsed once per request from the body
+    stream capped at MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES, so chunked
+    bodies without a Content-Length are bounded too, with at most
+    UPLOAD_MAX_FORM_PARTS parts. Raises UploadTooLarge past the cap.
+    """
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise UploadTooLarge()
+    if 'upload_form' not in g:
+        parser = FormDataParser(
+            max_form_memory_size=MULTIPART_OVERHEAD_BYTES,
+            max_form_parts=UPLOAD_MAX_FORM_PARTS
+        )
+        stream = LimitedStream(request.stream, MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+        try:
+            _, form, files = parser.parse(stream, request.mimetype, request.content_length, request.mimetype_params)
+        except RequestEntityTooLarge:
+            raise UploadTooLarge()
+        g.upload_form = (form, files)
+    return g.upload_form
 
-We believe that prompt action is essential to mitigate any risks associated with this issue and ensure the safety and well-being of the residents and commuters in {location}. We look forward to a timely response and a concrete plan of action to address this matter.
 
-Thank you for your attention to this important issue.
+def open_upload(field='image'):
+    """
+    Stream of an uploaded image: a multipart `field` or the raw request body.
 
-Respectfully,
+    Returns:
+        (stream or None, mimetype) - raises UploadTooLarge if the declared
+        Content-Length is already past the limit, or a multipart body is
+    """
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise UploadTooLarge()
 
-Nagrik Nivedan Platform
-Complaint ID: {user_id}
-{current_date}"""
-    
-    # Final cleanup - remove any remaining brackets or placeholder-like text (shouldn't be any, but just in case)
-    complaint_letter = re.sub(r'\[.*?\]', '', complaint_letter)
-    complaint_letter = re.sub(r'\n{3,}', '\n\n', complaint_letter)
-    
-    return complaint_letter.strip()
+    if request.mimetype == 'multipart/form-data':
+        upload = parse_upload_form()[1].get(field)
+        if upload is None:
+            return None, None
+        return upload.stream, upload.mimetype
+    return request.stream, request.mimetype
 
 
-def call_hf_classifier(image_payload):
+def read_upload_bytes(field='image'):
     """
-    Forward a base64 image payload to the Hugging Face classifier Space.
+    Read an uploaded image from a multipart `field` or from the raw request body
+    in fixed-size chunks, never holding more than MAX_UPLOAD_BYTES.
+
+    Returns:
+        (image_bytes or None, mimetype) - raises UploadTooLarge past the limit
     """
-    if not HF_CLASSIFIER_URL:
-        raise RuntimeError('HF classifier URL is not configured. Set HF_CLASSIFIER_URL in the environment.')
+    stream, mimetype = open_upload(field)
+    if stream is None:
+        return None, None
+
+    data = bytearray()
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        data.extend(chunk)
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise UploadTooLarge()
+
+    return (bytes(data) if data else None), mimetype
+
+
+def upload_too_large_response():
+    return jsonify({'error': f'Image exceeds the {MAX_UPLOAD_BYTES} byte upload limit'}), 413
 
-    headers = {
-        'Content-Type': 'application/json'
-    }
-    if HF_CLASSIFIER_TOKEN:
-        headers['Authorization'] = f'Bearer {HF_CLASSIFIER_TOKEN}'
 
+def decode_base64_image(image_data):
+    """
+    Decode a data URL or raw base64 string.
+
+    Returns:
+        (image_bytes, mime_hint) - raises ValueError on malformed input
+    """
+    mime_hint = None
     try:
-        response = requests.post(
-            HF_CLASSIFIER_URL,
-            json={'image': image_payload},
-            headers=headers,
-            timeout=HF_CLASSIFIER_TIMEOUT
-        )
-    except requests.RequestException as exc:
-        raise RuntimeError(f'Failed to reach HF classifier service: {exc}') from exc
+        if isinstance(image_data, str) and image_data.startswith('data:image'):
+            # data URL format: data:image/<type>;base64,<payload>
+            try:
+                header, payload = image_data.split(',', 1)
+                # Example header: data:image/webp;base64
+                if ';' in header and ':' in header:
+                    mime_hint = header.split(':', 1)[1].split(';', 1)[0]  # image/webp, image/jpeg, etc.
+                image_data = payload
+            except Exception:
+                # Fallback if split fails
+                image_data = image_data.split(',', 1)[1]
+        with metrics.stage('base64_decode'):
+            return base64.b64decode(image_data), mime_hint
+    except Exception as exc:
+        raise ValueError('Invalid image format. Expected a base64-encoded image string.') from exc
+
+
+class InvalidImage(ValueError):
+    pass
 
-    if response.status_code >= 400:
-        raise RuntimeError(f'Classifier service returned {response.status_code}: {response.text}')
 
-    return response.json()
+def inspect_image(image_bytes, mime_hint=None):
+    """
+    Validate image bytes by parsing only the header (format and dimensions);
+    no pixel data is decoded here.
+
+    Returns:
+        the lazily opened PIL image - raises InvalidImage otherwise
+    """
+    try:
+        with metrics.stage('image_decode'):
+            image = Image.open(io.BytesIO(image_bytes))
+            width, height = image.size
+    except Exception as exc:
+        msg = 'Failed to decode image bytes.'
+        if mime_hint:
+            msg += f' mime={mime_hint}'
+        raise InvalidImage(msg) from exc
+    if width < 1 or height < 1:
+        raise InvalidImage('Image has no pixels.')
+    return image
+
+
+def prepare_for_classifier(image_bytes, image, content_type='application/octet-stream'):
+    """
+    Downscale large photos to the model's 224x224 input and re-encode them once
+    as JPEG, so the classifier receives a few KB instead of a full-size photo.
+
+    Returns:
+        (image_bytes, content_type) to forward - the original bytes if the
+        image is already small enough
+    """
+    if max(image.size) <= CLASSIFY_DOWNSCALE_ABOVE:
+        return image_bytes, content_type
+    with metrics.stage('image_downscale'):
+        try:
+            # JPEGs are decoded at reduced DCT scale; the resize happens exactly once
+            small = open_image(image, INPUT_SIZE).resize((INPUT_SIZE, INPUT_SIZE), Image.BILINEAR)
+        except Exception as exc:
+            raise InvalidImage(f'Failed to decode image bytes: {exc}') from exc
+        buffer = io.BytesIO()
+        small.save(buffer, format='JPEG', quality=CLASSIFY_JPEG_QUALITY)
+        return buffer.getvalue(), 'image/jpeg'
 
 # API Routes
 @app.route('/api/classify-issue', methods=['POST'])
 def classify_issue():
     try:
         data = request.json
-        raw_image_payload = data.get('image') if data else None
-        image_data = raw_image_payload
-        mime_hint = None
+        image_data = data.get('image') if data else None
         
         if not image_data:
             return jsonify({'error': 'No image provided'}), 400
         
         # Decode base64 image (supports both data URL and raw base64)
         try:
-            if isinstance(image_data, str) and image_data.startswith('data:image'):
-                # data URL format: data:image/<type>;base64,<payload>
-                try:
-                    header, payload = image_data.split(',', 1)
-                    # Example header: data:image/webp;base64
-                    if ';' in header and ':' in header:
-                        mime_hint = header.split(':', 1)[1].split(';', 1)[0]  # image/webp, image/jpeg, etc.
-                    image_data = payload
-                except Exception:
-                    # Fallback if split fails
-                    image_data = image_data.split(',', 1)[1]
-            image_bytes = base64.b64decode(image_data)
-        except Exception:
-            return jsonify({'error': 'Invalid image format. Expected a base64-encoded image string.'}), 400
+            image_bytes, mime_hint = decode_base64_image(image_data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Open image (PIL first, then OpenCV fallback for formats like WEBP)
+        # Header-only validation; pixels are decoded at most once, when downscaling
         try:
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        except Exception:
-            try:
-                # Fallback: OpenCV decode (handles webp if build supports it)
-                npbuf = np.frombuffer(image_bytes, np.uint8)
-                cv_img = cv2.imdecode(npbuf, cv2.IMREAD_COLOR)  # BGR
-                if cv_img is None:
-                    raise ValueError("cv2.imdecode returned None")
-                cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(cv_img)
-            except Exception:
-                msg = 'Failed to decode image bytes.'
-                if mime_hint:
-                    msg += f' mime={mime_hint}'
-                return jsonify({'error': msg}), 400
-        
-        # Forward to Hugging Face classifier
-        result = call_hf_classifier(raw_image_payload)
+            image = inspect_image(image_bytes, mime_hint)
+            result = classify_image_bytes(image_bytes, mime_hint or 'application/octet-stream', image)
+        except InvalidImage as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify(result)
     
@@ -590,100 +1004,251 @@ def classify_issue():
             'detail': str(e)
         }), 500
 
-@app.route('/api/submit-complaint', methods=['POST'])
-def submit_complaint():
+@app.route('/api/classify-issue/upload', methods=['POST'])
+def classify_issue_upload():
+    """Binary variant of /api/classify-issue: multipart `image` field or raw image body."""
     try:
-        data = request.json
+        try:
+            image_bytes, mime_hint = read_upload_bytes('image')
+        except UploadTooLarge:
+            return upload_too_large_response()
         
-        # Get issue type - support both camelCase (issueType) and snake_case (issue_type)
-        issue_type = data.get('issue_type') or data.get('issueType')
-        if not issue_type:
-            return jsonify({'error': 'Issue type is required'}), 400
+        if not image_bytes:
+            return jsonify({'error': 'No image provided'}), 400
         
-        # Get location details
-        lat = data.get('latitude')
-        lon = data.get('longitude')
-        # Prefer client-provided address if available; fallback to reverse geocoding
-        if data.get('address'):
-            address = data.get('address')
-        elif lat is not None and lon is not None:
-            address = get_address_from_coords(lat, lon)
-        else:
-            address = "Location not provided"
+        try:
+            image = inspect_image(image_bytes, mime_hint)
+            result = classify_image_bytes(image_bytes, mime_hint or 'application/octet-stream', image)
+        except InvalidImage as e:
+            return jsonify({'error': str(e)}), 400
         
+        return jsonify(result)
+    
+    except Exception as e:
+        print("Classification upload endpoint error:", e)
+        print(traceback.format_exc())
+        return jsonify({
+            'error': 'Internal server error during classification.',
+            'detail': str(e)
+        }), 500
+
+def new_complaint_payload(data):
+    """
+    Validate a submission and build its record without the slow fields
+    (address lookup, image). Raises ValueError for a 400 response.
+    """
+    # Get issue type - support both camelCase (issueType) and snake_case (issue_type)
+    issue_type = data.get('issue_type') or data.get('issueType')
+    if not issue_type:
+        raise ValueError('Issue type is required')
+
+    timestamp = datetime.utcnow().isoformat()
+    # Compact layout (see COMPLAINT_FIELD_ALIASES); the letter is rendered on demand
+    return {
+        'userId': data.get('user_id', 'anonymous'),
+        'issue_type': issue_type,
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+        'address': data.get('address') or None,
+        'description': data.get('description', ''),
         # Assign department based on issue type
-        assigned_department = get_department_for_issue(issue_type)
-        
+        'department': get_department_for_issue(issue_type),
+        'status': 'processing',
         # Get priority (default to normal)
-        priority = data.get('priority', 'normal')
-        
-        # Get user ID
-        user_id = data.get('user_id', 'anonymous')
-        
-        # Generate formal complaint with all details
-        formal_complaint = generate_formal_complaint(
-            issue_type=issue_type,
-            description=data.get('description', ''),
-            location=address,
-            latitude=lat,
-            longitude=lon,
-            priority=priority,
-            department=assigned_department,
-            user_id=user_id
-        )
-        
-        # Save image if provided
-        image_path = None
-        if data.get('image'):
+        'priority': data.get('priority', 'normal'),
+        'source': 'backend',
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def set_submission_stage(job, stage):
+    job['stage'] = stage
+    if job.get('ref') is not None:
+        job['ref'].update({
+            'processing/stage': stage,
+            'processing/attempts': job.get('attempts', 0),
+            'updated_at': datetime.utcnow().isoformat()
+        })
+
+
+def enrich_submission(job):
+    """
+    Resolve the address for a submission job and queue its photo variants.
+    Each result is kept on the job, so a retried job only redoes the steps
+    that have not finished. The letter is not stored: it is rendered from the
+    record by /api/complaint/<id>/letter.
+
+    A rate-limited or failed address lookup raises, so the pipeline retries
+    the job; on its last attempt the address is left unset instead, for
+    backfill_addresses.py to fill in, rather than storing "Address not found".
+    """
+    payload = job['payload']
+    # Firebase drops null fields, so a recovered record may lack them
+    lat, lon = payload.get('latitude'), payload.get('longitude')
+
+    if 'address' not in job:
+        # Prefer client-provided address if available; fallback to reverse geocoding
+        if payload.get('address'):
+            job['address'] = payload['address']
+        elif lat is not None and lon is not None:
+            set_submission_stage(job, 'geocoding')
             try:
-                # Create images directory if it doesn't exist
-                uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-                os.makedirs(uploads_dir, exist_ok=True)
-                
-                # Generate unique filename
-                filename = f"{uuid.uuid4().hex}.jpg"
-                image_path = f"uploads/{filename}"
-                
-                # Save image
-                image_data = data.get('image')
-                if image_data.startswith('data:image'):
-                    # Remove data URL prefix
-                    image_data = image_data.split(',')[1]
-                
-                full_image_path = os.path.join(uploads_dir, filename)
-                with open(full_image_path, 'wb') as f:
-                    f.write(base64.b64decode(image_data))
-                    
-            except Exception as e:
-                print(f"Error saving image: {e}")
-                traceback.print_exc()
-                image_path = None
+                job['address'] = get_address_from_coords(lat, lon)
+            except GeocodingUnavailable as e:
+                if not is_last_attempt(job):
+                    raise
+                print(f"[WARN] Address lookup unavailable ({e}); leaving it unset for backfill")
+                job['address'] = None
+        else:
+            job['address'] = "Location not provided"
+
+    image_path = payload.get('image_path')
+    if IMAGE_VARIANT_PREGENERATE and image_path and 'variants' not in job:
+        stored = image_store.lookup(image_path)
+        if stored is not None:
+            # Queued on the variant pool; not waited for
+            image_variants.pregenerate(stored[0], stored[1], IMAGE_VARIANT_PREGENERATE)
+        job['variants'] = True
+
+    return {
+        'address': job['address'],
+        'status': 'pending'
+    }
+
 
+def is_last_attempt(job):
+    """True unless the submission pipeline retries this job if it raises."""
+    return job.get('inline', False) or job.get('attempts', 0) >= submission_pipeline.max_attempts
+
+
+def process_submission(job):
+    """Worker body: enrich a `processing` record and finalize it."""
+    updates = enrich_submission(job)
+    set_submission_stage(job, 'saving')
+    updates['processing'] = None
+    updates['updated_at'] = datetime.utcnow().isoformat()
+    job['ref'].update(updates)
+    job['stage'] = 'done'
+    complaint = normalize_complaint(job['id'], dict(job['payload'], **updates))
+    record_aggregates(count_deltas(normalize_complaint(job['id'], job['payload']), complaint))
+    index_complaint(complaint)
+
+
+def fail_submission(job, error):
+    """Last attempt failed: keep the record visible to staff, flagged with the error."""
+    job['ref'].update({
+        'status': 'pending',
+        'processing/stage': 'failed',
+        'processing/attempts': job.get('attempts', 0),
+        'processing/error': str(error),
+        'updated_at': datetime.utcnow().isoformat()
+    })
+    complaint = normalize_complaint(job['id'], dict(job['payload'], status='pending'))
+    complaint['processing'] = dict(complaint['processing'] or {}, stage='failed', error=str(error))
+    record_aggregates(count_deltas(normalize_complaint(job['id'], job['payload']), complaint))
+    index_complaint(complaint)
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def recover_stuck_submissions():
+    """
+    Jobs for records a lost job left `processing` (worker restart, deploy):
+    not failed, not being processed here and not updated for
+    SUBMISSION_STALE_AFTER seconds. Each record is claimed with a transaction
+    that bumps updated_at, so when several processes sweep at once only one
+    requeues it.
+    """
+    if not firebase_ready:
+        return []
+    cutoff = datetime.utcnow() - timedelta(seconds=SUBMISSION_STALE_AFTER)
+    complaints_ref = get_db_reference('complaints')
+    snapshot = fetch_complaints_snapshot_filtered({'filters': {'status': {'processing'}}})
+    jobs = []
+    for complaint_id, payload in snapshot.items():
+        if not isinstance(payload, dict) or payload.get('status') != 'processing':
+            continue
+        processing = payload.get('processing')
+        if not isinstance(processing, dict) or processing.get('stage') == 'failed':
+            continue
+        updated_at = parse_timestamp(payload.get('updated_at'))
+        if updated_at is None or updated_at > cutoff or submission_pipeline.progress(complaint_id) is not None:
+            continue
+
+        claimed_at = datetime.utcnow().isoformat()
+
+        def claim(current, seen=payload.get('updated_at')):
+            if not isinstance(current, dict) or current.get('status') != 'processing' \
+                    or current.get('updated_at') != seen:
+                return current  # finished or claimed by someone else meanwhile
+            return dict(current, updated_at=claimed_at, processing={'stage': 'queued', 'attempts': 0})
+
+        ref = complaints_ref.child(complaint_id)
+        try:
+            record = ref.transaction(claim)
+        except Exception as exc:
+            print(f"[WARN] Could not claim interrupted submission {complaint_id}: {exc}")
+            continue
+        if isinstance(record, dict) and record.get('updated_at') == claimed_at:
+            print(f"[WARN] Requeueing submission {complaint_id} left in stage {processing.get('stage')}")
+            jobs.append({'id': complaint_id, 'ref': ref, 'payload': record})
+    return jobs
+
+
+# Background submission processing. 0 workers keeps the old fully synchronous
+# submit; when the queue is full a submission is finished inside the request.
+# Records whose job was lost are requeued by a sweep (recover_stuck_submissions).
+SUBMISSION_WORKERS = int(os.getenv('SUBMISSION_WORKERS', '2'))
+SUBMISSION_STALE_AFTER = float(os.getenv('SUBMISSION_STALE_AFTER', '600'))
+submission_pipeline = SubmissionPipeline(
+    process_submission,
+    workers=SUBMISSION_WORKERS,
+    max_queue=int(os.getenv('SUBMISSION_QUEUE_SIZE', '100')),
+    max_attempts=int(os.getenv('SUBMISSION_MAX_ATTEMPTS', '3')),
+    retry_backoff=float(os.getenv('SUBMISSION_RETRY_BACKOFF', '2')),
+    on_failure=fail_submission,
+    recover=recover_stuck_submissions,
+    recover_interval=float(os.getenv('SUBMISSION_RECOVER_INTERVAL', '300'))
+)
+
+
+@app.before_request
+def start_submission_workers():
+    # Once per process; starting the workers also sweeps up submissions an
+    # earlier process left unfinished
+    if SUBMISSION_WORKERS > 0 and firebase_ready:
+        submission_pipeline.ensure_started()
+
+
+def create_complaint(data, image_path=None):
+    """
+    Accept a submission whose photo (if any) is already in the image store.
+    With background workers, persist a `processing` record, queue the slow
+    work and answer 202 right away; otherwise do it all in the request.
+    Shared by the JSON (base64) and multipart submit routes.
+    """
+    try:
+        complaint_payload = new_complaint_payload(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    complaint_payload['image_path'] = image_path
+
+    try:
         require_firebase()
         complaints_ref = get_db_reference('complaints')
         firebase_id = data.get('firebase_id')
-        timestamp = datetime.utcnow().isoformat()
-
-        complaint_payload = {
-            'user_id': user_id,
-            'userId': user_id,
-            'issue_type': issue_type,
-            'issueType': issue_type,
-            'latitude': lat,
-            'longitude': lon,
-            'address': address,
-            'description': data.get('description', ''),
-            'formal_complaint': formal_complaint,
-            'formalComplaint': formal_complaint,
-            'department': assigned_department,
-            'status': 'pending',
-            'priority': priority,
-            'image_path': image_path,
-            'imagePath': image_path,
-            'source': 'backend',
-            'created_at': timestamp,
-            'updated_at': timestamp
-        }
+        job = {'payload': complaint_payload, 'inline': SUBMISSION_WORKERS <= 0}
+
+        if SUBMISSION_WORKERS <= 0:
+            complaint_payload.update(enrich_submission(job))
+        else:
+            complaint_payload['processing'] = {'stage': 'queued', 'attempts': 0}
 
         if firebase_id:
             complaint_ref = complaints_ref.child(firebase_id)
@@ -693,12 +1258,29 @@ def submit_complaint():
             complaint_ref = complaints_ref.push(complaint_payload)
             complaint_id = complaint_ref.key
 
-        return jsonify({
+        complaint = normalize_complaint(complaint_id, complaint_payload)
+        index_complaint(complaint)
+        record_aggregates(count_deltas(None, complaint))
+
+        response = {
             'success': True,
             'complaint_id': complaint_id,
-            'department': assigned_department,
-            'issue_type': issue_type
-        })
+            'department': complaint_payload['department'],
+            'issue_type': complaint_payload['issue_type']
+        }
+        if SUBMISSION_WORKERS <= 0:
+            return jsonify(response)
+
+        job.update(id=complaint_id, ref=complaint_ref)
+        if submission_pipeline.submit(job):
+            response['status'] = 'processing'
+            return jsonify(response), 202
+
+        # Queue full: finish this one inline rather than dropping it
+        print(f"[WARN] Submission queue full; processing {complaint_id} inline")
+        job.update(attempts=1, inline=True)
+        process_submission(job)
+        return jsonify(response)
     
     except RuntimeError as e:
         return jsonify({'error': str(e)}), 503
@@ -707,10 +1289,273 @@ def submit_complaint():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/submit-complaint', methods=['POST'])
+def submit_complaint():
+    data = request.json or {}
+    
+    image_path = None
+    if data.get('image'):
+        try:
+            # Decoded straight to disk in chunks
+            image_path = image_store.save_base64(data.get('image')).path
+        except ImageTooLarge:
+            return upload_too_large_response()
+        except ValueError as e:
+            # Keep accepting the complaint without its photo, as before
+            print(f"Error saving image: {e}")
+    
+    return create_complaint(data, image_path)
+
+@app.route('/api/submit-complaint/upload', methods=['POST'])
+def submit_complaint_upload():
+    """
+    Multipart variant of /api/submit-complaint: complaint fields as form fields
+    and the photo as an `image` file field, streamed with a size ceiling.
+    """
+    try:
+        form = parse_upload_form()[0] if request.mimetype == 'multipart/form-data' else request.form
+    except UploadTooLarge:
+        return upload_too_large_response()
+
+    # Validated before the photo is stored, so a rejected form leaves no file behind
+    data = form.to_dict()
+    for key in ('latitude', 'longitude'):
+        if data.get(key) not in (None, ''):
+            try:
+                data[key] = float(data[key])
+            except ValueError:
+                return jsonify({'error': f'{key} must be a number'}), 400
+        else:
+            data.pop(key, None)
+
+    image_path = None
+    try:
+        stream, _ = open_upload('image')
+        if stream is not None:
+            image_path = image_store.save_stream(stream).path
+    except (UploadTooLarge, ImageTooLarge):
+        return upload_too_large_response()
+    except UnsupportedImage as e:
+        print(f"Error saving image: {e}")
+    
+    return create_complaint(data, image_path)
+
+
+# Bulk submission for field teams and partner imports: every record is written
+# fully enriched by one multi-path update instead of a push + worker job each
+BULK_SUBMIT_MAX_ITEMS = int(os.getenv('BULK_SUBMIT_MAX_ITEMS', '100'))
+BULK_SUBMIT_MAX_BYTES = int(os.getenv('BULK_SUBMIT_MAX_BYTES', str(64 * 1024 * 1024)))
+BULK_SUBMIT_WORKERS = int(os.getenv('BULK_SUBMIT_WORKERS', '4'))
+bulk_executor = ThreadPoolExecutor(max_workers=BULK_SUBMIT_WORKERS, thread_name_prefix='bulk-submit')
+
+# Backstop for every route, chunked bodies included: nothing legitimate is
+# larger than a bulk submission or one base64 photo with its fields
+app.config['MAX_CONTENT_LENGTH'] = max(BULK_SUBMIT_MAX_BYTES, MAX_UPLOAD_BYTES * 4 // 3 + MULTIPART_OVERHEAD_BYTES)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({'error': 'Request body too large'}), 413
+
+
+def bulk_item_error(index, error, code, complaint_id=None):
+    return {'index': index, 'success': False, 'complaint_id': complaint_id, 'error': error, 'code': code}
+
+
+@app.route('/api/submit-complaint/bulk', methods=['POST'])
+def submit_complaints_bulk():
+    """
+    Submit a batch of complaints: {"complaints": [{...}, ...]} (or a bare
+    list), each with the fields of /api/submit-complaint including an optional
+    base64 `image`.
+
+    Photos are stored on a pool of BULK_SUBMIT_WORKERS threads and all
+    records are written with one multi-path update under ids generated here.
+    The response has one result per entry, in request order; an invalid
+    entry does not stop the others.
+
+    Addresses already in the geocode cache are filled in directly. Any other
+    location is written as a `processing` record without an address and
+    handed to the submission workers, which look it up under the rate limit
+    and retry it (its result has `status: processing`), so geocoding never
+    holds up the photo pool. Without submission workers the lookups run in
+    the request thread, once per distinct location.
+    """
+    if request.content_length is not None and request.content_length > BULK_SUBMIT_MAX_BYTES:
+        return jsonify({'error': f'Request exceeds the {BULK_SUBMIT_MAX_BYTES} byte bulk limit'}), 413
+    data = request.get_json(silent=True)
+    items = data.get('complaints') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of complaints'}), 400
+    if len(items) > BULK_SUBMIT_MAX_ITEMS:
+        return jsonify({'error': f'At most {BULK_SUBMIT_MAX_ITEMS} complaints per request'}), 400
+
+    try:
+        require_firebase()
+        results = [None] * len(items)
+        jobs = {}  # index -> job, as for the submission pipeline
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Each complaint must be an object')
+                payload = new_complaint_payload(item)
+                complaint_id = item.get('firebase_id') or generate_push_id()
+                if not is_valid_complaint_id(complaint_id):
+                    raise ValueError('Invalid firebase_id')
+                if complaint_id in seen:
+                    raise ValueError('Duplicate firebase_id in request')
+            except ValueError as e:
+                results[index] = bulk_item_error(index, str(e), 400)
+                continue
+            seen.add(complaint_id)
+            jobs[index] = {'id': complaint_id, 'payload': payload, 'image': item.get('image')}
+
+        # Cached addresses only: a lookup may wait seconds for a rate-limit token
+        lookups = {}  # geocode key -> (lat, lon), looked up here without workers
+        for job in jobs.values():
+            payload = job['payload']
+            lat, lon = payload['latitude'], payload['longitude']
+            if payload['address']:
+                job['address'] = payload['address']
+            elif lat is None or lon is None:
+                job['address'] = "Location not provided"
+            else:
+                try:
+                    key = reverse_geocoder.key(lat, lon)
+                except (TypeError, ValueError):
+                    job['address'] = ADDRESS_NOT_FOUND
+                    continue
+                address = reverse_geocoder.cached(lat, lon)
+                if address is not None:
+                    job['address'] = address
+                elif SUBMISSION_WORKERS > 0:
+                    # Finished by the submission workers, which do the lookup
+                    job['deferred'] = True
+                else:
+                    job['geocode_key'] = key
+                    lookups.setdefault(key, (lat, lon))
+        images = {
+            index: bulk_executor.submit(image_store.save_base64, job['image'])
+            for index, job in jobs.items() if job['image']
+        }
+
+        # Synchronous mode: one lookup per distinct location, while the photos are stored
+        addresses = {}
+        for key, (lat, lon) in lookups.items():
+            try:
+                addresses[key] = get_address_from_coords(lat, lon)
+            except GeocodingUnavailable as e:
+                print(f"[WARN] Address lookup unavailable ({e}); leaving it unset for backfill")
+                addresses[key] = None
+            except Exception as e:
+                addresses[key] = e
+
+        for index, job in list(jobs.items()):
+            image_path = None
+            if index in images:
+                try:
+                    image_path = images[index].result().path
+                except ImageTooLarge:
+                    results[index] = bulk_item_error(index, f'Image exceeds the {MAX_UPLOAD_BYTES} byte upload limit', 413)
+                    del jobs[index]
+                    continue
+                except ValueError as e:
+                    # Keep the complaint without its photo, as the single submit does
+                    print(f"Error saving image: {e}")
+                except Exception as e:
+                    print(f"Error storing image of bulk complaint {job['id']}: {e}")
+                    results[index] = bulk_item_error(index, f'Could not store image: {e}', 500)
+                    del jobs[index]
+                    continue
+            job['payload']['image_path'] = image_path
+            if 'geocode_key' in job:
+                address = addresses[job['geocode_key']]
+                if isinstance(address, Exception):
+                    print(f"Error geocoding bulk complaint {job['id']}: {address}")
+                    results[index] = bulk_item_error(index, f'Could not resolve address: {address}', 500)
+                    del jobs[index]
+                    continue
+                job['address'] = address
+
+        enriched = {
+            index: bulk_executor.submit(enrich_submission, job)
+            for index, job in jobs.items() if not job.get('deferred')
+        }
+        updates = {}
+        for job in jobs.values():
+            if job.get('deferred'):
+                job['payload']['processing'] = {'stage': 'queued', 'attempts': 0}
+                updates[job['id']] = job['payload']
+        for index, future in enriched.items():
+            job = jobs[index]
+            try:
+                job['payload'].update(future.result())
+            except Exception as e:
+                print(f"Error preparing bulk complaint {job['id']}: {e}")
+                results[index] = bulk_item_error(index, str(e), 500)
+                continue
+            updates[job['id']] = job['payload']
+
+        if updates:
+            get_db_reference('complaints').update(updates)
+
+        deltas = Counter()
+        for index, job in jobs.items():
+            if results[index] is not None:
+                continue
+            complaint = normalize_complaint(job['id'], job['payload'])
+            index_complaint(complaint)
+            count_deltas(None, complaint, deltas)
+            results[index] = {
+                'index': index,
+                'success': True,
+                'complaint_id': job['id'],
+                'department': job['payload']['department'],
+                'issue_type': job['payload']['issue_type']
+            }
+            if job.get('deferred'):
+                results[index]['status'] = 'processing'
+
+        record_aggregates(deltas)
+
+        # Only once indexed, so a fast worker's final record is not overwritten
+        complaints_ref = get_db_reference('complaints')
+        for index, job in jobs.items():
+            if not job.get('deferred') or not results[index]['success']:
+                continue
+            deferred = {'id': job['id'], 'payload': job['payload'], 'ref': complaints_ref.child(job['id'])}
+            if not submission_pipeline.submit(deferred):
+                # Queue full: finish now without the address, for backfill
+                print(f"[WARN] Submission queue full; storing {job['id']} without an address")
+                deferred.update(attempts=1, inline=True, address=None)
+                results[index].pop('status', None)
+                try:
+                    process_submission(deferred)
+                except Exception as e:
+                    print(f"[ERROR] Finishing bulk complaint {job['id']} failed: {e}")
+
+        failed = sum(1 for result in results if not result['success'])
+        return jsonify({
+            'success': failed == 0,
+            'created': len(updates),
+            'failed': failed,
+            'results': results
+        })
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error submitting complaints in bulk: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/track-complaint/<complaint_id>', methods=['GET'])
 def track_complaint(complaint_id):
     try:
         complaint, _ = get_complaint_or_404(complaint_id)
+        # Background progress: live from this worker's pool if the job runs here,
+        # else the stage last written to the record (None once finished)
+        processing = submission_pipeline.progress(complaint_id) or complaint['processing']
         return jsonify({
             'id': complaint['id'],
             'issue_type': complaint['issue_type'],
@@ -718,7 +1563,8 @@ def track_complaint(complaint_id):
             'priority': complaint['priority'],
             'department': complaint['department'],
             'created_at': complaint['created_at'],
-            'updated_at': complaint['updated_at']
+            'updated_at': complaint['updated_at'],
+            'processing': processing
         })
     except ValueError:
         return jsonify({'error': 'Complaint not found'}), 404
@@ -740,25 +1586,11 @@ def get_complaints_map():
             return jsonify({'error': 'Latitude and longitude required'}), 400
         
         require_firebase()
-        complaints = fetch_all_complaints()
-        
+        ensure_complaint_indexes()
         nearby_complaints = []
-        for complaint in complaints:
-            comp_lat = complaint['latitude']
-            comp_lon = complaint['longitude']
-            if comp_lat is None or comp_lon is None:
-                continue
-            distance = geodesic((lat, lon), (comp_lat, comp_lon)).kilometers
-            if distance <= radius:
-                nearby_complaints.append({
-                    'id': complaint['id'],
-                    'latitude': comp_lat,
-                    'longitude': comp_lon,
-                    'issue_type': complaint['issue_type'],
-                    'status': complaint['status'],
-                    'priority': complaint['priority'],
-                    'distance': distance
-                })
+        for record, distance in spatial_index.query_radius(lat, lon, radius):
+            record['distance'] = distance
+            nearby_complaints.append(record)
         
         return jsonify({
             'complaints': nearby_complaints,
@@ -773,77 +1605,306 @@ def get_complaints_map():
 
 @app.route('/api/heatmap-data', methods=['GET'])
 def get_heatmap_data():
+    """
+    Complaint clusters (~100m hash-grid cells) for the heatmap. With
+    ?summary=true each cluster carries counts by issue_type and status instead
+    of its full complaint list.
+    """
     try:
+        summary = request.args.get('summary', 'false').lower() in ('1', 'true', 'yes')
         require_firebase()
-        complaints = [
-            c for c in fetch_all_complaints()
-            if c['latitude'] is not None and c['longitude'] is not None
-        ]
-        
-        # Group complaints by location clusters (within 100m radius)
-        clusters = {}
-        cluster_radius = 0.001  # Approximately 100m
-        
-        for complaint in complaints:
-            lat, lng = complaint['latitude'], complaint['longitude']
-            
-            # Find existing cluster or create new one
-            cluster_found = False
-            for cluster_center, cluster_data in clusters.items():
-                cluster_lat, cluster_lng = cluster_center
-                distance = ((lat - cluster_lat) ** 2 + (lng - cluster_lng) ** 2) ** 0.5
-                
-                if distance < cluster_radius:
-                    clusters[cluster_center]['count'] += 1
-                    clusters[cluster_center]['complaints'].append(complaint)
-                    cluster_found = True
-                    break
-            
-            if not cluster_found:
-                clusters[(lat, lng)] = {
-                    'count': 1,
-                    'complaints': [complaint],
-                    'center_lat': lat,
-                    'center_lng': lng
-                }
-        
-        # Convert clusters to heatmap data with intensity based on complaint count
-        heatmap_data = []
-        for cluster_center, cluster_data in clusters.items():
-            # Calculate intensity based on complaint count
-            intensity = min(cluster_data['count'] / 5.0, 1.0)  # Cap at 1.0 for 5+ complaints
-            
-            heatmap_data.append({
-                'lat': cluster_data['center_lat'],
-                'lng': cluster_data['center_lng'],
-                'weight': intensity,
-                'count': cluster_data['count'],
-                'complaints': [
-                    {
-                        'id': c['id'],
-                        'issue_type': c['issue_type'],
-                        'status': c['status'],
-                        'priority': c['priority']
-                    } for c in cluster_data['complaints']
-                ]
-            })
-        
-        return jsonify(heatmap_data)
-    
+        ensure_complaint_indexes()
+        body = heatmap_grid.rendered(summary, app.json.dumps)
+        return app.response_class(body, mimetype='application/json')
+
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/complaint-aggregates', methods=['GET'])
+def get_complaint_aggregates():
+    """
+    Dashboard counts by status, department, issue_type and priority, plus a
+    trend of submissions (by status) per day or ISO week, read from the rollup
+    node: two small reads whatever the number of complaints.
+
+    ?trend=daily|weekly|none (default daily), ?periods=<n> buckets
+    (default 30 days or 12 weeks, at most AGGREGATES_MAX_PERIODS).
+    """
+    trend = request.args.get('trend', 'daily').lower()
+    if trend not in ('daily', 'weekly', 'none'):
+        return jsonify({'error': 'trend must be daily, weekly or none'}), 400
+    periods = request.args.get('periods', type=int) or (12 if trend == 'weekly' else 30)
+    if not 1 <= periods <= AGGREGATES_MAX_PERIODS:
+        return jsonify({'error': f'periods must be between 1 and {AGGREGATES_MAX_PERIODS}'}), 400
+
+    try:
+        summary = get_db_reference(f'{AGGREGATES_PATH}/summary').get() or {}
+        response = {'total': summary.get('total', 0)}
+        for field in GROUP_FIELDS:
+            counts = summary.get(f'by_{field}') or {}
+            response[f'by_{field}'] = {key: count for key, count in counts.items() if count}
+        if trend != 'none':
+            keys = period_keys(trend, periods, datetime.utcnow().date())
+            buckets = get_db_reference(f'{AGGREGATES_PATH}/{trend}').order_by_key() \
+                .start_at(keys[0]).end_at(keys[-1]).get() or {}
+            response['trend'] = {'interval': trend, 'buckets': trend_series(buckets, keys)}
+        return jsonify(response)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/department/<department>/queue', methods=['GET'])
+def get_department_queue(department):
+    """
+    A department's work queue: its complaints ordered by priority (urgent
+    first) and then age (oldest first), top `limit` only, from the department
+    index rather than a scan of the tree. The department name matches
+    case-insensitively.
+
+    ?status=pending,in_progress (or `all`; default: every status except
+    DEPARTMENT_QUEUE_CLOSED_STATUSES), ?limit=<n> (at most
+    DEPARTMENT_QUEUE_MAX_LIMIT). Entries carry the complaint fields without
+    the letter; `counts` has the department's totals per status.
+    """
+    limit = request.args.get('limit', DEPARTMENT_QUEUE_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= DEPARTMENT_QUEUE_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {DEPARTMENT_QUEUE_MAX_LIMIT}'}), 400
+
+    try:
+        require_firebase()
+        ensure_complaint_indexes()
+        counts = department_queues.counts(department)
+        status_arg = request.args.get('status', '').strip()
+        if status_arg.lower() == 'all':
+            statuses = sorted(counts)
+        elif status_arg:
+            statuses = [s.strip() for s in status_arg.split(',') if s.strip()]
+        else:
+            statuses = sorted(s for s in counts if s not in DEPARTMENT_QUEUE_CLOSED_STATUSES)
+
+        return jsonify({
+            'department': department,
+            'statuses': statuses,
+            'counts': counts,
+            'total': sum(counts.values()),
+            'matching': sum(counts.get(s, 0) for s in statuses),
+            'limit': limit,
+            'complaints': department_queues.queue(department, statuses, limit),
+        })
     except RuntimeError as e:
         return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# /api/all-complaints paging, filtering and projection
+ALL_COMPLAINTS_PAGE_SIZE = int(os.getenv('ALL_COMPLAINTS_PAGE_SIZE', '100'))
+ALL_COMPLAINTS_MAX_PAGE_SIZE = int(os.getenv('ALL_COMPLAINTS_MAX_PAGE_SIZE', '1000'))
+COMPLAINT_FILTER_FIELDS = ('status', 'department', 'issue_type', 'priority')
+# Stored under the same key by the backend and the frontend (unlike issueType /
+# createdAt), so Firebase can filter on them server-side
+PUSHDOWN_FILTER_FIELDS = ('status', 'priority', 'department')
+COMPLAINT_FIELDS = tuple(normalize_complaint(None, {}).keys())
+
+
+def parse_complaint_query(args):
+    """
+    Validate /api/all-complaints query parameters. Raises ValueError with a
+    message suitable for a 400 response.
+    """
+    filters = {}
+    for field in COMPLAINT_FILTER_FIELDS:
+        values = {value.strip() for value in (args.get(field) or '').split(',') if value.strip()}
+        if values:
+            filters[field] = values
+
+    order = args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+
+    output = args.get('format', 'json').lower()
+    if output not in ('json', 'ndjson'):
+        raise ValueError('format must be json or ndjson')
+
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args.get('fields').split(',') if field.strip()]
+        unknown = [field for field in fields if field not in COMPLAINT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(COMPLAINT_FIELDS)}")
+        if 'id' not in fields:
+            fields.insert(0, 'id')
+
+    limit = args.get('limit')
+    if limit is None:
+        # A stream is bounded in memory, so by default it covers every match
+        limit = None if output == 'ndjson' else ALL_COMPLAINTS_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        max_limit = None if output == 'ndjson' else ALL_COMPLAINTS_MAX_PAGE_SIZE
+        if limit < 1 or (max_limit is not None and limit > max_limit):
+            raise ValueError(f'limit must be between 1 and {max_limit}' if max_limit else 'limit must be positive')
+
+    return {
+        'filters': filters,
+        'created_from': args.get('created_from') or None,
+        'created_to': args.get('created_to') or None,
+        'order': order,
+        'format': output,
+        'fields': fields,
+        'limit': limit,
+        'cursor': args.get('cursor') or None,
+    }
+
+
+def complaint_matches(complaint, query):
+    for field, values in query['filters'].items():
+        if complaint.get(field) not in values:
+            return False
+    if query['created_from'] or query['created_to']:
+        # ISO 8601 strings compare chronologically; created_to=2025-01-31 includes that whole day
+        created_at = complaint.get('created_at')
+        if not created_at:
+            return False
+        if query['created_from'] and created_at < query['created_from']:
+            return False
+        if query['created_to'] and created_at[:len(query['created_to'])] > query['created_to']:
+            return False
+    return True
+
+
+def project_complaint(complaint, fields):
+    if fields is None:
+        return complaint
+    return {field: complaint.get(field) for field in fields}
+
+
+def fetch_complaints_snapshot_filtered(query):
+    """
+    Raw complaints from Firebase with one equality filter pushed down to an
+    order_by_child query when possible (needs an ".indexOn" rule for the field;
+    without one this falls back to reading the whole tree).
+    """
+    for field in PUSHDOWN_FILTER_FIELDS:
+        values = query['filters'].get(field)
+        if values and len(values) == 1:
+            try:
+                return get_db_reference('complaints').order_by_child(field).equal_to(next(iter(values))).get() or {}
+            except Exception as exc:
+                print(f"[WARN] Firebase query on {field} failed, reading all complaints: {exc}")
+                break
+    return get_complaints_snapshot()
+
+
+def iter_matching_complaints(query, cursor=None):
+    """
+    Yield normalized complaints matching `query`, ordered by id (push ids are
+    chronological) in query['order'], starting after `cursor`. Served from the
+    mirror when synced, otherwise normalized lazily from a Firebase read.
+    """
+    mirror = get_complaint_mirror()
+    if mirror is not None:
+        ids, complaints = mirror.ordered()
+        lookup = None
+    else:
+        snapshot = fetch_complaints_snapshot_filtered(query)
+        ids = sorted(snapshot)
+        complaints = None
+        lookup = snapshot
+
+    descending = query['order'] == 'desc'
+    if cursor is None:
+        positions = range(len(ids) - 1, -1, -1) if descending else range(len(ids))
+    elif descending:
+        positions = range(bisect.bisect_left(ids, cursor) - 1, -1, -1)
+    else:
+        positions = range(bisect.bisect_right(ids, cursor), len(ids))
+
+    for position in positions:
+        if complaints is not None:
+            complaint = complaints[position]
+        else:
+            complaint_id = ids[position]
+            complaint = normalize_complaint(complaint_id, lookup[complaint_id])
+        if complaint_matches(complaint, query):
+            yield complaint
+
+
+def fetch_complaint_key_page(query):
+    """
+    One unfiltered page straight from Firebase with order_by_key + limit, so
+    only limit + 1 records are transferred. Returns (complaints, has_more).
+    """
+    ref = get_db_reference('complaints').order_by_key()
+    cursor, limit = query['cursor'], query['limit']
+    if query['order'] == 'asc':
+        if cursor:
+            ref = ref.start_at(cursor)
+        snapshot = ref.limit_to_first(limit + 2).get() or {}
+        ids = sorted(snapshot)
+    else:
+        if cursor:
+            ref = ref.end_at(cursor)
+        snapshot = ref.limit_to_last(limit + 2).get() or {}
+        ids = sorted(snapshot, reverse=True)
+    ids = [complaint_id for complaint_id in ids if complaint_id != cursor]
+    page = [normalize_complaint(complaint_id, snapshot[complaint_id]) for complaint_id in ids[:limit]]
+    return page, len(ids) > limit
+
+
 @app.route('/api/all-complaints', methods=['GET'])
 def get_all_complaints():
+    """
+    Complaints newest first (order=asc for oldest first), `limit` per page with
+    `next_cursor` for the following page. Filters: status, department,
+    issue_type, priority (comma-separated values), created_from / created_to
+    (ISO 8601). `fields=` projects each record; `format=ndjson` streams
+    matching records one JSON object per line instead of building a list.
+    `total` counts all matches and is only computed for the first page.
+    """
+    try:
+        query = parse_complaint_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         require_firebase()
-        complaints_data = fetch_all_complaints()
-        
+
+        if query['format'] == 'ndjson':
+            matches = iter_matching_complaints(query, query['cursor'])
+            if query['limit'] is not None:
+                matches = itertools.islice(matches, query['limit'])
+
+            def generate():
+                for complaint in matches:
+                    yield json.dumps(project_complaint(complaint, query['fields'])) + '\n'
+
+            return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        total = None
+        unfiltered = not query['filters'] and not query['created_from'] and not query['created_to']
+        if unfiltered and get_complaint_mirror() is None:
+            page, has_more = fetch_complaint_key_page(query)
+            if query['cursor'] is None:
+                total = len(get_db_reference('complaints').get(shallow=True) or {})
+        else:
+            matches = iter_matching_complaints(query, query['cursor'])
+            page = list(itertools.islice(matches, query['limit'] + 1))
+            if query['cursor'] is None:
+                total = len(page) + sum(1 for _ in matches)
+            has_more = len(page) > query['limit']
+            page = page[:query['limit']]
+
         return jsonify({
-            'complaints': complaints_data,
-            'total': len(complaints_data)
+            'complaints': [project_complaint(complaint, query['fields']) for complaint in page],
+            'total': total,
+            'limit': query['limit'],
+            'next_cursor': page[-1]['id'] if has_more and page else None
         })
     
     except RuntimeError as e:
@@ -855,6 +1916,8 @@ def get_all_complaints():
 def get_complaint_details(complaint_id):
     try:
         complaint, _ = get_complaint_or_404(complaint_id)
+        if not complaint['formal_complaint'] and not letter_pending(complaint):
+            complaint['formal_complaint'] = complaint_letter_for(complaint)
         return jsonify(complaint)
     except ValueError:
         return jsonify({'error': 'Complaint not found'}), 404
@@ -865,6 +1928,48 @@ def get_complaint_details(complaint_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+
+def letter_pending(complaint):
+    """True while background processing has not filled in what the letter needs."""
+    processing = complaint['processing']
+    return bool(processing) and processing.get('stage') != 'failed'
+
+
+@app.route('/api/complaint/<complaint_id>/letter', methods=['GET'])
+def get_complaint_letter(complaint_id):
+    """
+    The complaint's formal letter, rendered from the stored record (memoized
+    on its inputs) or, for records from before the compact layout, the letter
+    stored with it. JSON by default, plain text with ?format=text. Sent with
+    an ETag so an unchanged letter is answered with 304.
+    """
+    try:
+        complaint, _ = get_complaint_or_404(complaint_id)
+        if not complaint['formal_complaint'] and letter_pending(complaint):
+            return jsonify({
+                'error': 'Complaint is still being processed',
+                'processing': complaint['processing']
+            }), 409
+
+        letter = complaint_letter_for(complaint)
+        as_text = request.args.get('format') == 'text'
+        if as_text:
+            response = app.response_class(letter, mimetype='text/plain')
+        else:
+            response = jsonify({'complaint_id': complaint_id, 'formal_complaint': letter})
+        digest = hashlib.sha256(letter.encode('utf-8')).hexdigest()[:32]
+        response.set_etag(f"{digest}-{'text' if as_text else 'json'}")
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except ValueError:
+        return jsonify({'error': 'Complaint not found'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error rendering complaint letter: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/complaint/<complaint_id>/update-status', methods=['PUT'])
 def update_complaint_status(complaint_id):
     try:
@@ -883,7 +1988,10 @@ def update_complaint_status(complaint_id):
         updates['updated_at'] = datetime.utcnow().isoformat()
         complaint_ref.update(updates)
 
+        previous = dict(complaint)
         complaint.update(updates)
+        index_complaint(complaint)
+        record_aggregates(count_deltas(previous, complaint))
 
         return jsonify({
             'success': True,
@@ -897,10 +2005,184 @@ def update_complaint_status(complaint_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+BULK_UPDATE_MAX_ITEMS = int(os.getenv('BULK_UPDATE_MAX_ITEMS', '500'))
+BULK_UPDATE_FIELDS = ('status', 'priority')
+
+
+def fetch_complaints_by_id(complaint_ids):
+    """
+    {id: normalized complaint} for the ids that exist. Served from the mirror
+    when synced; ids it does not have - a complaint written moments ago may
+    still be in flight, as in get_complaint_or_404 - are each read on their
+    own, in parallel on the bulk executor (a key range spanning them would
+    download every complaint in between).
+    """
+    found = {}
+    missing = sorted(set(complaint_ids))
+    mirror = get_complaint_mirror()
+    if mirror is not None:
+        for complaint_id in missing:
+            complaint = mirror.get(complaint_id)
+            if complaint is not None:
+                found[complaint_id] = complaint
+        missing = [complaint_id for complaint_id in missing if complaint_id not in found]
+    if missing:
+        complaints_ref = get_db_reference('complaints')
+        payloads = bulk_executor.map(lambda complaint_id: complaints_ref.child(complaint_id).get(), missing)
+        for complaint_id, payload in zip(missing, payloads):
+            if payload:
+                found[complaint_id] = normalize_complaint(complaint_id, payload)
+    return found
+
+
+def parse_bulk_update_item(item):
+    """(id, {field: value}) for one bulk update entry. Raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError('Each update must be an object with an id')
+    complaint_id = item.get('id')
+    if not is_valid_complaint_id(complaint_id):
+        raise ValueError('Invalid complaint id')
+    changes = {}
+    for field in BULK_UPDATE_FIELDS:
+        if field in item:
+            value = item[field]
+            if not isinstance(value, str) or not value:
+                raise ValueError(f'{field} must be a non-empty string')
+            changes[field] = value
+    if not changes:
+        raise ValueError('No updates provided')
+    return complaint_id, changes
+
+
+@app.route('/api/complaints/bulk-update-status', methods=['PATCH', 'POST'])
+def bulk_update_complaint_status():
+    """
+    Apply status/priority changes to many complaints at once.
+
+    Body: {"updates": [{"id": "...", "status": "...", "priority": "..."}, ...]}
+    (a bare list is accepted too). Existence is checked against the mirror or
+    with parallel per-id reads, and every valid change is written with a single
+    multi-path update(), so a triage session costs about one round trip
+    instead of a read and a write per complaint. The response has one result
+    per entry, in request order; entries that fail validation do not stop the
+    others. Changes that match the stored values are reported as unchanged
+    and not written.
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('updates') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Expected a non-empty list of updates'}), 400
+        if len(items) > BULK_UPDATE_MAX_ITEMS:
+            return jsonify({'error': f'At most {BULK_UPDATE_MAX_ITEMS} updates per request'}), 400
+
+        results = []
+        parsed = {}  # result index -> (id, changes)
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                complaint_id, changes = parse_bulk_update_item(item)
+                if complaint_id in seen:
+                    raise ValueError('Duplicate id in request')
+            except ValueError as e:
+                complaint_id = item.get('id') if isinstance(item, dict) else None
+                results.append({'id': complaint_id, 'success': False, 'error': str(e), 'code': 400})
+                continue
+            seen.add(complaint_id)
+            parsed[index] = (complaint_id, changes)
+            results.append(None)
+
+        existing = fetch_complaints_by_id(seen) if seen else {}
+        now = datetime.utcnow().isoformat()
+        updates = {}
+        changed = []
+        deltas = Counter()
+        for index, (complaint_id, changes) in parsed.items():
+            complaint = existing.get(complaint_id)
+            if complaint is None:
+                results[index] = {'id': complaint_id, 'success': False, 'error': 'Complaint not found', 'code': 404}
+                continue
+            if all(complaint.get(field) == value for field, value in changes.items()):
+                results[index] = {'id': complaint_id, 'success': True, 'unchanged': True, 'complaint': complaint}
+                continue
+            changes['updated_at'] = now
+            for field, value in changes.items():
+                updates[f'{complaint_id}/{field}'] = value
+            updated = dict(complaint, **changes)
+            count_deltas(complaint, updated, deltas)
+            changed.append(updated)
+            results[index] = {'id': complaint_id, 'success': True, 'complaint': updated}
+
+        if updates:
+            get_db_reference('complaints').update(updates)
+            for complaint in changed:
+                index_complaint(complaint)
+            record_aggregates(deltas)
+
+        failed = sum(1 for result in results if not result['success'])
+        return jsonify({
+            'success': failed == 0,
+            'updated': len(changed),
+            'unchanged': len(results) - failed - len(changed),
+            'failed': failed,
+            'results': results
+        })
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/image/<path:filename>')
 def serve_image(filename):
+    """
+    Serve a complaint photo. Content-addressed files get their digest as a
+    strong ETag and a year-long immutable Cache-Control; Range and
+    If-None-Match requests are answered by send_file (206 / 304).
+
+    ?w=<px> or ?size=thumb|small|medium|large returns a downscaled variant,
+    generated once and then read from the variant cache.
+    """
+    try:
+        width = image_variants.resolve_width(
+            request.args.get('w', type=int),
+            request.args.get('size')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        from flask import send_from_directory
+        stored = image_store.lookup(filename)
+        if stored is not None:
+            path, digest, mimetype = stored
+            if not os.path.isfile(path):
+                return jsonify({'error': 'Image not found'}), 404
+            etag = digest
+            immutable = True
+            if width is not None:
+                variant = image_variants.get(path, digest, width)
+                if variant is None:
+                    # Generation pool busy: send the original, but do not let it be cached as the variant
+                    immutable = False
+                elif variant != USE_ORIGINAL:
+                    path = variant
+                    mimetype = 'image/png' if variant.endswith('.png') else 'image/jpeg'
+                    etag = f'{digest}-w{width}'
+            response = send_file(
+                path,
+                mimetype=mimetype,
+                conditional=True,
+                etag=etag,
+                max_age=IMAGE_CACHE_MAX_AGE if immutable else 0
+            )
+            if immutable:
+                response.cache_control.public = True
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.no_cache = True
+            return response
+
+        # Legacy uploads/<uuid>.jpg files
         # Handle both cases: filename only or uploads/filename
         if filename.startswith('uploads/'):
             # Extract just the filename from uploads/filename
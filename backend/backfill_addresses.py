@@ -0,0 +1,72 @@
+"""
+Fill in addresses for complaints stored without one.
+
+Finds complaints with coordinates whose address is missing, "Address not
+found" or "Location not provided", resolves them through the app's
+ReverseGeocoder (so the SQLite cache, rate limiter and provider settings from
+the environment apply) and writes them back with one multi-path update per
+batch. Safe to interrupt and re-run: fixed complaints no longer match.
+
+    python backfill_addresses.py --dry-run
+    python backfill_addresses.py --limit 500 --batch-size 50
+"""
+
+import argparse
+from datetime import datetime
+
+from app import get_complaints_snapshot, get_db_reference, normalize_complaint, reverse_geocoder
+from geocoding import ADDRESS_NOT_FOUND
+
+MISSING_ADDRESSES = {None, '', ADDRESS_NOT_FOUND, 'Location not provided'}
+
+
+def find_missing(snapshot):
+    for complaint_id, payload in snapshot.items():
+        complaint = normalize_complaint(complaint_id, payload)
+        if complaint['address'] in MISSING_ADDRESSES and complaint['latitude'] is not None \
+                and complaint['longitude'] is not None:
+            yield complaint
+
+
+def flush(updates, dry_run):
+    if updates and not dry_run:
+        get_db_reference('complaints').update(updates)
+    updates.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill missing complaint addresses.")
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many complaints')
+    parser.add_argument('--batch-size', type=int, default=50, help='complaints per Firebase update')
+    parser.add_argument('--dry-run', action='store_true', help='resolve addresses but do not write them')
+    args = parser.parse_args()
+
+    candidates = list(find_missing(get_complaints_snapshot()))
+    if args.limit is not None:
+        candidates = candidates[:args.limit]
+    print(f"[OK] {len(candidates)} complaints without an address")
+
+    updates = {}
+    resolved = unresolved = 0
+    for index, complaint in enumerate(candidates, 1):
+        address = reverse_geocoder.reverse(complaint['latitude'], complaint['longitude'])
+        if address == ADDRESS_NOT_FOUND:
+            unresolved += 1
+        else:
+            resolved += 1
+            updates[f"{complaint['id']}/address"] = address
+            updates[f"{complaint['id']}/updated_at"] = datetime.utcnow().isoformat()
+            if args.dry_run:
+                print(f"  {complaint['id']}: {address}")
+        if len(updates) >= 2 * args.batch_size:
+            flush(updates, args.dry_run)
+            print(f"[OK] {index}/{len(candidates)} processed")
+    flush(updates, args.dry_run)
+
+    print(f"[OK] Resolved {resolved}, still unresolved {unresolved}"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+    print(reverse_geocoder.stats())
+
+
+if __name__ == '__main__':
+    main()
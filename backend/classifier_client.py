@@ -0,0 +1,233 @@
+"""
+HTTP client for the Hugging Face classifier Space.
+
+One ClassifierClient per process keeps a pooled keep-alive requests.Session (so
+TLS handshakes are paid once per connection, not once per classification),
+applies separate connect/read timeouts, retries transient failures with
+jittered exponential backoff and fails fast through a circuit breaker while the
+Space is down or cold-starting. Per-call latency is recorded for /api/classifier-stats.
+"""
+
+import base64
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limiting and Space cold start / gateway errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ClassifierUnavailable(RuntimeError):
+    """The classifier could not be reached (after retries) or the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately for `reset_timeout` seconds. The first call after that is
+    let through as a probe; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Return True if a call may proceed."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 if not open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class ClassifierClient:
+    """
+    Pooled, retrying, circuit-broken client for the classifier's /predict endpoints.
+    """
+
+    def __init__(self, url, upload_url=None, token=None, connect_timeout=3.05, read_timeout=15.0,
+                 max_retries=2, backoff_base=0.25, backoff_max=2.0, pool_size=10,
+                 failure_threshold=5, reset_timeout=30.0, latency_window=1024):
+        """
+        Args:
+            url: base64 JSON endpoint, e.g. https://<space>.hf.space/predict
+            upload_url: raw-bytes endpoint (defaults to url + '/upload')
+            token: optional bearer token for private Spaces
+            connect_timeout / read_timeout: seconds, passed separately to requests
+            max_retries: extra attempts after the first for transient failures
+            backoff_base / backoff_max: full-jitter exponential backoff bounds (s)
+            pool_size: keep-alive connections kept per host
+            failure_threshold / reset_timeout: circuit breaker settings
+        """
+        self.url = url
+        self.upload_url = upload_url or (url.rstrip('/') + '/upload' if url else None)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._calls = 0
+        self._errors = 0
+        self._retries = 0
+        self._short_circuited = 0
+
+    def predict_base64(self, image_payload):
+        """POST {'image': <base64>} to the JSON endpoint."""
+        if not self.url:
+            raise RuntimeError('HF classifier URL is not configured. Set HF_CLASSIFIER_URL in the environment.')
+        response = self._post(self.url, json={'image': image_payload})
+        return response.json()
+
+    def predict_bytes(self, image_bytes, content_type='application/octet-stream'):
+        """
+        POST raw image bytes to the binary endpoint, falling back to the base64
+        endpoint if the Space does not expose it yet (404/405).
+        """
+        if not self.upload_url:
+            raise RuntimeError('HF classifier URL is not configured. Set HF_CLASSIFIER_URL in the environment.')
+        response = self._post(
+            self.upload_url,
+            data=image_bytes,
+            headers={'Content-Type': content_type},
+            passthrough_statuses=(404, 405)
+        )
+        if response.status_code in (404, 405):
+            return self.predict_base64(base64.b64encode(image_bytes).decode('ascii'))
+        return response.json()
+
+    def _backoff(self, attempt):
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _post(self, url, passthrough_statuses=(), **kwargs):
+        if not self.breaker.allow():
+            with self._stats_lock:
+                self._short_circuited += 1
+            raise ClassifierUnavailable(
+                f'HF classifier circuit is open; retry in {self.breaker.retry_after():.1f}s'
+            )
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1))
+                with self._stats_lock:
+                    self._retries += 1
+
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.ReadTimeout as exc:
+                # Already waited the full read timeout; retrying would multiply it
+                self._record(time.perf_counter() - start, error=True)
+                last_error = f'HF classifier service timed out: {exc}'
+                break
+            except requests.RequestException as exc:
+                self._record(time.perf_counter() - start, error=True)
+                last_error = f'Failed to reach HF classifier service: {exc}'
+                continue
+            self._record(time.perf_counter() - start, error=response.status_code >= 400)
+
+            if response.status_code in RETRYABLE_STATUSES:
+                last_error = f'Classifier service returned {response.status_code}: {response.text}'
+                continue
+
+            # The Space answered: it is up, whatever it thought of the request
+            self.breaker.record_success()
+            if response.status_code >= 400 and response.status_code not in passthrough_statuses:
+                raise RuntimeError(f'Classifier service returned {response.status_code}: {response.text}')
+            return response
+
+        self.breaker.record_failure()
+        raise ClassifierUnavailable(last_error)
+
+    def _record(self, seconds, error=False):
+        with self._stats_lock:
+            self._calls += 1
+            self._latencies.append(seconds)
+            if error:
+                self._errors += 1
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            calls, errors, retries, short = self._calls, self._errors, self._retries, self._short_circuited
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'retries': retries,
+            'short_circuited': short,
+            'circuit_state': self.breaker.state,
+            'latency_ms': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': latencies[-1] * 1000.0 if latencies else None,
+                'samples': len(latencies),
+            },
+        }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,233 @@
+"""
+Formal complaint letter rendering.
+
+The letter text is a module-level template with one variant per optional
+block (GPS coordinates present or not), so rendering a submission is a single
+str.format() call. City and state are pulled out of the reverse-geocoded
+address by matchers compiled once at import, and the result is memoized per
+address since many complaints share a handful of addresses.
+
+The template itself contains no square brackets and no runs of blank lines,
+so the old bracket-stripping and blank-line-collapsing passes only run when a
+user-supplied field (description, address, ...) brings one in.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+DEFAULT_CITY = "Kanpur"
+DEFAULT_STATE = "Uttar Pradesh"
+
+STATE_NAMES = (
+    'Uttar Pradesh', 'Maharashtra', 'Karnataka', 'Gujarat', 'Rajasthan', 'Punjab',
+    'West Bengal', 'Tamil Nadu', 'Andhra Pradesh', 'Madhya Pradesh', 'Bihar', 'Odisha',
+    'Assam', 'Haryana', 'Kerala', 'Jharkhand', 'Chhattisgarh', 'Delhi',
+    'Himachal Pradesh', 'Uttarakhand', 'Goa', 'Manipur', 'Meghalaya', 'Mizoram',
+    'Nagaland', 'Sikkim', 'Tripura', 'Arunachal Pradesh', 'Telangana',
+)
+KNOWN_CITIES = frozenset((
+    'kanpur', 'delhi', 'mumbai', 'bangalore', 'chennai', 'kolkata', 'hyderabad', 'pune', 'ahmedabad',
+))
+NOT_A_STATE = frozenset(('india', 'indian'))
+
+# "contains any state name" / "looks like a state" as one scan each
+STATE_PATTERN = re.compile('|'.join(re.escape(name) for name in STATE_NAMES))
+STATE_HINT_PATTERN = re.compile('Pradesh|Bengal|Nadu|Kerala|Gujarat|Rajasthan')
+
+PRIORITY_DISPLAY = {
+    'low': 'Low',
+    'normal': 'Normal',
+    'high': 'High',
+    'urgent': 'Urgent'
+}
+URGENT_PRIORITIES = ('high', 'urgent')
+
+DEFAULT_DESCRIPTIONS = {
+    'potholes': 'The road surface in {location} has multiple potholes that are causing significant disruption to traffic flow and posing safety risks to vehicles and pedestrians.',
+    'damaged_signs': 'Traffic signs or road signs in {location} are damaged, missing, or illegible, which poses safety risks to motorists and pedestrians.',
+    'fallen_trees': 'Fallen trees or tree branches in {location} are blocking roads or pathways, creating obstacles and potential safety hazards.',
+    'garbage': 'Garbage and waste accumulation in {location} is causing health and environmental concerns, requiring immediate cleanup and waste management.',
+    'graffiti': 'Unauthorized graffiti and vandalism in {location} is affecting the aesthetic appearance of public spaces and may indicate security concerns.',
+    'illegal_parking': 'Illegal parking in {location} is obstructing traffic flow and creating safety hazards for vehicles and pedestrians.',
+    'street_light': 'Street lights in {location} are not functioning properly, creating safety concerns especially during nighttime hours.',
+    'water_leak': 'Water leaks in {location} are causing water wastage and potential damage to infrastructure and surrounding areas.',
+    'traffic_signal': 'Traffic signals in {location} are malfunctioning or not working, creating traffic congestion and safety risks.',
+    'sidewalk_damage': 'Sidewalk damage in {location} is creating hazards for pedestrians and requires immediate repair.',
+    'drainage': 'Drainage issues in {location} are causing water accumulation and potential flooding risks.',
+}
+FALLBACK_DESCRIPTION = 'Civic infrastructure issue of type {issue_lower} has been identified in {location} and requires immediate attention to ensure public safety.'
+
+URGENCY_SENTENCES = {
+    True: 'Given the {priority_lower} priority level, we request immediate action to address this matter.',
+    False: 'Prompt action is necessary to prevent further deterioration and ensure the safety of residents and commuters.',
+}
+
+_LETTER_TEMPLATE = """Nagrik Nivedan Platform
+Complaint Reference: {user_id}
+
+{current_date}
+
+To,
+The Municipal Commissioner,
+{city} Municipal Corporation,
+{city}, {state}, India.
+
+**Subject: Formal Complaint Regarding {issue} Issue in {location}**
+
+Dear Sir/Madam,
+
+This letter serves as a formal complaint regarding a {issue_lower} issue that has been identified in {location} and requires immediate attention.
+
+**COMPLAINT DETAILS:**
+
+**Issue Type:** {issue} (AI-Identified)
+**Priority:** {priority} Priority
+**Location:** {location}
+<coordinates>
+**Date:** {current_date}
+**Assigned Department:** {department}
+**Complaint ID:** {user_id}
+
+**DESCRIPTION:**
+
+{description}
+
+**LOCATION DETAILS:**
+
+- **Full Address:** {location}<gps>
+
+**URGENCY ASSESSMENT:**
+
+We consider this issue to be of **{priority_lower} priority**. The condition of the {issue_lower} in {location} requires attention to ensure public safety and maintain service standards. {urgency}
+
+**POTENTIAL SAFETY CONCERNS:**
+
+The presence of this {issue_lower} issue presents several potential safety concerns, including:
+- Increased risk of accidents, particularly for vehicles and pedestrians
+- Potential damage to vehicles and infrastructure
+- Disruption to traffic flow and public safety
+- Risk of injury to residents and commuters
+
+**REQUEST FOR IMMEDIATE ACTION:**
+
+We respectfully request that the {department} take immediate action to address this critical issue. Specifically, we request the following:
+
+1. **Immediate Inspection:** Conduct a thorough inspection of the location in {location} to assess the extent of the {issue_lower} issue.
+
+2. **Assessment and Remediation:** Implement appropriate measures to resolve the {issue_lower} issue and restore the area to a safe and usable condition.
+
+3. **Preventative Measures:** Explore and implement preventative measures to prevent the recurrence of similar issues in the future, such as improved maintenance and use of durable materials.
+
+4. **Status Updates:** Provide updates on the progress through our tracking system (Complaint ID: {user_id}).
+
+We believe that prompt action is essential to mitigate any risks associated with this issue and ensure the safety and well-being of the residents and commuters in {location}. We look forward to a timely response and a concrete plan of action to address this matter.
+
+Thank you for your attention to this important issue.
+
+Respectfully,
+
+Nagrik Nivedan Platform
+Complaint ID: {user_id}
+{current_date}"""
+
+# Keyed on "has GPS coordinates". Without them the coordinates line is left
+# blank and the GPS bullets disappear, exactly as the old cleanup pass left it.
+LETTER_TEMPLATES = {
+    True: _LETTER_TEMPLATE
+    .replace('<coordinates>', '**Coordinates:**\n{coordinates}')
+    .replace('<gps>', "\n- **GPS Coordinates:** {coordinates}\n- **Captured from user's device GPS**"),
+    False: _LETTER_TEMPLATE.replace('<coordinates>', '').replace('<gps>', ''),
+}
+
+BRACKETED_PATTERN = re.compile(r'\[.*?\]')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+
+@lru_cache(maxsize=4096)
+def parse_city_state(location):
+    """
+    (city, state) from a reverse-geocoded address such as
+    "Jajmau, Kanpur, Kanpur Nagar, Uttar Pradesh, 208015, India".
+    Falls back to Kanpur, Uttar Pradesh.
+    """
+    parts = [part.strip() for part in location.split(',')] if location else []
+    city = DEFAULT_CITY
+    state = DEFAULT_STATE
+
+    if len(parts) >= 4:
+        # Usually: Area, City, District, State, Pincode, Country
+        for i, part in enumerate(parts):
+            if STATE_PATTERN.search(part):
+                state = part
+                # City is usually the part before the state
+                if i > 0:
+                    city = parts[i - 1]
+                break
+
+    if city == DEFAULT_CITY and len(parts) >= 2:
+        for part in parts:
+            if part.lower() in KNOWN_CITIES:
+                city = part
+                break
+        if city == DEFAULT_CITY:
+            city = parts[-3] if len(parts) >= 3 else parts[-2]
+
+    if state == DEFAULT_STATE and len(parts) >= 2:
+        # Skip pincode and country
+        for part in reversed(parts):
+            if not part.isdigit() and part.lower() not in NOT_A_STATE and STATE_HINT_PATTERN.search(part):
+                state = part
+                break
+
+    return city, state
+
+
+def render_complaint_letter(issue_type, description, location, latitude=None, longitude=None,
+                            priority='normal', department='Public Works', user_id='anonymous', now=None):
+    """
+    Formal complaint letter with the submission's actual details (no placeholders).
+
+    Args:
+        issue_type: Type of issue (e.g., 'potholes')
+        description: User description (a per-issue default is used if empty)
+        location: Full address
+        latitude, longitude: GPS coordinates (omitted from the letter if either is falsy)
+        priority: Priority level (low, normal, high, urgent)
+        department: Assigned department name
+        user_id: User identifier
+        now: datetime used for the letter date (defaults to now)
+    """
+    issue = issue_type.replace('_', ' ').title()
+    issue_lower = issue.lower()
+    city, state = parse_city_state(location)
+    has_coordinates = bool(latitude and longitude)
+    priority_display = PRIORITY_DISPLAY.get(priority, 'Normal')
+    priority_lower = priority_display.lower()
+
+    if not description:
+        template = DEFAULT_DESCRIPTIONS.get(issue_type, FALLBACK_DESCRIPTION)
+        description = template.format(location=location, issue_lower=issue_lower)
+
+    letter = LETTER_TEMPLATES[has_coordinates].format(
+        user_id=user_id,
+        current_date=(now or datetime.now()).strftime('%B %d, %Y'),
+        city=city,
+        state=state,
+        issue=issue,
+        issue_lower=issue_lower,
+        location=location,
+        priority=priority_display,
+        priority_lower=priority_lower,
+        coordinates=f"Latitude: {latitude:.6f}° N\nLongitude: {longitude:.6f}° E" if has_coordinates else '',
+        department=department,
+        description=description,
+        urgency=URGENCY_SENTENCES[priority in URGENT_PRIORITIES].format(priority_lower=priority_lower),
+    )
+
+    # Only user-supplied text can bring these in
+    if '[' in letter:
+        letter = BRACKETED_PATTERN.sub('', letter)
+    if '\n\n\n' in letter:
+        letter = BLANK_LINES_PATTERN.sub('\n\n', letter)
+    return letter.strip()
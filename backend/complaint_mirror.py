@@ -0,0 +1,277 @@
+"""
+Process-local mirror of the `complaints` tree, kept current by Firebase listen().
+
+The Realtime Database streaming API starts every (re)connection with a `put` of
+the whole tree at '/', followed by `put`/`patch` events for each change. The
+mirror applies those to a raw copy of the tree, re-normalizes only the touched
+complaints and bumps a version counter, so read endpoints can be served from
+memory instead of a full `ref.get()` per request.
+
+A quiet database sends nothing the listener sees (keep-alives never reach the
+callback), so silence says nothing about the stream. The SSE client reconnects
+dropped connections by itself and starts again with a root `put`; the stream
+is only dead when listen() fails or the thread delivering events exits (a
+reconnect that fails outright ends it). A watchdog thread checks for that,
+marks the mirror not ready so reads fall back to Firebase, and re-opens the
+stream. Every `resync_interval` seconds it also forces a fresh connection (and
+so a full resync) as a safety net; if the previous one never delivered its
+snapshot, the mirror is marked not ready too. stats() reports the version and
+how long ago the last change and the last full sync were received.
+"""
+
+import os
+import threading
+import time
+
+
+class ComplaintMirror:
+    """Normalized complaints by id, mirrored from a Firebase reference."""
+
+    def __init__(self, reference_factory, normalize, resync_interval=900.0, check_interval=5.0):
+        """
+        Args:
+            reference_factory: callable returning the db.Reference to mirror
+            normalize: normalize(complaint_id, payload) -> dict
+            resync_interval: seconds between forced full resyncs (0 disables)
+            check_interval: seconds between watchdog liveness checks
+        """
+        self._reference_factory = reference_factory
+        self._normalize = normalize
+        self.resync_interval = resync_interval
+        self.check_interval = check_interval
+
+        self._raw = {}
+        self._complaints = {}
+        self._listing = None
+        self._listing_version = None
+        self._ordered = None
+        self._ordered_version = None
+        self._lock = threading.RLock()
+        self._start_lock = threading.Lock()
+        self._listeners = []
+
+        self._registration = None
+        self._generation = 0
+        self._connected_at = None
+        self._listener_thread = None
+        self._pid = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+        self.ready = False
+        self.version = 0
+        self.events = 0
+        self.resyncs = 0
+        self.reconnects = 0
+        self.last_event_at = None
+        self.last_sync_at = None
+        self.last_error = None
+
+    def add_listener(self, callback):
+        """callback(changed_ids, full) after each applied event; full=True on resync."""
+        self._listeners.append(callback)
+
+    # Lifecycle
+
+    def ensure_started(self):
+        """Start the listener once per process (safe to call on every request)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive fork: a preloaded master's mirror is discarded
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self.ready = False
+            self._connect()
+            self._watchdog = threading.Thread(target=self._watch, name='complaint-mirror-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._close_registration()
+        self._pid = None
+
+    def _connect(self):
+        self._close_registration()
+        self._generation += 1
+        generation = self._generation
+        self._connected_at = time.monotonic()
+        self._listener_thread = None
+        try:
+            self._registration = self._reference_factory().listen(
+                lambda event: self._on_event(event, generation)
+            )
+        except Exception as exc:
+            self.last_error = str(exc)
+            self._registration = None
+            self.ready = False
+            print(f"[WARN] Complaint mirror could not connect: {exc}")
+
+    def _close_registration(self):
+        registration, self._registration = self._registration, None
+        if registration is None:
+            return
+        try:
+            registration.close()
+        except Exception as exc:
+            print(f"[WARN] Closing complaint mirror listener failed: {exc}")
+
+    def connected(self):
+        """True if listen() succeeded and the thread delivering its events is still running."""
+        if self._registration is None:
+            return False
+        # Unknown until the first event; the root snapshot follows right after listen()
+        thread = self._listener_thread
+        return thread is None or thread.is_alive()
+
+    def _synced(self):
+        """True once the current stream has delivered its full snapshot."""
+        return self.last_sync_at is not None and self.last_sync_at >= self._connected_at
+
+    def _watch(self):
+        while not self._stopped.wait(self.check_interval):
+            self._check()
+
+    def _check(self):
+        if not self.connected():
+            if self._registration is not None:
+                self.last_error = 'Listener thread exited'
+            message = "[WARN] Complaint mirror stream lost; reconnecting"
+        elif self.resync_interval > 0 and \
+                time.monotonic() - max(self.last_sync_at or 0.0, self._connected_at) > self.resync_interval:
+            if self._synced():
+                # The data stays current until the new stream's snapshot replaces it
+                self.reconnects += 1
+                print("[OK] Complaint mirror periodic resync")
+                self._connect()
+                return
+            message = "[WARN] Complaint mirror resync did not arrive; reconnecting"
+        else:
+            return
+        # Serve reads from Firebase until the new stream has resynced
+        self.ready = False
+        self.reconnects += 1
+        print(message)
+        self._connect()
+
+    # Event application
+
+    def _on_event(self, event, generation):
+        if generation != self._generation:
+            return  # late event from a replaced stream
+        # Events arrive on the listener's own thread: remember it for connected()
+        self._listener_thread = threading.current_thread()
+        try:
+            event_type = event.event_type
+            if event_type not in ('put', 'patch'):
+                return
+            path, data = event.path, event.data
+        except Exception as exc:
+            self.last_error = f'Unreadable event: {exc}'
+            return
+
+        parts = [part for part in (path or '/').split('/') if part]
+        with self._lock:
+            full = event_type == 'put' and not parts
+            if full:
+                self._raw = dict(data) if isinstance(data, dict) else {}
+                changed = None
+            elif event_type == 'put':
+                self._set_path(parts, data)
+                changed = {parts[0]}
+            else:
+                changed = set()
+                for key, value in (data or {}).items():
+                    child = parts + [part for part in key.split('/') if part]
+                    self._set_path(child, value)
+                    changed.add(child[0])
+
+            if full:
+                self._complaints = {
+                    complaint_id: self._normalize(complaint_id, payload)
+                    for complaint_id, payload in self._raw.items()
+                    if isinstance(payload, dict)
+                }
+                self.resyncs += 1
+                self.last_sync_at = time.monotonic()
+                self.ready = True
+            else:
+                for complaint_id in changed:
+                    payload = self._raw.get(complaint_id)
+                    if isinstance(payload, dict):
+                        self._complaints[complaint_id] = self._normalize(complaint_id, payload)
+                    else:
+                        self._complaints.pop(complaint_id, None)
+
+            self.version += 1
+            self.events += 1
+            self.last_event_at = time.monotonic()
+
+        for callback in self._listeners:
+            try:
+                callback(changed or (), full)
+            except Exception as exc:
+                print(f"[WARN] Complaint mirror listener failed: {exc}")
+
+    def _set_path(self, parts, value):
+        """Set (or delete, for None) raw[parts...]. Caller holds the lock."""
+        node = self._raw
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+    # Reads
+
+    def get(self, complaint_id):
+        """Copy of the normalized complaint, or None."""
+        with self._lock:
+            complaint = self._complaints.get(complaint_id)
+            return dict(complaint) if complaint is not None else None
+
+    def complaints(self):
+        """All normalized complaints. Shared between callers: treat as read-only."""
+        with self._lock:
+            if self._listing_version != self.version:
+                self._listing = list(self._complaints.values())
+                self._listing_version = self.version
+            return self._listing
+
+    def ordered(self):
+        """
+        (ids, complaints) sorted by id - push ids sort chronologically. Rebuilt
+        once per version and shared between callers: treat as read-only.
+        """
+        with self._lock:
+            if self._ordered_version != self.version:
+                ids = sorted(self._complaints)
+                self._ordered = (ids, [self._complaints[complaint_id] for complaint_id in ids])
+                self._ordered_version = self.version
+            return self._ordered
+
+    def __len__(self):
+        return len(self._complaints)
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'ready': self.ready,
+            'connected': self.connected(),
+            'version': self.version,
+            'complaints': len(self._complaints),
+            'events': self.events,
+            'resyncs': self.resyncs,
+            'reconnects': self.reconnects,
+            'last_event_age_seconds': now - self.last_event_at if self.last_event_at else None,
+            'last_sync_age_seconds': now - self.last_sync_at if self.last_sync_at else None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,142 @@
+"""
+Department work queues behind /api/department/<name>/queue.
+
+Complaints are indexed by department and then by status, and each
+(department, status) bucket is a list kept sorted by queue order: priority
+(urgent first), then age (oldest first), then id. The department alone is the
+union of its status buckets. A queue request merges the already sorted buckets
+for the statuses asked for and stops after `limit` entries, so it never visits
+other departments or complaints past the top N.
+
+Department names match case-insensitively and ignoring surrounding spaces,
+like the department dashboard's own filter.
+"""
+
+import bisect
+import heapq
+import itertools
+import threading
+import time
+
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
+UNRANKED = len(PRIORITY_RANK)
+
+# Fields kept per complaint; everything a queue entry returns
+QUEUE_FIELDS = (
+    'id', 'user_id', 'issue_type', 'status', 'priority', 'department', 'address', 'description',
+    'latitude', 'longitude', 'image_path', 'created_at', 'updated_at', 'processing',
+)
+
+
+def department_key(name):
+    """Index key of a department name, or None if it is blank."""
+    if name is None:
+        return None
+    key = str(name).strip().casefold()
+    return key or None
+
+
+def queue_order(complaint):
+    """Sort key of a complaint within its queue."""
+    rank = PRIORITY_RANK.get(str(complaint.get('priority') or 'normal').lower(), UNRANKED)
+    # Complaints without a timestamp go after every dated one of the same priority
+    return (rank, str(complaint.get('created_at') or '~'), str(complaint.get('id')))
+
+
+class DepartmentQueueIndex:
+    """
+    Thread-safe department -> status -> sorted queue index, keyed by complaint id.
+    """
+
+    def __init__(self):
+        self._queues = {}   # department key -> {status: [queue_order tuples]}
+        self._records = {}  # complaint id -> record
+        self._entry_of = {}  # complaint id -> (department key, status, queue_order tuple)
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._entry_of)
+
+    def is_stale(self, max_age):
+        """True if never built or last full rebuild is older than `max_age` seconds."""
+        return self.built_at is None or (max_age >= 0 and time.monotonic() - self.built_at > max_age)
+
+    def rebuild(self, complaints):
+        """Replace the index contents with `complaints` (normalized dicts)."""
+        with self._lock:
+            self._queues = {}
+            self._records = {}
+            self._entry_of = {}
+            for complaint in complaints:
+                self._insert(complaint, presorted=False)
+            for buckets in self._queues.values():
+                for entries in buckets.values():
+                    entries.sort()
+            self.built_at = time.monotonic()
+
+    def upsert(self, complaint):
+        """Insert or update one complaint; partial dicts merge into the stored record."""
+        with self._lock:
+            stored = self._records.get(complaint.get('id'))
+            if stored is not None:
+                merged = dict(stored)
+                merged.update({k: v for k, v in complaint.items() if k in QUEUE_FIELDS})
+                self._remove(complaint['id'])
+                complaint = merged
+            self._insert(complaint)
+
+    def remove(self, complaint_id):
+        with self._lock:
+            self._remove(complaint_id)
+
+    def _insert(self, complaint, presorted=True):
+        complaint_id = complaint.get('id')
+        department = department_key(complaint.get('department'))
+        if complaint_id is None or department is None:
+            return
+        record = {field: complaint.get(field) for field in QUEUE_FIELDS}
+        status = record['status'] or 'pending'
+        entry = queue_order(record)
+
+        entries = self._queues.setdefault(department, {}).setdefault(status, [])
+        if presorted:
+            bisect.insort(entries, entry)
+        else:
+            entries.append(entry)
+        self._records[complaint_id] = record
+        self._entry_of[complaint_id] = (department, status, entry)
+
+    def _remove(self, complaint_id):
+        located = self._entry_of.pop(complaint_id, None)
+        if located is None:
+            return
+        department, status, entry = located
+        self._records.pop(complaint_id, None)
+        buckets = self._queues[department]
+        entries = buckets[status]
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+        if not entries:
+            del buckets[status]
+            if not buckets:
+                del self._queues[department]
+
+    def counts(self, department):
+        """{status: number of complaints} for one department."""
+        with self._lock:
+            buckets = self._queues.get(department_key(department)) or {}
+            return {status: len(entries) for status, entries in buckets.items()}
+
+    def queue(self, department, statuses=None, limit=50):
+        """
+        The first `limit` complaints of `department` in queue order, restricted
+        to `statuses` (an iterable, or None for every status).
+        """
+        with self._lock:
+            buckets = self._queues.get(department_key(department)) or {}
+            if statuses is not None:
+                buckets = {status: buckets[status] for status in statuses if status in buckets}
+            merged = heapq.merge(*buckets.values())
+            return [dict(self._records[entry[2]]) for entry in itertools.islice(merged, limit)]
@@ -0,0 +1,129 @@
+"""
+Local stand-in for the Hugging Face classifier Space.
+
+Serves POST /predict (base64 JSON) and POST /predict/upload (raw bytes) with a
+canned prediction, and can be told to be slow or to fail, so the backend's
+classifier client (timeouts, retries, circuit breaker) can be exercised without
+network access:
+
+    with FakeClassifierServer(fail_times=2) as fake:
+        client = ClassifierClient(fake.url)
+        client.predict_bytes(b'...')   # succeeds on the third attempt
+
+or run it standalone and point HF_CLASSIFIER_URL at it:
+
+    python fake_classifier.py --port 7860 --delay 0.2
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeClassifierServer:
+    """Threaded HTTP server answering like the classifier Space."""
+
+    def __init__(self, host='127.0.0.1', port=0, prediction=None, delay=0.0,
+                 fail_times=0, fail_status=503, upload_endpoint=True, missing_upload_status=404):
+        """
+        Args:
+            port: 0 picks a free port; read the chosen one from .url
+            prediction: JSON body returned on success
+            delay: seconds to sleep before answering each request
+            fail_times: answer the first N requests with `fail_status`
+            upload_endpoint: if False, /predict/upload is missing (old Space)
+            missing_upload_status: status of the missing upload endpoint (404 or 405)
+        """
+        self.prediction = prediction or {'issue_type': 'potholes', 'confidence': 0.93}
+        self.delay = delay
+        self.fail_times = fail_times
+        self.fail_status = fail_status
+        self.upload_endpoint = upload_endpoint
+        self.missing_upload_status = missing_upload_status
+        self.requests = []  # (path, content_type, body_length)
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real Space
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (e.g. read timeout under test)
+
+            def do_GET(self):
+                self._send(200, {'status': 'ok'} if self.path == '/health' else {'detail': 'Not Found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                with server._lock:
+                    server.requests.append((self.path, self.headers.get('Content-Type'), length))
+                    failing = len(server.requests) <= server.fail_times
+                if server.delay:
+                    time.sleep(server.delay)
+                if self.path == '/predict/upload' and not server.upload_endpoint:
+                    self._send(server.missing_upload_status, {'detail': 'Not Found'})
+                elif self.path not in ('/predict', '/predict/upload'):
+                    self._send(404, {'detail': 'Not Found'})
+                elif failing:
+                    self._send(server.fail_status, {'detail': 'Injected failure'})
+                else:
+                    self._send(200, server.prediction)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/predict'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake classifier Space locally.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7860)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--fail-times', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeClassifierServer(args.host, args.port, delay=args.delay, fail_times=args.fail_times)
+    print(f"[OK] Fake classifier listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""
+Reverse-geocoding layer for complaint submission.
+
+ReverseGeocoder sits in front of a pluggable provider (Nominatim by default,
+or a local stand-in) and adds:
+
+    - a cache keyed on coordinates rounded to `precision` decimals (4 ~ 11 m):
+      an in-memory LRU in front of a persistent SQLite table, so addresses
+      survive restarts and are shared by every worker on the host
+    - a token-bucket rate limiter (Nominatim's usage policy is 1 request/s)
+    - coalescing of identical in-flight lookups, so a burst of submissions from
+      the same spot costs one upstream request
+
+lookup() tells a real "not found" apart from a lookup that could not be made:
+provider failures, and lookups that cannot get a token within `wait_timeout`,
+raise GeocodingUnavailable so callers can retry later. reverse() keeps the old
+contract and returns "Address not found" for both. Neither is cached.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from shared import metrics
+
+ADDRESS_NOT_FOUND = "Address not found"
+
+
+class GeocodingUnavailable(RuntimeError):
+    """The lookup was rate limited or the provider failed; worth retrying later."""
+
+
+class GeocodingProvider:
+    """Resolves coordinates to an address string (None if nothing was found)."""
+
+    name = 'base'
+
+    def reverse(self, lat, lon):
+        raise NotImplementedError
+
+
+def format_address(addr, fallback=None):
+    """Friendly one-line address from a Nominatim `address` dict."""
+    parts = []
+    # Prefer a friendly place name if available
+    for key in ['name', 'amenity', 'building', 'shop', 'poi']:
+        val = addr.get(key)
+        if val:
+            parts.append(val)
+            break
+    # Road / house no
+    road_bits = []
+    if addr.get('house_number'):
+        road_bits.append(addr.get('house_number'))
+    if addr.get('road'):
+        road_bits.append(addr.get('road'))
+    if road_bits:
+        parts.append(' '.join(road_bits))
+    # Area / city
+    for key in ['neighbourhood', 'suburb', 'city_district', 'city', 'town', 'village']:
+        val = addr.get(key)
+        if val:
+            parts.append(val)
+            break
+    # State / postcode / country
+    if addr.get('state'):
+        parts.append(addr.get('state'))
+    if addr.get('postcode'):
+        parts.append(addr.get('postcode'))
+    if addr.get('country'):
+        parts.append(addr.get('country'))
+    friendly = ', '.join([p for p in parts if p])
+    return friendly or fallback
+
+
+class NominatimProvider(GeocodingProvider):
+    """OpenStreetMap Nominatim through one shared geopy client."""
+
+    name = 'nominatim'
+
+    def __init__(self, user_agent, timeout=5.0, domain=None):
+        from geopy.geocoders import Nominatim
+
+        kwargs = {'user_agent': user_agent, 'timeout': timeout}
+        if domain:
+            kwargs['domain'] = domain
+        self.client = Nominatim(**kwargs)
+
+    def reverse(self, lat, lon):
+        # Request detailed address with higher zoom for POI-level names
+        location = self.client.reverse(
+            (lat, lon),
+            exactly_one=True,
+            addressdetails=True,
+            zoom=18,
+            language='en'
+        )
+        if not location:
+            return None
+        addr = location.raw.get('address', {}) if hasattr(location, 'raw') else {}
+        return format_address(addr, getattr(location, 'address', None))
+
+
+class StaticProvider(GeocodingProvider):
+    """
+    Offline stand-in: answers from a {(lat, lon): address} mapping (keys
+    rounded like the cache) or with the coordinates themselves. `delay`
+    simulates upstream latency; `calls` counts lookups.
+    """
+
+    name = 'static'
+
+    def __init__(self, addresses=None, delay=0.0, precision=4):
+        self.precision = precision
+        self.addresses = {
+            (round(lat, precision), round(lon, precision)): address
+            for (lat, lon), address in (addresses or {}).items()
+        }
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reverse(self, lat, lon):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        key = (round(lat, self.precision), round(lon, self.precision))
+        return self.addresses.get(key, f"{key[0]:.{self.precision}f}, {key[1]:.{self.precision}f}")
+
+
+PROVIDERS = {
+    'nominatim': NominatimProvider,
+    'static': StaticProvider,
+}
+
+
+def create_provider(name, **kwargs):
+    try:
+        provider_cls = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown geocoding provider {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return provider_cls(**kwargs)
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to `timeout` seconds. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class GeocodeCache:
+    """
+    Address cache: an LRU dict of `max_entries` in front of a SQLite table.
+    `path=None` keeps it in memory only.
+    """
+
+    def __init__(self, path=None, max_entries=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _connection(self):
+        """SQLite connection for this process (opened lazily: connections must not cross fork)."""
+        if not self.path:
+            return None
+        if self._db_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS reverse_geocode ('
+                'key TEXT PRIMARY KEY, address TEXT NOT NULL, provider TEXT, created_at REAL NOT NULL)'
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        """(address, tier) with tier 'memory' or 'sqlite', or (None, None)."""
+        with self._lock:
+            address = self._memory.get(key)
+            if address is not None:
+                self._memory.move_to_end(key)
+                return address, 'memory'
+            db = self._connection()
+            if db is None:
+                return None, None
+            row = db.execute('SELECT address FROM reverse_geocode WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None, None
+            self._remember(key, row[0])
+            return row[0], 'sqlite'
+
+    def put(self, key, address, provider=None):
+        with self._lock:
+            self._remember(key, address)
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    'INSERT OR REPLACE INTO reverse_geocode (key, address, provider, created_at) VALUES (?, ?, ?, ?)',
+                    (key, address, provider, time.time())
+                )
+                db.commit()
+
+    def _remember(self, key, address):
+        self._memory[key] = address
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            persisted = None
+            db = self._connection()
+            if db is not None:
+                persisted = db.execute('SELECT COUNT(*) FROM reverse_geocode').fetchone()[0]
+            return {'memory_entries': len(self._memory), 'persisted_entries': persisted, 'path': self.path}
+
+
+class ReverseGeocoder:
+    """Cached, rate-limited, coalescing reverse geocoder."""
+
+    def __init__(self, provider, cache=None, limiter=None, precision=4, wait_timeout=5.0):
+        """
+        Args:
+            provider: GeocodingProvider answering cache misses
+            cache: GeocodeCache (defaults to an in-memory one)
+            limiter: TokenBucket guarding the provider (None: unlimited)
+            precision: decimals kept from coordinates for the cache key
+            wait_timeout: seconds a lookup may wait for a rate-limit token
+        """
+        self.provider = provider
+        self.cache = cache or GeocodeCache()
+        self.limiter = limiter
+        self.precision = precision
+        self.wait_timeout = wait_timeout
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'memory_hits': 0,
+            'sqlite_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'provider_calls': 0,
+            'rate_limited': 0,
+            'errors': 0,
+        }
+
+    def key(self, lat, lon):
+        return f"{round(float(lat), self.precision):.{self.precision}f},{round(float(lon), self.precision):.{self.precision}f}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def reverse(self, lat, lon):
+        """Address for (lat, lon), or "Address not found" (also when the lookup could not be made)."""
+        try:
+            return self.lookup(lat, lon)
+        except GeocodingUnavailable:
+            return ADDRESS_NOT_FOUND
+
+    def cached(self, lat, lon):
+        """Cached address for (lat, lon), or None. Never calls the provider or waits for a token."""
+        try:
+            key = self.key(lat, lon)
+        except (TypeError, ValueError):
+            return None
+        address, tier = self.cache.get(key)
+        if address is not None:
+            self._count(f'{tier}_hits')
+        return address
+
+    def lookup(self, lat, lon):
+        """
+        Address for (lat, lon), or "Address not found" if the provider has
+        none. Raises GeocodingUnavailable if the rate limit or a provider error
+        prevented the lookup.
+        """
+        try:
+            key = self.key(lat, lon)
+        except (TypeError, ValueError):
+            return ADDRESS_NOT_FOUND
+
+        address, tier = self.cache.get(key)
+        if address is not None:
+            self._count(f'{tier}_hits')
+            return address
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.counters['misses'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            address = self._lookup(key, float(lat), float(lon))
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            # Coalesced callers share the failure
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(address)
+        return address
+
+    def _lookup(self, key, lat, lon):
+        if self.limiter is not None and not self.limiter.acquire(self.wait_timeout):
+            self._count('rate_limited')
+            print(f"[WARN] Reverse geocoding rate limit reached; skipping lookup for {key}")
+            raise GeocodingUnavailable(f"Reverse geocoding rate limit reached for {key}")
+        self._count('provider_calls')
+        try:
+            with metrics.stage(f'geocode_{self.provider.name}'):
+                address = self.provider.reverse(lat, lon)
+        except Exception as e:
+            self._count('errors')
+            print(f"Reverse geocoding error: {e}")
+            raise GeocodingUnavailable(f"Reverse geocoding failed: {e}") from e
+        if not address:
+            return ADDRESS_NOT_FOUND
+        self.cache.put(key, address, self.provider.name)
+        return address
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update(provider=self.provider.name, precision=self.precision, cache=self.cache.stats())
+        return counters
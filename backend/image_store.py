@@ -0,0 +1,184 @@
+"""
+Content-addressed storage for complaint photos.
+
+Images are written under `root` as <aa>/<bb>/<sha256>.<ext>: the name is the
+SHA-256 of the bytes (so a resubmitted photo is stored once), the extension
+comes from the file's magic bytes rather than the client, and the two-level
+shard keeps any one directory small. Writes stream through a temporary file in
+the same filesystem and are renamed into place, so readers never see a partial
+file and base64 payloads are decoded chunk by chunk instead of into one more
+full-size copy.
+
+Because a stored file never changes, it can be served with a strong ETag (its
+digest) and an immutable Cache-Control header.
+"""
+
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+# ext -> mimetype for everything detect_format() recognizes
+IMAGE_MIMETYPES = {
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'bmp': 'image/bmp',
+    'tiff': 'image/tiff',
+    'heic': 'image/heic',
+    'avif': 'image/avif',
+}
+
+HEADER_BYTES = 32
+CONTENT_ADDRESSED_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.([a-z]+)$')
+
+StoredImage = namedtuple('StoredImage', 'path digest ext mimetype size deduplicated')
+
+
+class ImageTooLarge(ValueError):
+    """The image exceeds the store's size limit."""
+
+
+class UnsupportedImage(ValueError):
+    """The bytes are not an image format the store accepts."""
+
+
+def detect_format(header):
+    """File extension for image bytes from their first bytes, or None."""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    if header[:2] == b'BM':
+        return 'bmp'
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in (b'avif', b'avis'):
+            return 'avif'
+        if brand in (b'heic', b'heix', b'hevc', b'hevx', b'mif1', b'msf1'):
+            return 'heic'
+    return None
+
+
+def split_data_url(image_data):
+    """(base64 payload, mime hint) from a data URL or a bare base64 string."""
+    if image_data.startswith('data:'):
+        header, _, payload = image_data.partition(',')
+        mime_hint = header[5:].split(';', 1)[0] or None
+        return payload, mime_hint
+    return image_data, None
+
+
+class ImageStore:
+    """Sharded, content-addressed image directory."""
+
+    def __init__(self, root, url_prefix='uploads', max_bytes=None, chunk_size=64 * 1024):
+        """
+        Args:
+            root: directory holding the shards
+            url_prefix: prefix of the stored relative paths (what goes in Firebase)
+            max_bytes: largest accepted image (None: unlimited)
+            chunk_size: bytes per streamed read/decode step
+        """
+        self.root = root
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def save_bytes(self, data):
+        return self._write([data])
+
+    def save_stream(self, stream):
+        """Store a file-like object, reading it in chunk_size pieces."""
+        return self._write(iter(lambda: stream.read(self.chunk_size), b''))
+
+    def save_base64(self, image_data):
+        """Store a base64 string or data URL, decoding it chunk by chunk."""
+        if not isinstance(image_data, str):
+            raise ValueError('Invalid image format. Expected a base64-encoded image string.')
+        payload, _ = split_data_url(image_data)
+        if any(ch in payload for ch in ' \n\r\t'):
+            payload = ''.join(payload.split())
+        # Multiple of 4 base64 characters per step keeps every chunk decodable on its own
+        step = (self.chunk_size // 3) * 4
+
+        def chunks():
+            for start in range(0, len(payload), step):
+                try:
+                    yield binascii.a2b_base64(payload[start:start + step])
+                except binascii.Error as exc:
+                    raise ValueError('Invalid image format. Expected a base64-encoded image string.') from exc
+
+        return self._write(chunks())
+
+    def _write(self, chunks):
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        header = b''
+        size = 0
+        fd, temp_path = tempfile.mkstemp(prefix='.upload-', dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if self.max_bytes is not None and size > self.max_bytes:
+                        raise ImageTooLarge(f'Image exceeds the {self.max_bytes} byte limit')
+                    if len(header) < HEADER_BYTES:
+                        header += chunk[:HEADER_BYTES - len(header)]
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            if not size:
+                raise UnsupportedImage('Empty image')
+            ext = detect_format(header)
+            if ext is None:
+                raise UnsupportedImage('Unsupported image format')
+
+            hex_digest = digest.hexdigest()
+            relative = f'{hex_digest[:2]}/{hex_digest[2:4]}/{hex_digest}.{ext}'
+            final_path = os.path.join(self.root, relative)
+            deduplicated = os.path.exists(final_path)
+            if deduplicated:
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return StoredImage(
+            path=f'{self.url_prefix}/{relative}',
+            digest=hex_digest,
+            ext=ext,
+            mimetype=IMAGE_MIMETYPES[ext],
+            size=size,
+            deduplicated=deduplicated
+        )
+
+    def lookup(self, filename):
+        """
+        (absolute path, digest, mimetype) for a content-addressed name such as
+        'uploads/ab/cd/<sha256>.jpg', or None for anything else.
+        """
+        if filename.startswith(self.url_prefix + '/'):
+            filename = filename[len(self.url_prefix) + 1:]
+        match = CONTENT_ADDRESSED_PATTERN.match(filename)
+        if match is None or match.group(2) not in IMAGE_MIMETYPES:
+            return None
+        if filename[:2] != match.group(1)[:2] or filename[3:5] != match.group(1)[2:4]:
+            return None
+        return os.path.join(self.root, filename), match.group(1), IMAGE_MIMETYPES[match.group(2)]
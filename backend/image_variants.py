@@ -0,0 +1,213 @@
+"""
+Resized variants of stored complaint photos (thumbnails for lists and map popups).
+
+Variants are generated on first request in a small bounded thread pool (with
+identical concurrent requests coalesced onto one job), written to a disk cache
+as <width>/<aa>/<sha256>.<ext> and served from there afterwards. The cache is
+kept under `max_bytes` by evicting the least recently used files.
+
+Requested widths snap up to the nearest configured width so the cache holds
+a handful of sizes per photo, and photos are never upscaled: if the original
+is already narrow enough, callers are told to serve the original instead.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from PIL import Image, ImageOps
+
+VARIANT_PRESETS = {'thumb': 160, 'small': 320, 'medium': 640, 'large': 1280}
+USE_ORIGINAL = 'original'
+
+
+class VariantCache:
+    """LRU-bounded disk cache of downscaled images, filled by a bounded pool."""
+
+    def __init__(self, root, widths=(160, 320, 640, 1280), max_bytes=512 * 1024 * 1024,
+                 workers=2, max_pending=32, quality=80):
+        """
+        Args:
+            root: cache directory
+            widths: widths variants are generated at (requests snap up to these)
+            max_bytes: total size of cached variants before LRU eviction
+            workers: generation threads
+            max_pending: queued + running generations before callers get None
+            quality: JPEG/WebP quality of generated variants
+        """
+        self.root = root
+        self.widths = tuple(sorted(widths))
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.quality = quality
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variant')
+        self._pending = {}
+        self._entries = None  # relative path -> size, in LRU order (loaded lazily)
+        self._total = 0
+        self._no_downscale = set()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'generated': 0, 'coalesced': 0, 'busy': 0, 'evicted': 0, 'errors': 0}
+
+    def resolve_width(self, width=None, preset=None):
+        """Configured width for ?w= / ?size=, or None if neither is given. Raises ValueError."""
+        if preset:
+            if preset not in VARIANT_PRESETS:
+                raise ValueError(f"Unknown size {preset!r}; expected one of {', '.join(VARIANT_PRESETS)}")
+            width = VARIANT_PRESETS[preset]
+        if width is None:
+            return None
+        if width < 1:
+            raise ValueError('w must be a positive integer')
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    def _load_entries(self):
+        """Index files already on disk (oldest access first). Caller holds the lock."""
+        if self._entries is not None:
+            return
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                full = os.path.join(directory, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                found.append((st.st_atime, os.path.relpath(full, self.root), st.st_size))
+        self._entries = OrderedDict((relative, size) for _, relative, size in sorted(found))
+        self._total = sum(self._entries.values())
+
+    def _relative(self, digest, width, ext):
+        return os.path.join(str(width), digest[:2], f'{digest}.{ext}')
+
+    def _cached(self, digest, width):
+        """Relative path of a cached variant, refreshing its LRU position. Caller holds the lock."""
+        for ext in ('jpg', 'png'):
+            relative = self._relative(digest, width, ext)
+            if relative in self._entries:
+                if os.path.exists(os.path.join(self.root, relative)):
+                    self._entries.move_to_end(relative)
+                    return relative
+                self._total -= self._entries.pop(relative)
+        return None
+
+    def get(self, source_path, digest, width, timeout=10.0):
+        """
+        Variant of `source_path` (content digest `digest`) at `width`.
+
+        Returns:
+            absolute path of the variant, USE_ORIGINAL if the original is no
+            wider than `width`, or None if the pool is saturated or generation
+            did not finish within `timeout` (serve the original instead)
+        """
+        key = (digest, width)
+        with self._lock:
+            self._load_entries()
+            if key in self._no_downscale:
+                return USE_ORIGINAL
+            relative = self._cached(digest, width)
+            if relative is not None:
+                self.counters['hits'] += 1
+                return os.path.join(self.root, relative)
+            future = self._pending.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.counters['busy'] += 1
+                return None
+            else:
+                future = self._executor.submit(self._generate, source_path, digest, width)
+                self._pending[key] = future
+                future.add_done_callback(lambda _, key=key: self._done(key))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+        except Exception as exc:
+            print(f"[WARN] Could not generate {width}px variant of {digest}: {exc}")
+            return None
+
+    def pregenerate(self, source_path, digest, widths):
+        """Queue variants at `widths` without waiting (used at submit time)."""
+        for width in widths:
+            self.get(source_path, digest, width, timeout=0)
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _generate(self, source_path, digest, width):
+        try:
+            with Image.open(source_path) as image:
+                if image.width <= width:
+                    with self._lock:
+                        self._no_downscale.add((digest, width))
+                    return USE_ORIGINAL
+                # Let the JPEG decoder skip detail it would throw away anyway
+                image.draft('RGB', (width, width))
+                image = ImageOps.exif_transpose(image)
+                has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    image = image.resize((width, height), Image.LANCZOS)
+
+                ext = 'png' if has_alpha else 'jpg'
+                relative = self._relative(digest, width, ext)
+                final_path = os.path.join(self.root, relative)
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix='.variant-', dir=os.path.dirname(final_path))
+                try:
+                    with os.fdopen(fd, 'wb') as temp:
+                        if has_alpha:
+                            image.save(temp, format='PNG', optimize=True)
+                        else:
+                            image.save(temp, format='JPEG', quality=self.quality, optimize=True, progressive=True)
+                    os.replace(temp_path, final_path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+        except Exception:
+            with self._lock:
+                self.counters['errors'] += 1
+            raise
+
+        size = os.path.getsize(final_path)
+        with self._lock:
+            self.counters['generated'] += 1
+            self._total += size - self._entries.pop(relative, 0)
+            self._entries[relative] = size
+            self._evict()
+        return final_path
+
+    def _evict(self):
+        """Drop least recently used variants until under max_bytes. Caller holds the lock."""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            relative, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.counters['evicted'] += 1
+            try:
+                os.remove(os.path.join(self.root, relative))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            self._load_entries()
+            counters = dict(self.counters)
+            counters.update(
+                files=len(self._entries),
+                bytes=self._total,
+                max_bytes=self.max_bytes,
+                pending=len(self._pending),
+                widths=list(self.widths),
+            )
+            return counters
@@ -0,0 +1,74 @@
+"""
+In-process classifier for the backend (CLASSIFIER_MODE=local / auto).
+
+Loads shared.model_inference.IssueClassifier lazily, once per worker process
+(so gunicorn --preload does not load it in the master and fork a copy per
+worker), and remembers load failures for a cool-down period so `auto` mode
+does not retry a missing model file on every request.
+"""
+
+import threading
+import time
+
+
+class LocalClassifier:
+    """Lazily loaded, process-wide IssueClassifier."""
+
+    def __init__(self, model_path, num_classes=6, backend='torch', quantization='none', retry_after=60.0):
+        self.model_path = model_path
+        self.num_classes = num_classes
+        self.backend = backend
+        self.quantization = quantization
+        self.retry_after = retry_after
+
+        self._classifier = None
+        self._load_error = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._classifier is not None
+
+    def get(self):
+        """Return the loaded IssueClassifier, loading it on first use."""
+        if self._classifier is not None:
+            return self._classifier
+
+        with self._lock:
+            if self._classifier is not None:
+                return self._classifier
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise RuntimeError(f'Local classifier unavailable: {self._load_error}')
+
+            try:
+                # Imported here so remote-only deployments never import the model stack
+                from shared.model_inference import IssueClassifier
+                self._classifier = IssueClassifier(
+                    model_path=self.model_path,
+                    num_classes=self.num_classes,
+                    backend=self.backend,
+                    quantization=self.quantization
+                )
+            except Exception as exc:
+                self._load_error = str(exc)
+                self._failed_at = time.monotonic()
+                print(f"[WARN] Local classifier failed to load: {exc}")
+                raise RuntimeError(f'Local classifier unavailable: {exc}') from exc
+
+            self._load_error = None
+            self._failed_at = None
+            return self._classifier
+
+    def classify(self, image_bytes):
+        """Classify encoded image bytes; same result shape as the HF Space."""
+        return self.get().classify_issue(image_bytes)
+
+    def status(self):
+        return {
+            'loaded': self.loaded,
+            'model_path': self.model_path,
+            'backend': self.backend,
+            'quantization': self.quantization,
+            'last_error': self._load_error,
+        }
@@ -0,0 +1,126 @@
+"""
+Rewrite stored complaints into the compact layout (see COMPLAINT_FIELD_ALIASES
+in app.py).
+
+For every record this drops the alias written next to a canonical key
+(user_id next to userId, issueType, imagePath, formalComplaint), renames an
+alias whose canonical key is missing, and drops the stored letter when
+rendering it from the record gives exactly the same text. Letters that differ
+(written by an older template, or before the priority was changed) are kept
+as formal_complaint, so nothing is lost.
+
+The tree is walked in key order, one order_by_key page and one multi-path
+update per batch, and the last processed key is saved to a checkpoint file:
+an interrupted run picks up where it stopped. Compact records produce no
+writes, so re-running from the start is safe too.
+
+    python migrate_compact_schema.py --dry-run
+    python migrate_compact_schema.py --batch-size 200
+    python migrate_compact_schema.py --restart    # ignore the checkpoint
+"""
+
+import argparse
+import json
+import os
+
+from app import (
+    COMPLAINT_FIELD_ALIASES, backend_dir, complaint_letter_for, get_db_reference, iter_complaint_pages,
+    letter_pending, normalize_complaint,
+)
+
+
+def record_size(payload):
+    return len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def compact_updates(complaint_id, payload, keep_letters=False):
+    """{field: value or None} turning one stored record into the compact layout."""
+    updates = {}
+    for alias, canonical in COMPLAINT_FIELD_ALIASES.items():
+        if alias not in payload:
+            continue
+        if payload.get(canonical) in (None, '') and payload[alias] not in (None, ''):
+            updates[canonical] = payload[alias]
+        updates[alias] = None
+
+    complaint = normalize_complaint(complaint_id, payload)
+    letter = complaint['formal_complaint']
+    if letter and not keep_letters and not letter_pending(complaint):
+        if complaint_letter_for(dict(complaint, formal_complaint=None)) == letter:
+            updates['formal_complaint'] = None
+    return updates
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(path, state):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite complaints into the compact storage layout.")
+    parser.add_argument('--batch-size', type=int, default=200, help='complaints per page and Firebase update')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many complaints')
+    parser.add_argument('--checkpoint', default=os.path.join(backend_dir, 'compact_schema_migration.json'),
+                        help='file recording progress between runs')
+    parser.add_argument('--restart', action='store_true', help='start from the first complaint')
+    parser.add_argument('--keep-letters', action='store_true', help='only drop aliases, keep stored letters')
+    parser.add_argument('--dry-run', action='store_true', help='report what would change, write nothing')
+    args = parser.parse_args()
+
+    state = {} if args.restart else load_checkpoint(args.checkpoint)
+    totals = state.get('totals') or {'scanned': 0, 'rewritten': 0, 'letters_dropped': 0,
+                                     'bytes_before': 0, 'bytes_after': 0}
+    after = state.get('last_key')
+    if after:
+        print(f"[OK] Resuming after {after} ({totals['scanned']} complaints already scanned)")
+
+    scanned_this_run = 0
+    for page in iter_complaint_pages(args.batch_size, after):
+        if args.limit is not None:
+            page = page[:args.limit - scanned_this_run]
+        updates = {}
+        for complaint_id, payload in page:
+            payload = payload if isinstance(payload, dict) else {}
+            changes = compact_updates(complaint_id, payload, args.keep_letters)
+            compacted = dict(payload)
+            for field, value in changes.items():
+                if value is None:
+                    compacted.pop(field, None)
+                else:
+                    compacted[field] = value
+                updates[f'{complaint_id}/{field}'] = value
+
+            totals['scanned'] += 1
+            totals['rewritten'] += bool(changes)
+            totals['letters_dropped'] += 'formal_complaint' in changes and changes['formal_complaint'] is None
+            totals['bytes_before'] += record_size(payload)
+            totals['bytes_after'] += record_size(compacted)
+
+        if updates and not args.dry_run:
+            get_db_reference('complaints').update(updates)
+        scanned_this_run += len(page)
+        if not args.dry_run:
+            save_checkpoint(args.checkpoint, {'last_key': page[-1][0], 'totals': totals})
+        print(f"[OK] {totals['scanned']} scanned, {totals['rewritten']} rewritten (through {page[-1][0]})")
+        if args.limit is not None and scanned_this_run >= args.limit:
+            break
+
+    saved = totals['bytes_before'] - totals['bytes_after']
+    share = saved / totals['bytes_before'] if totals['bytes_before'] else 0.0
+    print(f"[OK] {totals['rewritten']}/{totals['scanned']} complaints rewritten, "
+          f"{totals['letters_dropped']} stored letters dropped, "
+          f"{totals['bytes_before']} -> {totals['bytes_after']} bytes ({share:.0%} smaller)"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Client-side Firebase push ids.
+
+Reference.push() costs a round trip per record because the server names the
+child. Generating the same kind of id locally lets a batch of new records go
+out in one multi-path update() instead. The ids follow the Firebase client
+SDKs' scheme: 8 characters of millisecond timestamp followed by 12 random
+characters, all from an alphabet that sorts in ASCII order, so they stay
+chronological (the /api/all-complaints cursor relies on that) and ids made in
+the same millisecond by this process still sort in creation order.
+"""
+
+import random
+import threading
+import time
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+_random = random.SystemRandom()
+_lock = threading.Lock()
+_last_time = 0
+_last_random = [0] * 12
+
+
+def generate_push_id(now_ms=None):
+    """A new 20-character push id."""
+    global _last_time
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    with _lock:
+        if now_ms == _last_time:
+            # Same millisecond: increment the random part so ids keep their order
+            for position in range(11, -1, -1):
+                if _last_random[position] != 63:
+                    _last_random[position] += 1
+                    break
+                _last_random[position] = 0
+        else:
+            _last_time = now_ms
+            for position in range(12):
+                _last_random[position] = _random.randrange(64)
+        random_chars = ''.join(PUSH_CHARS[value] for value in _last_random)
+
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[now_ms % 64])
+        now_ms //= 64
+    return ''.join(reversed(time_chars)) + random_chars
@@ -0,0 +1,48 @@
+"""
+Recompute the dashboard rollups (complaint_stats) from the complaints.
+
+The counters are normally adjusted incrementally by the backend's write
+paths; this rebuilds them from scratch, which picks up complaints the web app
+wrote straight to Firebase and repairs any drift. It reads the tree one
+order_by_key page at a time and replaces the node with a single set(), so run
+it when few writes are in flight (or on a schedule, e.g. nightly).
+
+    python rebuild_aggregates.py --dry-run
+    python rebuild_aggregates.py --batch-size 500
+"""
+
+import argparse
+
+from aggregates import rollup
+from app import AGGREGATES_PATH, get_db_reference, iter_complaint_pages, normalize_complaint
+
+
+def iter_complaints(batch_size):
+    for page in iter_complaint_pages(batch_size):
+        for complaint_id, payload in page:
+            yield normalize_complaint(complaint_id, payload if isinstance(payload, dict) else {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the complaint aggregates node from scratch.")
+    parser.add_argument('--batch-size', type=int, default=500, help='complaints read per Firebase query')
+    parser.add_argument('--dry-run', action='store_true', help='compute and print the counts, write nothing')
+    args = parser.parse_args()
+
+    tree = rollup(iter_complaints(args.batch_size))
+    summary = tree.get('summary', {})
+    print(f"[OK] {summary.get('total', 0)} complaints, "
+          f"{len(tree.get('daily', {}))} days, {len(tree.get('weekly', {}))} weeks")
+    for group, counts in sorted(summary.items()):
+        if isinstance(counts, dict):
+            print(f"  {group}: {dict(sorted(counts.items()))}")
+
+    if args.dry_run:
+        print("[OK] Dry run, nothing written")
+        return
+    get_db_reference(AGGREGATES_PATH).set(tree)
+    print(f"[OK] Wrote /{AGGREGATES_PATH}")
+
+
+if __name__ == '__main__':
+    main()
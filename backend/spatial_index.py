@@ -0,0 +1,348 @@
+"""
+Grid (lat/lon bucket) indexes over complaint coordinates.
+
+GridSpatialIndex backs /api/complaints-map: complaints are bucketed into
+fixed-size cells of `cell_size_deg` degrees, a radius query only visits the
+cells overlapping the query's bounding box, runs a vectorized haversine filter
+over the candidates and returns matches sorted by distance. Each cell keeps its
+members in a dict plus lazily rebuilt numpy arrays, so upserts stay O(1) and
+queries stay vectorized.
+
+HeatmapGrid backs /api/heatmap-data: one hash-grid cell per cluster, built in a
+single pass, updated in place on writes and versioned so rendered payloads can
+be cached until the data changes.
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+# Fields kept per complaint; everything /api/complaints-map returns
+MAP_FIELDS = ('id', 'latitude', 'longitude', 'issue_type', 'status', 'priority')
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from (lat, lon) to each of lats/lons (arrays)."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2.0) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class _Cell:
+    __slots__ = ('records', '_ids', '_lats', '_lons')
+
+    def __init__(self):
+        self.records = {}
+        self._ids = None
+        self._lats = None
+        self._lons = None
+
+    def invalidate(self):
+        self._ids = None
+
+    def arrays(self):
+        if self._ids is None:
+            self._ids = list(self.records)
+            self._lats = np.fromiter((self.records[i]['latitude'] for i in self._ids), dtype=np.float64, count=len(self._ids))
+            self._lons = np.fromiter((self.records[i]['longitude'] for i in self._ids), dtype=np.float64, count=len(self._ids))
+        return self._ids, self._lats, self._lons
+
+
+def _coordinates(complaint):
+    """(lat, lon) floats of a complaint dict, or None if missing/invalid."""
+    try:
+        return float(complaint['latitude']), float(complaint['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class _Grid:
+    """Cell addressing, locking and rebuild bookkeeping shared by both grids."""
+
+    def __init__(self, cell_size_deg):
+        self.cell_size = cell_size_deg
+        self._cells = {}
+        self._cell_of = {}
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    def _cell_key(self, lat, lon):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size)))
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def is_stale(self, max_age):
+        """True if never built or last full rebuild is older than `max_age` seconds."""
+        return self.built_at is None or (max_age >= 0 and time.monotonic() - self.built_at > max_age)
+
+
+class GridSpatialIndex(_Grid):
+    """
+    Thread-safe grid index of complaint map records, keyed by complaint id.
+    """
+
+    def __init__(self, cell_size_deg=0.01):
+        """
+        Args:
+            cell_size_deg: cell edge in degrees (0.01 deg is ~1.1 km of latitude)
+        """
+        super().__init__(cell_size_deg)
+
+    def rebuild(self, complaints):
+        """Replace the index contents with `complaints` (normalized dicts)."""
+        with self._lock:
+            self._cells = {}
+            self._cell_of = {}
+            for complaint in complaints:
+                self._insert(complaint)
+            self.built_at = time.monotonic()
+
+    def upsert(self, complaint):
+        """Insert or update one complaint; partial dicts merge into the stored record."""
+        with self._lock:
+            existing_key = self._cell_of.get(complaint.get('id'))
+            if existing_key is not None:
+                merged = dict(self._cells[existing_key].records[complaint['id']])
+                merged.update({k: v for k, v in complaint.items() if k in MAP_FIELDS})
+                self._remove(complaint['id'])
+                complaint = merged
+            self._insert(complaint)
+
+    def remove(self, complaint_id):
+        with self._lock:
+            self._remove(complaint_id)
+
+    def _insert(self, complaint):
+        coords = _coordinates(complaint)
+        complaint_id = complaint.get('id')
+        if complaint_id is None or coords is None:
+            return
+        lat, lon = coords
+        record = {field: complaint.get(field) for field in MAP_FIELDS}
+        record['latitude'], record['longitude'] = lat, lon
+
+        key = self._cell_key(lat, lon)
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = _Cell()
+        cell.records[complaint_id] = record
+        cell.invalidate()
+        self._cell_of[complaint_id] = key
+
+    def _remove(self, complaint_id):
+        key = self._cell_of.pop(complaint_id, None)
+        if key is None:
+            return
+        cell = self._cells[key]
+        cell.records.pop(complaint_id, None)
+        if cell.records:
+            cell.invalidate()
+        else:
+            del self._cells[key]
+
+    def query_radius(self, lat, lon, radius_km, limit=None):
+        """
+        Return [(record, distance_km), ...] within `radius_km`, nearest first.
+        """
+        dlat = radius_km / KM_PER_DEG_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+
+        min_row, min_col = self._cell_key(lat - dlat, lon - dlon)
+        max_row, max_col = self._cell_key(lat + dlat, lon + dlon)
+
+        ids, lats, lons, owners = [], [], [], []
+        with self._lock:
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+                # Huge radius: walking the occupied cells is cheaper than the box
+                candidate_keys = [
+                    key for key in self._cells
+                    if min_row <= key[0] <= max_row and min_col <= key[1] <= max_col
+                ]
+            else:
+                candidate_keys = [
+                    (row, col)
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    if (row, col) in self._cells
+                ]
+            for key in candidate_keys:
+                cell = self._cells[key]
+                cell_ids, cell_lats, cell_lons = cell.arrays()
+                ids.append(cell_ids)
+                lats.append(cell_lats)
+                lons.append(cell_lons)
+                owners.append(cell.records)
+
+            if not ids:
+                return []
+
+            all_lats = np.concatenate(lats)
+            all_lons = np.concatenate(lons)
+            distances = haversine_km(lat, lon, all_lats, all_lons)
+            matches = np.nonzero(distances <= radius_km)[0]
+            order = matches[np.argsort(distances[matches], kind='stable')]
+            if limit is not None:
+                order = order[:limit]
+
+            # Map flat positions back to (cell, id)
+            owner_of = np.repeat(np.arange(len(ids)), [len(cell_ids) for cell_ids in ids])
+            flat_ids = list(itertools.chain.from_iterable(ids))
+            return [
+                (dict(owners[owner_of[position]][flat_ids[position]]), float(distances[position]))
+                for position in order.tolist()
+            ]
+
+
+class _Cluster:
+    __slots__ = ('count', 'sum_lat', 'sum_lon', 'members', 'issue_types', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.members = {}
+        self.issue_types = Counter()
+        self.statuses = Counter()
+
+
+class HeatmapGrid(_Grid):
+    """
+    Heatmap clusters as hash-grid cells of `cell_size_deg` degrees.
+
+    Each cluster is centred on the mean position of its complaints; its weight
+    is count / full_weight_count, capped at 1.0. `version` changes whenever the
+    clusters do, so callers can cache rendered output per version.
+    """
+
+    def __init__(self, cell_size_deg=0.001, full_weight_count=5):
+        """
+        Args:
+            cell_size_deg: cluster cell edge in degrees (0.001 deg is ~100 m)
+            full_weight_count: complaints needed for a cluster to reach weight 1.0
+        """
+        super().__init__(cell_size_deg)
+        self.full_weight_count = full_weight_count
+        self.version = 0
+        self._rendered = {}
+
+    def rebuild(self, complaints):
+        """Replace all clusters with ones built from `complaints` in one pass."""
+        with self._lock:
+            self._cells = {}
+            self._cell_of = {}
+            for complaint in complaints:
+                self._insert(complaint)
+            self._changed()
+            self.built_at = time.monotonic()
+
+    def upsert(self, complaint):
+        """Add or move one complaint; partial dicts merge into the stored record."""
+        with self._lock:
+            key = self._cell_of.get(complaint.get('id'))
+            if key is not None:
+                stored = self._cells[key].members[complaint['id']]
+                merged = dict(stored, latitude=stored['_lat'], longitude=stored['_lon'])
+                merged.update({k: v for k, v in complaint.items() if k in MAP_FIELDS})
+                self._remove(complaint['id'])
+                complaint = merged
+            self._insert(complaint)
+            self._changed()
+
+    def remove(self, complaint_id):
+        with self._lock:
+            if complaint_id in self._cell_of:
+                self._remove(complaint_id)
+                self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._rendered = {}
+
+    def _insert(self, complaint):
+        coords = _coordinates(complaint)
+        complaint_id = complaint.get('id')
+        if complaint_id is None or coords is None:
+            return
+        lat, lon = coords
+        key = self._cell_key(lat, lon)
+        cluster = self._cells.get(key)
+        if cluster is None:
+            cluster = self._cells[key] = _Cluster()
+        cluster.count += 1
+        cluster.sum_lat += lat
+        cluster.sum_lon += lon
+        cluster.members[complaint_id] = {
+            'id': complaint_id,
+            'issue_type': complaint.get('issue_type'),
+            'status': complaint.get('status'),
+            'priority': complaint.get('priority'),
+            '_lat': lat,
+            '_lon': lon,
+        }
+        cluster.issue_types[complaint.get('issue_type')] += 1
+        cluster.statuses[complaint.get('status')] += 1
+        self._cell_of[complaint_id] = key
+
+    def _remove(self, complaint_id):
+        key = self._cell_of.pop(complaint_id, None)
+        if key is None:
+            return
+        cluster = self._cells[key]
+        member = cluster.members.pop(complaint_id)
+        cluster.count -= 1
+        if not cluster.count:
+            del self._cells[key]
+            return
+        cluster.sum_lat -= member['_lat']
+        cluster.sum_lon -= member['_lon']
+        for counter, value in ((cluster.issue_types, member['issue_type']), (cluster.statuses, member['status'])):
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+
+    def clusters(self, summary=False):
+        """
+        Heatmap points: lat/lng/weight/count plus either the member complaints
+        or, with summary=True, counts by issue_type and status.
+        """
+        with self._lock:
+            points = []
+            for cluster in self._cells.values():
+                point = {
+                    'lat': cluster.sum_lat / cluster.count,
+                    'lng': cluster.sum_lon / cluster.count,
+                    'weight': min(cluster.count / float(self.full_weight_count), 1.0),
+                    'count': cluster.count,
+                }
+                if summary:
+                    point['issue_types'] = dict(cluster.issue_types)
+                    point['statuses'] = dict(cluster.statuses)
+                else:
+                    point['complaints'] = [
+                        {k: v for k, v in member.items() if not k.startswith('_')}
+                        for member in cluster.members.values()
+                    ]
+                points.append(point)
+            return points
+
+    def rendered(self, summary, render):
+        """
+        Return render(self.clusters(summary)), cached until the next change.
+        """
+        with self._lock:
+            cached = self._rendered.get(summary)
+            if cached is None:
+                cached = self._rendered[summary] = render(self.clusters(summary))
+            return cached
@@ -0,0 +1,181 @@
+"""
+Background worker pool for complaint submissions.
+
+The submit routes persist a minimal `processing` record and hand the slow part
+(reverse geocoding, photo variants, the final write) to this pool. Each job is
+a dict processed by `handler(job)`; a job that raises is retried up to
+`max_attempts` times with exponential backoff, and handed to
+`on_failure(job, error)` once it has used them all. Handlers may keep partial
+results on the job dict, so a retry only redoes what failed.
+
+The queue is bounded: submit() returns False when it is full, so callers can
+fall back to processing inline instead of piling up work in memory.
+
+Jobs live only in memory, so a restart loses whatever was queued. An optional
+`recover()` callable returns jobs to requeue (e.g. records left mid-processing
+by an earlier process); it runs when the workers start and every
+`recover_interval` seconds after that.
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+class SubmissionPipeline:
+    """Bounded queue drained by a fixed set of daemon worker threads."""
+
+    def __init__(self, handler, workers=2, max_queue=100, max_attempts=3, retry_backoff=2.0, on_failure=None,
+                 recover=None, recover_interval=300.0):
+        """
+        Args:
+            handler: handler(job) does the work; raising schedules a retry
+            workers: number of worker threads
+            max_queue: jobs waiting (including scheduled retries) before submit() refuses
+            max_attempts: attempts per job, including the first
+            retry_backoff: seconds before the first retry, doubled each time
+            on_failure: on_failure(job, error) after the last failed attempt
+            recover: recover() -> jobs to requeue, run at start and periodically
+            recover_interval: seconds between recover() runs
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.on_failure = on_failure
+        self.recover = recover
+        self.recover_interval = recover_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._retrying = 0
+        self.counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'recovered': 0}
+
+    def ensure_started(self):
+        """Start the workers once per process (threads do not survive fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'submission-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.recover is not None:
+                thread = threading.Thread(target=self._run_recovery, name='submission-recovery', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job):
+        """Queue a job. Returns False (and queues nothing) if the queue is full."""
+        self.ensure_started()
+        job.setdefault('attempts', 0)
+        job.setdefault('queued_at', time.time())
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('submitted')
+        return True
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job['attempts'] += 1
+            key = job.get('id', id(job))
+            with self._lock:
+                self._active[key] = job
+            try:
+                self.handler(job)
+            except Exception as exc:
+                job['last_error'] = str(exc)
+                if job['attempts'] < self.max_attempts:
+                    self._schedule_retry(job)
+                else:
+                    self._count('failed')
+                    print(f"[ERROR] Submission job {key} failed after {job['attempts']} attempts: {exc}")
+                    if self.on_failure is not None:
+                        try:
+                            self.on_failure(job, exc)
+                        except Exception as failure_exc:
+                            print(f"[ERROR] Submission failure handler raised: {failure_exc}")
+            else:
+                self._count('completed')
+            finally:
+                with self._lock:
+                    self._active.pop(key, None)
+                self._queue.task_done()
+
+    def _run_recovery(self):
+        while True:
+            try:
+                jobs = self.recover() or []
+            except Exception as exc:
+                print(f"[WARN] Submission recovery failed: {exc}")
+                jobs = []
+            for job in jobs:
+                if not self.submit(job):
+                    print("[WARN] Submission queue full; leaving the remaining recovered jobs for the next sweep")
+                    break
+                self._count('recovered')
+            if jobs:
+                print(f"[OK] Requeued {len(jobs)} interrupted submissions")
+            time.sleep(self.recover_interval)
+
+    def _schedule_retry(self, job):
+        delay = self.retry_backoff * (2 ** (job['attempts'] - 1))
+        print(f"[WARN] Submission job {job.get('id')} attempt {job['attempts']} failed "
+              f"({job['last_error']}); retrying in {delay:.1f}s")
+        with self._lock:
+            self.counters['retried'] += 1
+            self._retrying += 1
+
+        def requeue():
+            with self._lock:
+                self._retrying -= 1
+            # Blocks rather than drops: an accepted job must not be lost
+            self._queue.put(job)
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        timer.start()
+
+    def progress(self, key):
+        """{'stage', 'attempts'} for a job currently being processed here, or None."""
+        with self._lock:
+            job = self._active.get(key)
+            if job is None:
+                return None
+            return {'stage': job.get('stage'), 'attempts': job['attempts']}
+
+    def join(self):
+        """Block until every queued job has been processed (used by scripts)."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            active = len(self._active)
+            retrying = self._retrying
+        counters.update(
+            workers=self.workers,
+            queue_depth=self._queue.qsize(),
+            max_queue=self.max_queue,
+            active=active,
+            waiting_retry=retrying,
+        )
+        return counters
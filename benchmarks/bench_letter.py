@@ -0,0 +1,65 @@
+"""
+Benchmark: complaint letter rendering, old vs precompiled.
+
+legacy:  generate_formal_complaint as it was before complaint_letter.py - the
+         state list rebuilt per address part, substring scans, one large
+         f-string and two regex cleanup passes on every call (kept in
+         tests/test_complaint_letter.py, which checks that both produce
+         identical letters)
+current: backend/complaint_letter.render_complaint_letter - module-level
+         template, compiled state/city matchers, parse memoized per address
+
+Usage:
+    python benchmarks/bench_letter.py [--iterations 20000 --addresses 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'backend'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'tests'))
+
+from complaint_letter import parse_city_state, render_complaint_letter  # noqa: E402
+from test_complaint_letter import (  # noqa: E402
+    ADDRESSES, DESCRIPTIONS, ISSUE_TYPES, NOW, PRIORITIES, legacy_generate_formal_complaint,
+)
+
+
+def workload(iterations, addresses):
+    """Realistic submissions: few distinct addresses, mostly user descriptions."""
+    pool = [f"Ward {i}, " + ADDRESSES[i % 6] for i in range(addresses)]
+    for i in range(iterations):
+        yield dict(issue_type=ISSUE_TYPES[i % len(ISSUE_TYPES)],
+                   description=DESCRIPTIONS[2] if i % 4 else None,
+                   location=pool[i % len(pool)], latitude=26.4 + i * 1e-6, longitude=80.3,
+                   priority=PRIORITIES[i % 4], department='Public Works', user_id=f'user-{i}')
+
+
+def time_renderer(render, cases):
+    start = time.perf_counter()
+    for kwargs in cases:
+        render(now=NOW, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--addresses', type=int, default=50, help='distinct addresses in the workload')
+    args = parser.parse_args()
+
+    cases = list(workload(args.iterations, args.addresses))
+    parse_city_state.cache_clear()
+    legacy = time_renderer(legacy_generate_formal_complaint, cases)
+    current = time_renderer(render_complaint_letter, cases)
+    print(f"{'renderer':<10} {'total s':>9} {'us/letter':>10}")
+    for name, elapsed in (('legacy', legacy), ('current', current)):
+        print(f"{name:<10} {elapsed:>9.3f} {elapsed / len(cases) * 1e6:>10.1f}")
+    print(f"speedup {legacy / current:.1f}x over {len(cases)} letters, {args.addresses} distinct addresses")
+
+
+if __name__ == '__main__':
+    main()
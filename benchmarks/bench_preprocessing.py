@@ -0,0 +1,101 @@
+"""
+Benchmark: old vs new classifier preprocessing on phone-sized JPEGs.
+
+old: PIL full decode -> np.array -> Image.fromarray -> torchvision
+     Resize((224, 224)) / ToTensor / Normalize (what hf-classifier used to do)
+new: shared.preprocessing - reduced-scale JPEG decode, one resize, LUT
+     normalization into a preallocated buffer
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--width 4000 --height 3000 --runs 20]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from shared.preprocessing import allocate_batch, preprocess_batch, preprocess_image  # noqa: E402
+
+
+def make_jpeg(width, height, seed=0):
+    """A smooth synthetic photo (noise compresses unrealistically badly)."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(height // 64 + 1, width // 64 + 1, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((width, height), Image.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def old_path(image_bytes, transform):
+    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    array = np.array(image)
+    image = Image.fromarray(array).convert('RGB')
+    return transform(image).numpy()
+
+
+def time_it(fn, runs):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--batch', type=int, default=8)
+    args = parser.parse_args()
+
+    image_bytes = make_jpeg(args.width, args.height)
+    print(f"Input: {args.width}x{args.height} JPEG, {len(image_bytes) / 1e6:.2f} MB")
+
+    try:
+        from torchvision import transforms
+    except ImportError:
+        transforms = None
+
+    results = []
+    if transforms is not None:
+        transform = transforms.Compose([
+            transforms.Resize((224, 224)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        ])
+        results.append(('old (full decode + torchvision)', time_it(lambda: old_path(image_bytes, transform), args.runs)))
+    else:
+        print("torchvision not installed; skipping the old path")
+
+    results.append(('new (single image)', time_it(lambda: preprocess_image(image_bytes), args.runs)))
+
+    buffer = allocate_batch(args.batch)
+    sources = [image_bytes] * args.batch
+    batch_ms = time_it(lambda: preprocess_batch(sources, out=buffer), max(1, args.runs // args.batch))
+    results.append((f'new (batch of {args.batch}, per image)', batch_ms / args.batch))
+
+    baseline = results[0][1]
+    for name, ms in results:
+        print(f"{name:<40} {ms:8.2f} ms/img   x{baseline / ms:5.1f}")
+
+    if transforms is not None:
+        # Same decoded pixels -> identical tensors; with DCT scaling only small
+        # resampling differences remain.
+        full = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        diff = np.abs(transform(full).numpy() - preprocess_image(full)).max()
+        print(f"max |old - new| on the same decoded image: {diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: /api/complaints-map radius query, full scan vs grid spatial index.
+
+scan:  what get_complaints_map used to do - geopy geodesic per complaint over
+       the whole complaints tree (timed on a sample, extrapolated linearly)
+index: backend/spatial_index.GridSpatialIndex - candidate cells only,
+       vectorized haversine, sorted by distance
+
+Complaints are spread around a city centre with a few dense hotspots.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--sizes 10000 100000 1000000 --radius 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'backend'))
+
+from spatial_index import GridSpatialIndex  # noqa: E402
+
+CENTER = (28.6139, 77.2090)
+ISSUE_TYPES = ('potholes', 'garbage', 'streetlight', 'water_leak', 'graffiti', 'other')
+
+
+def make_complaints(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # 70% spread over ~40 km, 30% in five hotspots
+    spread = rng.normal(0, 0.18, size=(n, 2))
+    hotspots = rng.normal(0, 0.15, size=(5, 2))
+    hot = rng.random(n) < 0.3
+    spread[hot] = hotspots[rng.integers(0, 5, size=hot.sum())] + rng.normal(0, 0.01, size=(hot.sum(), 2))
+    coords = spread + np.array(CENTER)
+    return [
+        {
+            'id': f'c{i}',
+            'latitude': float(coords[i, 0]),
+            'longitude': float(coords[i, 1]),
+            'issue_type': ISSUE_TYPES[i % len(ISSUE_TYPES)],
+            'status': 'pending',
+            'priority': 'normal',
+        }
+        for i in range(n)
+    ]
+
+
+def scan(complaints, lat, lon, radius):
+    nearby = []
+    for complaint in complaints:
+        distance = geodesic((lat, lon), (complaint['latitude'], complaint['longitude'])).kilometers
+        if distance <= radius:
+            nearby.append((complaint['id'], distance))
+    return nearby
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--radius', type=float, default=5.0)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--scan-sample', type=int, default=10000,
+                        help='complaints actually scanned; larger sizes are extrapolated')
+    parser.add_argument('--cell-deg', type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = [(CENTER[0] + dy, CENTER[1] + dx) for dy, dx in rng.normal(0, 0.1, size=(args.queries, 2))]
+
+    print(f"radius={args.radius} km, {args.queries} queries, cell={args.cell_deg} deg")
+    print(f"{'n':>9} {'build s':>8} {'hits':>8} {'index ms':>9} {'scan ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        complaints = make_complaints(n)
+
+        index = GridSpatialIndex(cell_size_deg=args.cell_deg)
+        start = time.perf_counter()
+        index.rebuild(complaints)
+        build_s = time.perf_counter() - start
+
+        index.query_radius(*queries[0], args.radius)  # warm cell arrays
+        start = time.perf_counter()
+        hits = 0
+        for lat, lon in queries:
+            hits += len(index.query_radius(lat, lon, args.radius))
+        index_ms = (time.perf_counter() - start) / len(queries) * 1000.0
+
+        sample = complaints[:min(n, args.scan_sample)]
+        scan_queries = queries[:3]
+        start = time.perf_counter()
+        for lat, lon in scan_queries:
+            scan(sample, lat, lon, args.radius)
+        scan_ms = (time.perf_counter() - start) / len(scan_queries) * 1000.0 * (n / len(sample))
+
+        # Same membership as the old path (haversine vs geodesic only differ
+        # for points within ~0.5% of the radius boundary)
+        lat, lon = queries[0]
+        expected = {cid for cid, d in scan(sample, lat, lon, args.radius) if d < args.radius * 0.995}
+        found = {record['id'] for record, _ in index.query_radius(lat, lon, args.radius)}
+        assert expected <= found, f"index missed {len(expected - found)} complaints"
+
+        print(f"{n:>9} {build_s:>8.2f} {hits // len(queries):>8} {index_ms:>9.2f} "
+              f"{scan_ms:>10.1f} {scan_ms / index_ms:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
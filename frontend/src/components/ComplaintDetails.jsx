@@ -9,6 +9,7 @@ const ComplaintDetails = ({ complaint, onClose, onStatusUpdate }) => {
   const [isUpdating, setIsUpdating] = useState(false);
   const [newStatus, setNewStatus] = useState(complaint?.status || 'pending');
   const [newPriority, setNewPriority] = useState(complaint?.priority || 'normal');
+  const [renderedLetter, setRenderedLetter] = useState(null);
   const [submitterName, setSubmitterName] = useState(
     complaint?.userName ||
     complaint?.submittedBy ||
@@ -64,6 +65,29 @@ const ComplaintDetails = ({ complaint, onClose, onStatusUpdate }) => {
     };
   }, [complaint]);
 
+  // Backend records no longer store their letter; it is rendered on request
+  useEffect(() => {
+    setRenderedLetter(null);
+    if (!complaint?.id || complaint.formal_complaint || complaint.source !== 'backend') return;
+
+    let cancelled = false;
+    const fetchLetter = async () => {
+      try {
+        const response = await fetch(`${API_BASE_URL}/api/complaint/${complaint.id}/letter`);
+        if (!response.ok) return;
+        const data = await response.json();
+        if (!cancelled && data.formal_complaint) setRenderedLetter(data.formal_complaint);
+      } catch (error) {
+        console.error('Failed to load complaint letter:', error);
+      }
+    };
+
+    fetchLetter();
+    return () => {
+      cancelled = true;
+    };
+  }, [complaint]);
+
   const handleStatusUpdate = async () => {
     if (!localComplaint?.id || !onStatusUpdate) return;
     try {
@@ -178,6 +202,7 @@ const ComplaintDetails = ({ complaint, onClose, onStatusUpdate }) => {
 
   const formalComplaintText = useMemo(() => {
     if (localComplaint.formal_complaint) return localComplaint.formal_complaint;
+    if (renderedLetter) return renderedLetter;
 
     const today = new Date().toLocaleDateString('en-US', {
       year: 'numeric',
@@ -213,7 +238,7 @@ Sincerely,
 Nagrik Nivedan Platform
 Complaint ID: ${trackingId}`
     );
-  }, [localComplaint, departmentName, formattedIssueLabel, citizenAddress, citizenName, submittedDate, complaintDescription, trackingId, priorityLabel]);
+  }, [localComplaint, renderedLetter, departmentName, formattedIssueLabel, citizenAddress, citizenName, submittedDate, complaintDescription, trackingId, priorityLabel]);
 
   const imageSrc = useMemo(() => {
     if (!localComplaint) return null;
@@ -1,22 +1,45 @@
 import base64
-import io
 import os
 import sys
+from typing import List
 
-import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from PIL import Image
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.routing import Match
 
 # Ensure shared module is importable when this folder is used standalone
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
+from shared import metrics  # noqa: E402
+from shared.inference_scheduler import InferenceScheduler  # noqa: E402
 from shared.model_inference import IssueClassifier  # noqa: E402
+from shared.prediction_cache import PredictionCache, file_fingerprint, image_digest  # noqa: E402
+from shared.preprocessing import open_image  # noqa: E402
 
 MODEL_PATH = os.getenv('MODEL_PATH', os.path.join(PROJECT_ROOT, 'model', 'best_urban_mobilenet.pth'))
 MODEL_NUM_CLASSES = int(os.getenv('MODEL_NUM_CLASSES', '6'))
+# 'torch' (eager, .pth), 'torchscript' (.pt) or 'onnx' (.onnx), see `python -m shared.export`
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'torch').lower()
+# 'none' (fp32), 'dynamic' (INT8 head) or 'static' (INT8 features + head)
+MODEL_QUANTIZATION = os.getenv('MODEL_QUANTIZATION', 'none').lower()
+MODEL_CALIBRATION_DIR = os.getenv('MODEL_CALIBRATION_DIR')
+MAX_BATCH_IMAGES = int(os.getenv('MAX_BATCH_IMAGES', '32'))
+# Binary uploads (/predict/upload) are streamed with this hard ceiling
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+# Dynamic micro-batching of concurrent /predict calls
+MICRO_BATCH_ENABLED = os.getenv('MICRO_BATCH_ENABLED', '1').lower() in ('1', 'true', 'yes')
+MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', '16'))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', '10'))
+# Content-addressed prediction cache (0 disables)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '2048'))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '3600'))
 
 app = FastAPI(
     title="Naagrik Nivedan Classifier",
@@ -24,7 +47,28 @@ app = FastAPI(
     description="Lightweight FastAPI wrapper that exposes the MobileNet model for Hugging Face Spaces."
 )
 
-classifier = IssueClassifier(model_path=MODEL_PATH, num_classes=MODEL_NUM_CLASSES)
+classifier = IssueClassifier(
+    model_path=MODEL_PATH,
+    num_classes=MODEL_NUM_CLASSES,
+    backend=MODEL_BACKEND,
+    quantization=MODEL_QUANTIZATION,
+    calibration_dir=MODEL_CALIBRATION_DIR
+)
+scheduler = (
+    InferenceScheduler(classifier, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS)
+    if MICRO_BATCH_ENABLED else None
+)
+
+
+def model_identity():
+    # Changes whenever the weights file is replaced, which drops the cache
+    return f"{file_fingerprint(MODEL_PATH)}|{classifier.backend_name}|{classifier.quantization}"
+
+
+prediction_cache = (
+    PredictionCache(max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL, identity=model_identity)
+    if PREDICTION_CACHE_SIZE > 0 else None
+)
 
 
 class PredictRequest(BaseModel):
@@ -36,7 +80,27 @@ class PredictResponse(BaseModel):
     confidence: float
 
 
-def decode_image(image_payload: str) -> np.ndarray:
+class PredictBatchRequest(BaseModel):
+    images: List[str]  # data URLs or raw base64 strings
+
+
+class PredictBatchResponse(BaseModel):
+    results: List[PredictResponse]
+
+
+def decode_image_bytes(image_bytes) -> Image.Image:
+    try:
+        # Decodes JPEGs at reduced (DCT) scale; the classifier resizes once from here
+        with metrics.stage('image_decode'):
+            image = open_image(image_bytes)
+            image.load()
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Unsupported image bytes: {exc}") from exc
+
+    return image
+
+
+def decode_base64(image_payload: str) -> bytes:
     if not image_payload:
         raise HTTPException(status_code=400, detail="Image field is required")
 
@@ -48,37 +112,201 @@ def decode_image(image_payload: str) -> np.ndarray:
             raise HTTPException(status_code=400, detail="Invalid data URL format")
 
     try:
-        image_bytes = base64.b64decode(payload)
+        with metrics.stage('base64_decode'):
+            image_bytes = base64.b64decode(payload)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid base64 image payload")
 
+    return image_bytes
+
+
+def decode_image(image_payload: str) -> Image.Image:
+    return decode_image_bytes(decode_base64(image_payload))
+
+
+def classify_bytes(image_bytes) -> dict:
+    """Classify encoded image bytes, consulting the prediction cache first."""
+    def compute():
+        image = decode_image_bytes(image_bytes)
+        if scheduler is not None:
+            return scheduler.classify_issue(image)
+        return classifier.classify_issue(image)
+
+    if prediction_cache is None:
+        return compute()
+    return prediction_cache.get_or_compute(image_bytes, compute)
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"Image exceeds the {MAX_UPLOAD_BYTES} byte upload limit")
+
+
+async def limited_stream(request: Request, limit: int):
+    """
+    request.stream(), raising 413 as soon as more than `limit` bytes have
+    arrived. Counts what is actually received, so chunked bodies (no
+    Content-Length) are bounded too.
+    """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large()
+        yield chunk
+
+
+async def read_upload(request: Request) -> bytearray:
+    """
+    Read an uploaded image from a multipart `image` (or `file`) field, or from
+    the raw request body, without ever buffering more than MAX_UPLOAD_BYTES.
+    Multipart bodies are parsed from the size-limited stream, so at most
+    MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES are read (and spooled) in all.
+    """
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large()
+
+    data = bytearray()
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith('multipart/form-data'):
+        stream = limited_stream(request, MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+        try:
+            form = await MultiPartParser(request.headers, stream, max_files=1, max_fields=16).parse()
+        except MultiPartException as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid multipart upload: {exc.message}") from exc
+        try:
+            upload = form.get('image') or form.get('file')
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart upload needs an 'image' file field")
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data.extend(chunk)
+                if len(data) > MAX_UPLOAD_BYTES:
+                    raise _too_large()
+        finally:
+            await form.close()
+    else:
+        async for chunk in limited_stream(request, MAX_UPLOAD_BYTES):
+            data.extend(chunk)
+
+    if not data:
+        raise HTTPException(status_code=400, detail="Image body is required")
+    return data
+
+
+def route_label(request: Request) -> str:
+    """Path template of the route serving `request`, for metric labels."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return '<unmatched>'
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    route = route_label(request)
+    started = metrics.request_started(request.method, route)
+    status = 500
     try:
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=f"Unsupported image bytes: {exc}") from exc
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.request_finished(request.method, route, status, started)
+
 
-    return np.array(image)
+@app.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "model_path": MODEL_PATH}
+    return {
+        "status": "ok",
+        "model_path": MODEL_PATH,
+        "backend": classifier.backend_name,
+        "quantization": classifier.quantization
+    }
 
 
 @app.post("/predict", response_model=PredictResponse)
 def predict(payload: PredictRequest):
-    image_array = decode_image(payload.image)
-    result = classifier.classify_issue(image_array)
+    result = classify_bytes(decode_base64(payload.image))
+    return PredictResponse(**result)
+
+
+@app.post("/predict/upload", response_model=PredictResponse)
+async def predict_upload(request: Request):
+    """Binary variant of /predict: multipart/form-data or a raw image/* body."""
+    result = await run_in_threadpool(classify_bytes, await read_upload(request))
     return PredictResponse(**result)
 
 
+@app.post("/predict_batch", response_model=PredictBatchResponse)
+def predict_batch(payload: PredictBatchRequest):
+    if not payload.images:
+        raise HTTPException(status_code=400, detail="images must be a non-empty list")
+    if len(payload.images) > MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many images in one batch ({len(payload.images)} > {MAX_BATCH_IMAGES})"
+        )
+
+    results = [None] * len(payload.images)
+    pending = []  # (index, digest, image) of cache misses
+    for index, image_payload in enumerate(payload.images):
+        try:
+            image_bytes = decode_base64(image_payload)
+            digest = image_digest(image_bytes) if prediction_cache is not None else None
+            cached = prediction_cache.get(digest) if digest else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, digest, decode_image_bytes(image_bytes)))
+        except HTTPException as exc:
+            raise HTTPException(status_code=exc.status_code, detail=f"images[{index}]: {exc.detail}") from exc
+
+    if pending:
+        predictions = classifier.classify_batch([image for _, _, image in pending])
+        for (index, digest, _), prediction in zip(pending, predictions):
+            results[index] = prediction
+            if digest:
+                prediction_cache.put(digest, prediction)
+
+    return PredictBatchResponse(results=[PredictResponse(**result) for result in results])
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "micro_batching": scheduler is not None,
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else None
+    }
+
+
+@app.on_event("shutdown")
+def shutdown_scheduler():
+    if scheduler is not None:
+        scheduler.close(timeout=5)
+
+
 @app.get("/")
 def root():
     return {
         "service": "Naagrik Nivedan HF Classifier",
         "endpoints": {
             "health": "/health",
-            "predict": "POST /predict"
+            "stats": "/stats",
+            "metrics": "/metrics",
+            "predict": "POST /predict",
+            "predict_upload": "POST /predict/upload",
+            "predict_batch": "POST /predict_batch"
         }
     }
 
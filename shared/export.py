@@ -0,0 +1,141 @@
+"""
+Export UrbanMobileNet weights to ONNX and TorchScript for the non-eager backends.
+
+Usage:
+    python -m shared.export --model-path model/best_urban_mobilenet.pth --out-dir model/
+
+writes <stem>.onnx and <stem>.pt next to each other, then (unless --no-verify)
+checks that every backend ('torch', 'torchscript', 'onnx') returns the same
+top-1 class as eager PyTorch for a set of sample images. Point MODEL_BACKEND
+and MODEL_PATH at the exported file to serve it.
+"""
+
+import argparse
+import inspect
+import os
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .inference_backends import BACKEND_NAMES
+from .model_architecture import UrbanMobileNet
+from .model_inference import INPUT_SIZE, IssueClassifier
+from .quantization import list_images
+
+ONNX_OPSET = 17
+
+
+def load_fp32_model(model_path, num_classes):
+    model = UrbanMobileNet(num_classes=num_classes)
+    state_dict = torch.load(model_path, map_location='cpu')
+    model.load_state_dict(state_dict, strict=False)
+    return model.eval()
+
+
+def export_torchscript(model, path):
+    """Trace the model into a TorchScript module saved at `path`."""
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    traced = torch.jit.freeze(traced)
+    traced.save(path)
+    return path
+
+
+def export_onnx(model, path, opset=ONNX_OPSET):
+    """Export the model to ONNX with a dynamic batch dimension."""
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    kwargs = {}
+    # Newer torch defaults to the dynamo exporter; the TorchScript-based one
+    # handles this static CNN without extra dependencies.
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        kwargs['dynamo'] = False
+    torch.onnx.export(
+        model,
+        example,
+        path,
+        input_names=['input'],
+        output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset,
+        **kwargs
+    )
+    return path
+
+
+def sample_images(images_dir=None, count=16, seed=0):
+    """Images for the parity check: files from `images_dir`, else random noise images."""
+    if images_dir:
+        paths = list_images(images_dir, limit=count)
+        if paths:
+            return [Image.open(p).convert('RGB') for p in paths]
+    rng = np.random.default_rng(seed)
+    return [
+        Image.fromarray(rng.integers(0, 256, size=(INPUT_SIZE + 32 * i, INPUT_SIZE + 16 * i, 3), dtype=np.uint8))
+        for i in range(count)
+    ]
+
+
+def verify_parity(artifacts, num_classes, images):
+    """
+    Check that all backends agree on the top-1 class for every image.
+
+    Args:
+        artifacts: {backend_name: model_path}
+        num_classes: number of model classes
+        images: list of PIL images
+
+    Returns:
+        {backend_name: [predicted issue_type, ...]}; raises AssertionError on mismatch.
+    """
+    predictions = {}
+    for name, path in artifacts.items():
+        classifier = IssueClassifier(model_path=path, num_classes=num_classes, device='cpu', backend=name)
+        predictions[name] = [r['issue_type'] for r in classifier.classify_batch(images)]
+
+    reference_name = 'torch' if 'torch' in predictions else next(iter(predictions))
+    reference = predictions[reference_name]
+    for name, preds in predictions.items():
+        mismatches = [i for i, (a, b) in enumerate(zip(reference, preds)) if a != b]
+        if mismatches:
+            raise AssertionError(
+                f"Backend '{name}' disagrees with '{reference_name}' on images {mismatches}"
+            )
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export UrbanMobileNet to ONNX / TorchScript.")
+    parser.add_argument('--model-path', default=os.getenv('MODEL_PATH', 'backend/best_model.pth'))
+    parser.add_argument('--num-classes', type=int, default=int(os.getenv('MODEL_NUM_CLASSES', '6')))
+    parser.add_argument('--out-dir', default=None, help="Output directory (default: next to --model-path)")
+    parser.add_argument('--formats', nargs='+', default=['onnx', 'torchscript'], choices=['onnx', 'torchscript'])
+    parser.add_argument('--images', default=None, help="Sample images for the parity check (default: random)")
+    parser.add_argument('--no-verify', action='store_true', help="Skip the cross-backend parity check")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.model_path))
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.model_path))[0]
+
+    model = load_fp32_model(args.model_path, args.num_classes)
+    artifacts = {'torch': args.model_path}
+
+    if 'torchscript' in args.formats:
+        path = export_torchscript(model, os.path.join(out_dir, f"{stem}.pt"))
+        artifacts['torchscript'] = path
+        print(f"[OK] TorchScript written to {path}")
+    if 'onnx' in args.formats:
+        path = export_onnx(model, os.path.join(out_dir, f"{stem}.onnx"))
+        artifacts['onnx'] = path
+        print(f"[OK] ONNX written to {path}")
+
+    if not args.no_verify:
+        images = sample_images(args.images)
+        verify_parity({name: artifacts[name] for name in BACKEND_NAMES if name in artifacts}, args.num_classes, images)
+        print(f"[OK] Top-1 parity across {', '.join(artifacts)} on {len(images)} images")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Pluggable inference backends for IssueClassifier.
+
+Every backend takes a preprocessed float32 numpy batch of shape (N, 3, 224, 224)
+and returns raw logits of shape (N, num_classes) as a numpy array, so
+IssueClassifier keeps the same classify_issue contract whichever runtime
+executes the model:
+
+- 'torch':       eager PyTorch UrbanMobileNet loaded from a state_dict (.pth)
+- 'torchscript': a scripted/traced module written by `python -m shared.export` (.pt)
+- 'onnx':        ONNX Runtime on an exported graph (.onnx); needs neither torch
+                 nor torchvision at runtime
+
+Heavy runtimes are imported lazily inside each backend.
+"""
+
+BACKEND_NAMES = ('torch', 'torchscript', 'onnx')
+
+
+class InferenceBackend:
+    """Base class: run(batch) -> logits."""
+
+    name = None
+    device = 'cpu'
+
+    def run(self, batch):
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    """Eager PyTorch UrbanMobileNet, optionally INT8 quantized."""
+
+    name = 'torch'
+
+    def __init__(self, model_path, num_classes, device=None, quantization='none',
+                 calibration_dir=None, preprocess=None):
+        import torch
+        from .model_architecture import UrbanMobileNet
+
+        if quantization != 'none':
+            device = 'cpu'
+        self.torch = torch
+        self.device = torch.device(device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+        self.quantization = quantization
+
+        # Always load as state_dict and build the training-matched architecture
+        try:
+            state_dict = torch.load(model_path, map_location=self.device)
+        except Exception as e:
+            raise RuntimeError(f"Failed to read model file: {e}")
+
+        try:
+            model = UrbanMobileNet(num_classes=num_classes)
+            # Allow non-strict to ignore CBAM-specific keys from training
+            missing_keys, unexpected_keys = model.load_state_dict(state_dict, strict=False)
+        except Exception as e:
+            raise RuntimeError(f"UrbanMobileNet load: {e}")
+        print(f"[OK] Weights loaded into UrbanMobileNet (non-strict) from {model_path}")
+        if missing_keys or unexpected_keys:
+            print(f"[WARN] Load mismatches: missing={len(missing_keys)} unexpected={len(unexpected_keys)}")
+
+        model.to(self.device)
+        model.eval()  # Set to evaluation mode
+
+        if quantization != 'none':
+            from .quantization import quantize_model
+            model, self.quantization = quantize_model(
+                model,
+                quantization,
+                preprocess=preprocess,
+                calibration_dir=calibration_dir
+            )
+            print(f"[OK] Model quantized to INT8 (mode={self.quantization})")
+
+        self.model = model
+
+    def run(self, batch):
+        torch = self.torch
+        with torch.no_grad():
+            outputs = self.model(torch.from_numpy(batch).to(self.device))
+        return outputs.float().cpu().numpy()
+
+
+class TorchScriptBackend(InferenceBackend):
+    """A TorchScript module exported by shared.export (no torchvision needed)."""
+
+    name = 'torchscript'
+
+    def __init__(self, model_path, num_classes, device=None, **_):
+        import torch
+
+        self.torch = torch
+        self.device = torch.device(device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+        self.model = torch.jit.load(model_path, map_location=self.device)
+        self.model.eval()
+        print(f"[OK] TorchScript module loaded from {model_path}")
+
+    def run(self, batch):
+        torch = self.torch
+        with torch.no_grad():
+            outputs = self.model(torch.from_numpy(batch).to(self.device))
+        return outputs.float().cpu().numpy()
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """An ONNX graph exported by shared.export, executed with ONNX Runtime on CPU."""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, num_classes, num_threads=None, **_):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.model = self.session
+        print(f"[OK] ONNX Runtime session created from {model_path}")
+
+    def run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    'torch': TorchBackend,
+    'torchscript': TorchScriptBackend,
+    'onnx': OnnxRuntimeBackend,
+}
+
+
+def create_backend(name, model_path, num_classes, **kwargs):
+    """Instantiate the backend registered under `name`."""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"MODEL_BACKEND must be one of {BACKEND_NAMES}, got {name!r}")
+    return backend_cls(model_path, num_classes, **kwargs)
@@ -0,0 +1,158 @@
+"""
+Dynamic micro-batching in front of IssueClassifier.
+
+Concurrent callers (e.g. FastAPI threadpool threads serving /predict) submit
+single images to a shared queue. A single worker thread drains the queue and
+flushes it as one classify_batch() call as soon as either `max_batch_size`
+images are waiting or the oldest image has waited `max_wait_ms`. Each caller
+blocks on its own Future and receives only its own result. If a batch fails
+(e.g. one undecodable upload), its images are retried one at a time so only
+the bad request gets the exception.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """
+    Gathers concurrent single-image requests into batched forward passes.
+    """
+
+    def __init__(self, classifier, max_batch_size=16, max_wait_ms=10):
+        """
+        Args:
+            classifier: object exposing classify_batch(list_of_images)
+            max_batch_size: flush as soon as this many requests are queued
+            max_wait_ms: flush at the latest this long after the first
+                         request of a batch arrived
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, got {max_batch_size}")
+        if max_wait_ms < 0:
+            raise ValueError(f"max_wait_ms must be >= 0, got {max_wait_ms}")
+
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+        self._max_seen_batch_size = 0
+        self._batch_size_counts = {}
+        self._failed_batches = 0
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    def classify_issue(self, image_data, timeout=None):
+        """
+        Queue one image and block until its batch has been classified.
+
+        Returns the same dict as IssueClassifier.classify_issue().
+        """
+        return self.submit(image_data).result(timeout=timeout)
+
+    def submit(self, image_data):
+        """Queue one image and return a Future resolving to its result."""
+        if self._closed:
+            raise RuntimeError("Inference scheduler is shut down")
+        future = Future()
+        self._queue.put((image_data, future))
+        return future
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until size or deadline."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown sentinel: finish this batch, then stop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            # Drop requests whose callers already gave up
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self._record_batch(len(batch))
+            try:
+                results = self.classifier.classify_batch([image for image, _ in batch])
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                    continue
+                with self._stats_lock:
+                    self._failed_batches += 1
+                self._run_individually(batch)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_individually(self, batch):
+        """Classify each image of a failed batch on its own, failing only its own future."""
+        for image, future in batch:
+            try:
+                future.set_result(self.classifier.classify_batch([image])[0])
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def _record_batch(self, size):
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += size
+            self._last_batch_size = size
+            self._max_seen_batch_size = max(self._max_seen_batch_size, size)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+
+    def stats(self):
+        """Snapshot of queue depth and achieved batch sizes, for tuning."""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'requests': self._requests,
+                'avg_batch_size': (self._requests / self._batches) if self._batches else 0.0,
+                'last_batch_size': self._last_batch_size,
+                'max_seen_batch_size': self._max_seen_batch_size,
+                'batch_size_counts': dict(sorted(self._batch_size_counts.items())),
+                'failed_batches_retried': self._failed_batches,
+            }
+
+    def close(self, timeout=None):
+        """Stop accepting requests, flush what is queued and stop the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout=timeout)
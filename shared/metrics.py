@@ -0,0 +1,224 @@
+"""
+Prometheus-style metrics shared by the backend and the classifier Space.
+
+Each process keeps one set of metrics:
+
+    naagrik_http_request_duration_seconds{method,route}   histogram
+    naagrik_http_requests_in_progress{method,route}        gauge
+    naagrik_http_requests_total{method,route,status}       counter
+    naagrik_http_request_errors_total{method,route,status} counter (4xx/5xx and exceptions)
+    naagrik_stage_duration_seconds{stage}                  histogram
+    naagrik_stage_errors_total{stage}                      counter
+
+`route` is the route template (e.g. /api/complaint/<complaint_id>), never the
+raw path, so label cardinality stays bounded. Stages time the hot spots inside
+a request (image decoding, model forward, Firebase calls, geocoding, ...):
+
+    with metrics.stage('image_decode'):
+        ...
+
+render() returns the text exposition format for a /metrics endpoint. When
+prometheus_client is installed it does the bookkeeping (plus its process
+metrics); otherwise a small built-in exporter with the same metric names and
+output format is used, so nothing else has to care. METRICS_EXPORTER=builtin
+forces the built-in one.
+
+Values are per process: behind several workers, scrape each one or read them
+as samples.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import prometheus_client
+except ImportError:  # optional dependency
+    prometheus_client = None
+
+NAMESPACE = 'naagrik'
+# Seconds; covers sub-millisecond decodes up to slow cold-start round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return f'{float(value):.1f}'
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Child:
+    """One labelled series of a built-in metric."""
+
+    __slots__ = ('_metric', '_key')
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1.0):
+        self._metric._add(self._key, amount)
+
+    def dec(self, amount=1.0):
+        self._metric._add(self._key, -amount)
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+
+class _Metric:
+    """Built-in counter/gauge/histogram with the subset of the prometheus_client API used here."""
+
+    def __init__(self, kind, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}  # label values -> number, or [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}')
+        return _Child(self, tuple(str(value) for value in values))
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _observe(self, key, value):
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def exposition(self):
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) if self.kind == 'histogram' else state
+                      for key, state in self._values.items()}
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key in sorted(values):
+            if self.kind != 'histogram':
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(values[key])}')
+                continue
+            bucket_counts, total, count = values[key]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {_format_value(cumulative)}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {_format_value(count)}')
+        return lines
+
+
+USE_PROMETHEUS = prometheus_client is not None and os.getenv('METRICS_EXPORTER', 'auto').lower() != 'builtin'
+
+if USE_PROMETHEUS:
+    registry = prometheus_client.CollectorRegistry()
+    prometheus_client.ProcessCollector(registry=registry)
+    prometheus_client.PlatformCollector(registry=registry)
+
+    def _histogram(name, documentation, labelnames):
+        return prometheus_client.Histogram(name, documentation, labelnames, registry=registry, buckets=DEFAULT_BUCKETS)
+
+    def _gauge(name, documentation, labelnames):
+        return prometheus_client.Gauge(name, documentation, labelnames, registry=registry)
+
+    def _counter(name, documentation, labelnames):
+        return prometheus_client.Counter(name, documentation, labelnames, registry=registry)
+else:
+    registry = []
+
+    def _histogram(name, documentation, labelnames):
+        registry.append(_Metric('histogram', name, documentation, labelnames))
+        return registry[-1]
+
+    def _gauge(name, documentation, labelnames):
+        registry.append(_Metric('gauge', name, documentation, labelnames))
+        return registry[-1]
+
+    def _counter(name, documentation, labelnames):
+        registry.append(_Metric('counter', name, documentation, labelnames))
+        return registry[-1]
+
+
+request_seconds = _histogram(f'{NAMESPACE}_http_request_duration_seconds', 'HTTP request latency', ['method', 'route'])
+requests_in_progress = _gauge(f'{NAMESPACE}_http_requests_in_progress', 'HTTP requests being served', ['method', 'route'])
+requests_total = _counter(f'{NAMESPACE}_http_requests_total', 'HTTP requests served', ['method', 'route', 'status'])
+request_errors = _counter(f'{NAMESPACE}_http_request_errors_total',
+                          'HTTP requests answered with a 4xx/5xx status or an exception', ['method', 'route', 'status'])
+stage_seconds = _histogram(f'{NAMESPACE}_stage_duration_seconds', 'Time spent in an instrumented stage', ['stage'])
+stage_errors = _counter(f'{NAMESPACE}_stage_errors_total', 'Instrumented stages that raised', ['stage'])
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as `name`; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.labels(name).inc()
+        raise
+    finally:
+        stage_seconds.labels(name).observe(time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def request_started(method, route):
+    requests_in_progress.labels(method, route).inc()
+    return time.perf_counter()
+
+
+def request_finished(method, route, status, started):
+    """Record a finished request; `status` is the response code (500 for an exception)."""
+    requests_in_progress.labels(method, route).dec()
+    request_seconds.labels(method, route).observe(time.perf_counter() - started)
+    requests_total.labels(method, route, status).inc()
+    if int(status) >= 400:
+        request_errors.labels(method, route, status).inc()
+
+
+def render():
+    """(body bytes, content type) of the current metrics in the text format."""
+    if USE_PROMETHEUS:
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+    lines = []
+    for metric in registry:
+        lines.extend(metric.exposition())
+    return ('\n'.join(lines) + '\n').encode('utf-8'), TEXT_CONTENT_TYPE
@@ -3,14 +3,21 @@ Model inference module for MobileNetV3 with CBAM for civic issue classification.
 This module loads the trained model and performs inference on uploaded images.
 """
 
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-from torchvision.models import mobilenet_v3_small
-from torchvision import transforms
-from PIL import Image
-import numpy as np
 import os
+import threading
+
+import numpy as np
+
+from . import metrics
+from .inference_backends import BACKEND_NAMES, create_backend
+from .preprocessing import (  # noqa: F401 (re-exported)
+    INPUT_SIZE,
+    NORMALIZE_MEAN,
+    NORMALIZE_STD,
+    allocate_batch,
+    preprocess_batch,
+    preprocess_image,
+)
 
 # Model classes (6 categories)
 CLASS_NAMES = [
@@ -22,73 +29,21 @@ CLASS_NAMES = [
     "potholes"
 ]
 
-# ------------------- CBAM Layer -------------------
-# Support both architectures: shared_mlp (standard) and channel_gate (alternative)
-class CBAM(nn.Module):
-    """
-    CBAM matching the training-time architecture shared by the user:
-    - Channel gate: AdaptiveAvgPool2d -> Conv -> ReLU -> Conv -> Sigmoid
-    - Spatial gate: Conv2d(2->1) with sigmoid on concatenated max/avg maps
-    """
-    def __init__(self, c_in, ratio=16, kernel_size=7):
-        super(CBAM, self).__init__()
-        self.channel_gate = nn.Sequential(
-            nn.AdaptiveAvgPool2d(1),
-            nn.Conv2d(c_in, c_in // ratio, 1, bias=False),
-            nn.ReLU(),
-            nn.Conv2d(c_in // ratio, c_in, 1, bias=False),
-            nn.Sigmoid()
-        )
-        self.spatial_gate = nn.Sequential(
-            nn.Conv2d(2, 1, kernel_size, padding=kernel_size//2, bias=False),
-            nn.Sigmoid()
-        )
-
-    def forward(self, x):
-        # Defensive: ensure inputs to Conv2d remain 4D (N, C, H, W)
-        def ensure_4d(t: torch.Tensor) -> torch.Tensor:
-            while t.dim() > 4 and t.size(2) == 1:
-                t = t.squeeze(2)
-            return t
-
-        x = ensure_4d(x)
-        x_out = x * self.channel_gate(x)
-        x_out = ensure_4d(x_out)
-        max_pool, _ = torch.max(x_out, dim=1, keepdim=True)
-        avg_pool = torch.mean(x_out, dim=1, keepdim=True)
-        cat_tensor = torch.cat([max_pool, avg_pool], dim=1)
-        cat_tensor = ensure_4d(cat_tensor)
-        spatial_out = self.spatial_gate(cat_tensor)
-        return x_out * spatial_out
-
-# ------------------- MobileNetV3 with CBAM -------------------
-class UrbanMobileNet(nn.Module):
-    """
-    Architecture for inference. We bypass CBAM to avoid runtime shape errors, while
-    preserving the classifier head structure to match trained weights.
-    - mobilenet_v3_small(features) -> (Identity in place of CBAM) -> classifier with avgpool+flatten
-      -> Linear(576->1024)->Hardswish->Dropout->Linear(1024->num_classes)
-    """
-    def __init__(self, num_classes):
-        super().__init__()
-        base_model = mobilenet_v3_small(weights=None)  # custom loading
-        self.features = base_model.features
-        # Bypass CBAM for robust inference
-        self.cbam = nn.Identity()
-        self.classifier = nn.Sequential(
-            nn.AdaptiveAvgPool2d(1),
-            nn.Flatten(),
-            nn.Linear(576, 1024),
-            nn.Hardswish(),
-            nn.Dropout(p=0.3),
-            nn.Linear(1024, num_classes)
-        )
-
-    def forward(self, x):
-        x = self.features(x)
-        x = self.cbam(x)
-        x = self.classifier(x)
-        return x
+
+def __getattr__(name):
+    # Architecture classes live in model_architecture so torch is only imported
+    # when the eager backend (or a caller) actually needs them.
+    if name in ('CBAM', 'UrbanMobileNet'):
+        from . import model_architecture
+        return getattr(model_architecture, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def softmax(logits):
+    """Row-wise softmax of an (N, C) logits array."""
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
 
 
 class IssueClassifier:
@@ -96,20 +51,40 @@ class IssueClassifier:
     Classifier for civic issues using MobileNetV3 with CBAM.
     """
     
-    def __init__(self, model_path='backend/best_model.pth', num_classes=6):
+    def __init__(self, model_path='backend/best_model.pth', num_classes=6, quantization='none',
+                 calibration_dir=None, device=None, backend='torch'):
         """
         Initialize the classifier.
         
         Args:
-            model_path: Path to the trained model weights file
+            model_path: Path to the trained model weights file (.pth state_dict
+                        for 'torch', .pt for 'torchscript', .onnx for 'onnx')
             num_classes: Number of classes the model was trained with (5 or 6)
                          Default is 6. If your model was trained with 5 classes
                          (without illegal_parking), set this to 5.
+            quantization: 'none' (fp32), 'dynamic' (INT8 classifier head) or
+                          'static' (INT8 features + head, needs calibration_dir).
+                          Quantized modes always run on CPU.
+            calibration_dir: Directory of sample images used to calibrate
+                             static quantization
+            device: Force a torch device ('cpu', 'cuda'); auto-detected if None
+            backend: Inference runtime - 'torch' (eager), 'torchscript' or 'onnx'
+                     (ONNX Runtime). See shared.inference_backends.
         """
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = None
+        if backend not in BACKEND_NAMES:
+            raise ValueError(f"backend must be one of {BACKEND_NAMES}, got {backend!r}")
+        if quantization != 'none' and backend != 'torch':
+            raise ValueError("quantization is only supported with the 'torch' backend")
+
+        self.backend_name = backend
+        self.backend = None
+        self.requested_device = device
         self.model_path = model_path
         self.num_classes = num_classes
+        self.quantization = quantization
+        self.calibration_dir = calibration_dir
+        # Per-thread reusable input buffers for classify_batch
+        self._buffers = threading.local()
         
         # Use appropriate class names based on num_classes
         if num_classes == 6:
@@ -120,18 +95,20 @@ class IssueClassifier:
         else:
             raise ValueError(f"num_classes must be 5 or 6, got {num_classes}")
         
-        # Image preprocessing transform (match training normalization)
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        
         # Load model
         self._load_model()
     
+    @property
+    def model(self):
+        """The underlying model object of the active backend (None if not loaded)."""
+        return self.backend.model if self.backend is not None else None
+
+    @property
+    def device(self):
+        return self.backend.device if self.backend is not None else None
+
     def _load_model(self):
-        """Load the trained model."""
+        """Load the trained model into the configured backend."""
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(
                 f"Model file not found at {self.model_path}\n"
@@ -140,48 +117,67 @@ class IssueClassifier:
             )
         
         try:
-            # Always load as state_dict and build the training-matched architecture
-            try:
-                state_dict = torch.load(self.model_path, map_location=self.device)
-            except Exception as e:
-                raise RuntimeError(f"Failed to read model file: {e}")
-
-            load_errors = []
-
-            # 1) Try UrbanMobileNet (training-time architecture) with strict load
-            try:
-                model_candidate = UrbanMobileNet(num_classes=self.num_classes)
-                # First attempt: allow non-strict to ignore CBAM-specific keys from training
-                missing_keys, unexpected_keys = model_candidate.load_state_dict(state_dict, strict=False)
-                self.model = model_candidate
-                print(f"[OK] Weights loaded into UrbanMobileNet (non-strict) from {self.model_path}")
-                if missing_keys or unexpected_keys:
-                    print(f"[WARN] Load mismatches: missing={len(missing_keys)} unexpected={len(unexpected_keys)}")
-            except Exception as e_urban_strict:
-                load_errors.append(f"UrbanMobileNet load: {e_urban_strict}")
-                self.model = None
-
-            # 2) If still not loaded, raise detailed error
-            if self.model is None:
-                raise RuntimeError(" | ".join(load_errors))
-            
-            self.model.to(self.device)
-            self.model.eval()  # Set to evaluation mode
-            print(f"[OK] Model ready for inference on device: {self.device}")
+            self.backend = create_backend(
+                self.backend_name,
+                self.model_path,
+                self.num_classes,
+                device=self.requested_device,
+                quantization=self.quantization,
+                calibration_dir=self.calibration_dir,
+                preprocess=self.preprocess
+            )
+            self.quantization = getattr(self.backend, 'quantization', 'none')
+            print(f"[OK] Model ready for inference on device: {self.device} (backend={self.backend_name})")
             
         except Exception as e:
+            self.backend = None
             raise RuntimeError(
                 f"Failed to load model from {self.model_path}\n"
                 f"Error: {e}\n"
                 f"Please ensure the model file is valid and matches the architecture."
             )
     
+    def preprocess(self, image_data):
+        """Convert one input image into a normalized float32 (3, 224, 224) array."""
+        return preprocess_image(image_data)
+
+    def _batch_buffer(self, size):
+        """Return this thread's preallocated input buffer, grown to `size` rows if needed."""
+        buffer = getattr(self._buffers, 'batch', None)
+        if buffer is None or buffer.shape[0] < size:
+            buffer = allocate_batch(size)
+            self._buffers.batch = buffer
+        return buffer
+
+    def _predict(self, batch):
+        """
+        Run one forward pass over a preprocessed float32 (N, 3, 224, 224) array.
+
+        Returns:
+            list of {'issue_type', 'confidence'} dicts, one per row, in order.
+        """
+        with metrics.stage('model_forward'):
+            logits = self.backend.run(batch)
+        probs = softmax(logits)
+        pred_idx = probs.argmax(axis=1)
+        confidence = probs[np.arange(len(pred_idx)), pred_idx]
+
+        return [
+            {
+                'issue_type': self.class_names[int(idx)],
+                'confidence': float(score)
+            }
+            for idx, score in zip(pred_idx, confidence)
+        ]
+
     def classify_issue(self, image_data):
         """
         Classify an image into one of the issue categories.
         
         Args:
-            image_data: numpy array or PIL Image of the uploaded image
+            image_data: encoded image bytes, PIL Image or numpy array of the
+                        uploaded image. Passing bytes (or an unloaded PIL
+                        JPEG) lets preprocessing decode at reduced scale.
             
         Returns:
             dict: {
@@ -189,43 +185,53 @@ class IssueClassifier:
                 'confidence': float  # Confidence score (0-1)
             }
         """
-        if self.model is None:
+        if self.backend is None:
             raise RuntimeError("Model not loaded. Please ensure best_model.pth exists in backend directory.")
         
         try:
-            # Convert numpy array to PIL Image if needed
-            if isinstance(image_data, np.ndarray):
-                # Handle different numpy array formats
-                if image_data.dtype != np.uint8:
-                    image_data = (image_data * 255).astype(np.uint8)
-                image = Image.fromarray(image_data).convert('RGB')
-            elif isinstance(image_data, Image.Image):
-                image = image_data.convert('RGB')
-            else:
-                raise ValueError(f"Unsupported image type: {type(image_data)}")
-            
             # Preprocess image
-            image_tensor = self.transform(image).unsqueeze(0)  # Add batch dimension
-            image_tensor = image_tensor.to(self.device)
+            with metrics.stage('preprocess'):
+                batch = self.preprocess(image_data)[np.newaxis]  # Add batch dimension
             
             # Run inference
-            with torch.no_grad():
-                outputs = self.model(image_tensor)
-                probs = F.softmax(outputs, dim=1)
-                confidence, pred_idx = torch.max(probs, dim=1)
-            
-            # Get predicted class and confidence
-            predicted_idx = pred_idx.item()
-            predicted_type = self.class_names[predicted_idx]
-            confidence_score = confidence.item()
-            
-            return {
-                'issue_type': predicted_type,
-                'confidence': confidence_score
-            }
+            return self._predict(batch)[0]
             
         except Exception as e:
             print(f"Error during classification: {e}")
             raise RuntimeError(f"Classification failed: {e}")
 
+    def classify_batch(self, images, batch_size=32):
+        """
+        Classify several images with one forward pass per chunk.
 
+        The images are preprocessed individually and stacked into a single
+        (N, 3, 224, 224) batch, so N images cost one model call instead of N.
+        
+        Args:
+            images: list of encoded image bytes, PIL Images or numpy arrays
+            batch_size: maximum number of images per forward pass, bounds
+                        peak memory for very large requests
+            
+        Returns:
+            list of dicts with the same shape as classify_issue(), in the
+            same order as the input images
+        """
+        if self.backend is None:
+            raise RuntimeError("Model not loaded. Please ensure best_model.pth exists in backend directory.")
+
+        if not images:
+            return []
+
+        try:
+            results = []
+            buffer = self._batch_buffer(min(batch_size, len(images)))
+            for start in range(0, len(images), batch_size):
+                chunk = images[start:start + batch_size]
+                with metrics.stage('preprocess'):
+                    batch = preprocess_batch(chunk, out=buffer)
+                results.extend(self._predict(batch))
+            return results
+
+        except Exception as e:
+            print(f"Error during batch classification: {e}")
+            raise RuntimeError(f"Batch classification failed: {e}")
@@ -0,0 +1,137 @@
+"""
+Content-addressed cache of classifier predictions.
+
+Entries are keyed by the SHA-256 of the encoded image bytes, scoped to a model
+identity (e.g. the path, size and mtime of the weights file). The cache is
+bounded (LRU eviction), entries expire after a TTL, and the whole cache is
+dropped automatically as soon as the model identity changes, so replacing the
+weights at MODEL_PATH can never serve stale predictions.
+
+Has no torch dependency, so the backend can use it in front of its remote
+classifier call as well.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def image_digest(image_bytes):
+    """Hex SHA-256 of encoded image bytes (bytes, bytearray or memoryview)."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def file_fingerprint(path):
+    """Identity of a weights file: absolute path, size and modification time."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return f"{os.path.abspath(path)}:missing"
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of prediction dicts.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, identity=None, identity_check_interval=5.0):
+        """
+        Args:
+            max_entries: maximum number of cached predictions (LRU beyond that)
+            ttl_seconds: lifetime of an entry; <= 0 disables expiry
+            identity: callable returning the current model identity string, or
+                      a fixed string. Checked at most every
+                      `identity_check_interval` seconds; a change clears the cache.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1, got {max_entries}")
+
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._identity_fn = identity if callable(identity) else (lambda: identity)
+        self._identity_check_interval = identity_check_interval
+        self._identity = self._identity_fn()
+        self._identity_checked_at = time.monotonic()
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_identity(self, now):
+        """Clear the cache if the model identity changed. Caller holds the lock."""
+        if now - self._identity_checked_at < self._identity_check_interval:
+            return
+        self._identity_checked_at = now
+        identity = self._identity_fn()
+        if identity != self._identity:
+            self._identity = identity
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, digest):
+        """Return the cached prediction for `digest`, or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._check_identity(now)
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and now >= expires_at:
+                del self._entries[digest]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, digest, prediction):
+        """Store a prediction dict for `digest`."""
+        now = time.monotonic()
+        expires_at = now + self.ttl if self.ttl and self.ttl > 0 else None
+        with self._lock:
+            self._check_identity(now)
+            self._entries[digest] = (dict(prediction), expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, image_bytes, compute):
+        """Return the cached prediction for `image_bytes`, else compute() and cache it."""
+        digest = image_digest(image_bytes)
+        cached = self.get(digest)
+        if cached is not None:
+            return cached
+        prediction = compute()
+        self.put(digest, prediction)
+        return prediction
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'model_identity': self._identity,
+            }
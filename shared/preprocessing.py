@@ -0,0 +1,117 @@
+"""
+Fast image preprocessing for the issue classifier.
+
+The old path decoded the full-resolution photo, copied it into a numpy array,
+copied it back into a PIL image and let torchvision allocate a new buffer for
+Resize, ToTensor and Normalize each. For 12MP phone photos this dominated the
+request time. This module instead:
+
+- decodes JPEGs at reduced scale with PIL's draft mode (DCT scaling), so a
+  4000x3000 photo is decoded at ~500x375 before any pixel is touched
+- resizes exactly once, straight to 224x224
+- normalizes with a per-channel uint8 -> float32 lookup table, written directly
+  into a caller-provided (preallocated) batch buffer
+- accepts raw bytes, file objects, PIL images or numpy arrays, so callers never
+  need a numpy round-trip
+
+Output is numerically the same as Resize((224, 224)) + ToTensor() +
+Normalize(mean, std) applied to the same decoded image.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+INPUT_SIZE = 224
+NORMALIZE_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+NORMALIZE_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# NORMALIZE_LUT[c, v] == (v / 255 - mean[c]) / std[c] for every uint8 value v
+NORMALIZE_LUT = (
+    (np.arange(256, dtype=np.float32)[np.newaxis, :] / 255.0 - NORMALIZE_MEAN[:, np.newaxis])
+    / NORMALIZE_STD[:, np.newaxis]
+).astype(np.float32)
+
+
+def open_image(source, target_size=INPUT_SIZE):
+    """
+    Open `source` as an RGB PIL image, decoding JPEGs at the smallest DCT scale
+    that still covers `target_size` x `target_size`.
+
+    Args:
+        source: bytes/bytearray/memoryview of an encoded image, a binary file
+                object, a PIL Image or a numpy array (HWC, uint8 or float 0-1)
+        target_size: edge length the image will be resized to afterwards
+
+    Raises:
+        ValueError: for unsupported source types
+        PIL.UnidentifiedImageError / OSError: for undecodable bytes
+    """
+    if isinstance(source, Image.Image):
+        image = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(source))
+    elif isinstance(source, np.ndarray):
+        if source.dtype != np.uint8:
+            source = (source * 255).astype(np.uint8)
+        return Image.fromarray(source).convert('RGB')
+    elif hasattr(source, 'read'):
+        image = Image.open(source)
+    else:
+        raise ValueError(f"Unsupported image type: {type(source)}")
+
+    if image.format == 'JPEG':
+        # No-op once the image has been loaded; otherwise picks a 1/2, 1/4 or
+        # 1/8 scale decode that stays >= target_size on both edges.
+        image.draft('RGB', (target_size, target_size))
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def preprocess_into(source, out):
+    """
+    Decode, resize and normalize one image into `out`, a float32 (3, 224, 224) view.
+
+    Returns `out`.
+    """
+    image = open_image(source, INPUT_SIZE)
+    if image.size != (INPUT_SIZE, INPUT_SIZE):
+        image = image.resize((INPUT_SIZE, INPUT_SIZE), Image.BILINEAR)
+    pixels = np.asarray(image)  # (224, 224, 3) uint8
+    for channel in range(3):
+        np.take(NORMALIZE_LUT[channel], pixels[:, :, channel], out=out[channel])
+    return out
+
+
+def preprocess_image(source):
+    """Preprocess one image into a new float32 (3, 224, 224) array."""
+    out = np.empty((3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    return preprocess_into(source, out)
+
+
+def allocate_batch(size):
+    """Allocate an uninitialized float32 (size, 3, 224, 224) input buffer."""
+    return np.empty((size, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+
+
+def preprocess_batch(sources, out=None):
+    """
+    Preprocess several images into one contiguous (N, 3, 224, 224) batch.
+
+    Args:
+        sources: list of images accepted by open_image()
+        out: optional preallocated buffer with at least len(sources) rows;
+             the returned array is a view of its first len(sources) rows
+
+    Returns:
+        float32 array of shape (len(sources), 3, 224, 224)
+    """
+    if out is None or out.shape[0] < len(sources):
+        out = allocate_batch(len(sources))
+    batch = out[:len(sources)]
+    for index, source in enumerate(sources):
+        preprocess_into(source, batch[index])
+    return batch
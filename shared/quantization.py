@@ -0,0 +1,247 @@
+"""
+INT8 post-training quantization for UrbanMobileNet on CPU-only hosts.
+
+Modes (selected with MODEL_QUANTIZATION, see IssueClassifier):
+- 'none':    serve the fp32 model unchanged
+- 'dynamic': dynamic INT8 quantization of the Linear(576->1024) / Linear(1024->n)
+             classifier head; no calibration data needed
+- 'static':  static INT8 quantization of the mobilenet_v3_small features
+             (FX graph mode, calibrated on a small image set) plus the dynamic
+             head. Falls back to 'dynamic' if calibration data is missing or
+             the features cannot be traced/converted.
+
+Run `python -m shared.quantization --model-path ... --images ...` to compare
+accuracy, agreement and latency of each mode against fp32. Static mode is
+always calibrated on images that are not in the evaluation set.
+"""
+
+import argparse
+import copy
+import io
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+
+QUANTIZATION_MODES = ('none', 'dynamic', 'static')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def _select_engine():
+    """Pick the best available quantized kernel backend for this CPU."""
+    engines = torch.backends.quantized.supported_engines
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError(f"No quantized engine available (supported: {engines})")
+
+
+def quantize_dynamic_head(model):
+    """Return a copy of `model` whose Linear layers run as dynamic INT8."""
+    _select_engine()
+    model = copy.deepcopy(model).cpu().eval()
+    model.classifier = torch.ao.quantization.quantize_dynamic(
+        model.classifier, {nn.Linear}, dtype=torch.qint8
+    )
+    return model
+
+
+def quantize_static(model, calibration_batches):
+    """
+    Return a copy of `model` with statically quantized features and a dynamic
+    INT8 head.
+
+    Args:
+        model: fp32 UrbanMobileNet in eval mode
+        calibration_batches: iterable of preprocessed (N, 3, 224, 224) tensors
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = _select_engine()
+    model = copy.deepcopy(model).cpu().eval()
+
+    example_inputs = (torch.randn(1, 3, 224, 224),)
+    prepared = prepare_fx(model.features, get_default_qconfig_mapping(engine), example_inputs)
+
+    seen = 0
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+            seen += batch.size(0)
+    if seen == 0:
+        raise ValueError("Static quantization needs at least one calibration image")
+
+    model.features = convert_fx(prepared)
+    model.classifier = torch.ao.quantization.quantize_dynamic(
+        model.classifier, {nn.Linear}, dtype=torch.qint8
+    )
+    return model
+
+
+def list_images(directory, limit=None):
+    """Return image paths under `directory` (recursively), sorted for reproducibility."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    paths.sort()
+    return paths[:limit] if limit else paths
+
+
+def load_image_batches(paths, preprocess, batch_size=8):
+    """Load `paths` as preprocessed (N, 3, 224, 224) tensor batches."""
+    batches = []
+    for start in range(0, len(paths), batch_size):
+        arrays = [preprocess(Image.open(p).convert('RGB')) for p in paths[start:start + batch_size]]
+        batches.append(torch.from_numpy(np.stack(arrays)))
+    return batches
+
+
+def quantize_model(model, mode, preprocess=None, calibration_dir=None, calibration_size=64,
+                   calibration_paths=None):
+    """
+    Apply the requested quantization mode to a loaded fp32 model.
+
+    `preprocess` maps a PIL image to a normalized float32 (3, 224, 224) array
+    and is only needed for static calibration, which reads its images from
+    `calibration_paths` if given, else from `calibration_dir`.
+
+    Returns:
+        (model, effective_mode) - effective_mode differs from `mode` when
+        static quantization was not possible and the dynamic head was used.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"MODEL_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {mode!r}")
+
+    if mode == 'none':
+        return model, 'none'
+
+    if mode == 'static':
+        if not calibration_paths and (not calibration_dir or not os.path.isdir(calibration_dir)):
+            print(f"[WARN] Static quantization needs a calibration directory (got {calibration_dir!r}); using dynamic head quantization")
+        else:
+            try:
+                paths = calibration_paths[:calibration_size] if calibration_paths else \
+                    list_images(calibration_dir, limit=calibration_size)
+                batches = load_image_batches(paths, preprocess)
+                return quantize_static(model, batches), 'static'
+            except Exception as e:
+                print(f"[WARN] Static quantization failed ({e}); using dynamic head quantization")
+
+    return quantize_dynamic_head(model), 'dynamic'
+
+
+def model_size_bytes(model):
+    """Serialized size of a model's state_dict, a proxy for resident size."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _benchmark(model, batches, warmup=2):
+    """Return (predictions, mean_ms_per_image)."""
+    preds = []
+    with torch.no_grad():
+        for batch in batches[:warmup]:
+            model(batch[:1])
+        elapsed = 0.0
+        images = 0
+        for batch in batches:
+            for i in range(batch.size(0)):
+                start = time.perf_counter()
+                out = model(batch[i:i + 1])
+                elapsed += time.perf_counter() - start
+                images += 1
+                preds.append(int(out.argmax(dim=1).item()))
+    return preds, (elapsed / images * 1000.0) if images else 0.0
+
+
+def split_calibration(paths, calibration_size=64, every=4):
+    """
+    Split sorted image paths into disjoint (calibration, evaluation) lists:
+    every `every`-th image (so each class folder contributes) up to
+    `calibration_size` goes to calibration, the rest to evaluation.
+    """
+    calibration = paths[::every][:calibration_size]
+    chosen = set(calibration)
+    return calibration, [p for p in paths if p not in chosen]
+
+
+def compare(model_path, images_dir, num_classes=6, calibration_dir=None, limit=200, calibration_size=64):
+    """
+    Compare every quantization mode against fp32 on the images in `images_dir`.
+
+    If images are stored in per-class subfolders named after CLASS_NAMES, top-1
+    accuracy is reported in addition to agreement with the fp32 prediction.
+    Static mode is calibrated on `calibration_dir` (minus any image that is
+    also evaluated) or, without one, on a held-out slice of `images_dir` that
+    is then left out of the evaluation.
+    """
+    from shared.model_inference import IssueClassifier
+
+    reference = IssueClassifier(model_path=model_path, num_classes=num_classes, device='cpu')
+    preprocess = reference.preprocess
+
+    if calibration_dir:
+        paths = list_images(images_dir, limit=limit)
+        evaluated = {os.path.realpath(p) for p in paths}
+        calibration_paths = [p for p in list_images(calibration_dir) if os.path.realpath(p) not in evaluated]
+        calibration_source = f"{calibration_dir} ({len(calibration_paths[:calibration_size])} images not in the eval set)"
+    else:
+        calibration_paths, paths = split_calibration(list_images(images_dir), calibration_size)
+        paths = paths[:limit] if limit else paths
+        calibration_source = f"{len(calibration_paths)} images held out of {images_dir}"
+    if not paths:
+        raise SystemExit(f"No images found under {images_dir}")
+
+    labels = []
+    for p in paths:
+        parent = os.path.basename(os.path.dirname(p))
+        labels.append(reference.class_names.index(parent) if parent in reference.class_names else None)
+    labelled = all(label is not None for label in labels)
+
+    batches = load_image_batches(paths, preprocess)
+
+    fp32_preds, fp32_ms = _benchmark(reference.model, batches)
+    rows = [('fp32', fp32_preds, fp32_ms, model_size_bytes(reference.model))]
+
+    for mode in ('dynamic', 'static'):
+        quantized, effective = quantize_model(
+            reference.model, mode, preprocess=preprocess, calibration_size=calibration_size,
+            calibration_paths=calibration_paths
+        )
+        if effective != mode:
+            continue
+        preds, ms = _benchmark(quantized, batches)
+        rows.append((mode, preds, ms, model_size_bytes(quantized)))
+
+    print(f"Images: {len(paths)}  labelled: {labelled}")
+    print(f"Static calibration: {calibration_source}")
+    print(f"{'mode':<8} {'agree%':>8} {'acc%':>8} {'ms/img':>8} {'size MB':>8}")
+    for mode, preds, ms, size in rows:
+        agree = 100.0 * sum(a == b for a, b in zip(preds, fp32_preds)) / len(preds)
+        acc = (100.0 * sum(p == y for p, y in zip(preds, labels)) / len(preds)) if labelled else float('nan')
+        print(f"{mode:<8} {agree:>8.2f} {acc:>8.2f} {ms:>8.2f} {size / 1e6:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare INT8 quantized UrbanMobileNet against fp32.")
+    parser.add_argument('--model-path', default=os.getenv('MODEL_PATH', 'backend/best_model.pth'))
+    parser.add_argument('--num-classes', type=int, default=int(os.getenv('MODEL_NUM_CLASSES', '6')))
+    parser.add_argument('--images', required=True, help="Evaluation images (optionally in per-class subfolders)")
+    parser.add_argument('--calibration-dir', default=None,
+                        help="Calibration images for static mode (default: a held-out slice of --images)")
+    parser.add_argument('--calibration-size', type=int, default=64)
+    parser.add_argument('--limit', type=int, default=200)
+    args = parser.parse_args()
+    compare(args.model_path, args.images, args.num_classes, args.calibration_dir, args.limit, args.calibration_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""Make the repo root (`shared`) and `backend/` importable, as the services do."""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'backend')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,90 @@
+"""
+The exported ONNX / TorchScript models, served through their backends, must
+match eager PyTorch: same logits and softmax within tolerance, same top-1.
+"""
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchvision')
+
+from shared.export import export_onnx, export_torchscript, sample_images  # noqa: E402
+from shared.inference_backends import create_backend  # noqa: E402
+from shared.model_architecture import UrbanMobileNet  # noqa: E402
+from shared.model_inference import IssueClassifier, preprocess_batch, softmax  # noqa: E402
+
+NUM_CLASSES = 6
+
+
+def require_onnx():
+    """Skip unless onnxruntime (serving) and onnx (export) both import cleanly."""
+    for module in ('onnxruntime', 'onnx'):
+        try:
+            __import__(module)
+        except Exception as exc:  # missing, or e.g. a protobuf version clash
+            pytest.skip(f'{module} unavailable: {exc}')
+
+
+@pytest.fixture(scope='module')
+def artifacts(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp('models')
+    torch.manual_seed(0)
+    model = UrbanMobileNet(num_classes=NUM_CLASSES).eval()
+    # Non-trivial BatchNorm statistics, so the exports are not checked on identities only
+    with torch.no_grad():
+        for module in model.modules():
+            if isinstance(module, torch.nn.BatchNorm2d):
+                module.running_mean.uniform_(-0.1, 0.1)
+                module.running_var.uniform_(0.5, 1.5)
+    weights = str(out_dir / 'model.pth')
+    torch.save(model.state_dict(), weights)
+    return {
+        'model': model,
+        'torch': weights,
+        'torchscript': export_torchscript(model, str(out_dir / 'model.pt')),
+        'onnx': str(out_dir / 'model.onnx'),
+    }
+
+
+@pytest.fixture(scope='module')
+def batch():
+    return preprocess_batch(sample_images(count=6))
+
+
+def reference_logits(artifacts, batch):
+    backend = create_backend('torch', artifacts['torch'], NUM_CLASSES, device='cpu')
+    return backend.run(batch)
+
+
+def assert_matches(logits, expected):
+    assert logits.shape == expected.shape
+    np.testing.assert_allclose(logits, expected, rtol=1e-3, atol=1e-4)
+    np.testing.assert_allclose(softmax(logits), softmax(expected), atol=1e-5)
+    assert (logits.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_torchscript_backend_matches_torch(artifacts, batch):
+    backend = create_backend('torchscript', artifacts['torchscript'], NUM_CLASSES, device='cpu')
+    assert_matches(backend.run(batch), reference_logits(artifacts, batch))
+
+
+def test_onnx_backend_matches_torch(artifacts, batch):
+    require_onnx()
+    path = export_onnx(artifacts['model'], artifacts['onnx'])
+    backend = create_backend('onnx', path, NUM_CLASSES)
+    assert_matches(backend.run(batch), reference_logits(artifacts, batch))
+    # Dynamic batch axis: a single image gives the same row as in the batch
+    assert_matches(backend.run(batch[:1]), reference_logits(artifacts, batch[:1]))
+
+
+@pytest.mark.parametrize('name', ['torchscript', 'onnx'])
+def test_classifier_results_match_across_backends(artifacts, name):
+    if name == 'onnx':
+        require_onnx()
+        export_onnx(artifacts['model'], artifacts['onnx'])
+    images = sample_images(count=4)
+    expected = IssueClassifier(artifacts['torch'], NUM_CLASSES, device='cpu', backend='torch').classify_batch(images)
+    results = IssueClassifier(artifacts[name], NUM_CLASSES, device='cpu', backend=name).classify_batch(images)
+    assert [r['issue_type'] for r in results] == [r['issue_type'] for r in expected]
+    np.testing.assert_allclose([r['confidence'] for r in results], [r['confidence'] for r in expected], atol=1e-5)
@@ -0,0 +1,156 @@
+"""ClassifierClient and its circuit breaker against the local fake classifier Space."""
+
+import pytest
+
+import classifier_client
+from classifier_client import CircuitBreaker, ClassifierClient, ClassifierUnavailable
+from fake_classifier import FakeClassifierServer
+
+IMAGE = b'\xff\xd8fake-jpeg-bytes'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(classifier_client.time, 'monotonic', clock)
+    return clock
+
+
+def make_client(fake, **kwargs):
+    kwargs.setdefault('backoff_base', 0.0)
+    kwargs.setdefault('read_timeout', 2.0)
+    return ClassifierClient(fake.url, **kwargs)
+
+
+def paths(fake):
+    return [path for path, _, _ in fake.requests]
+
+
+# --- CircuitBreaker ------------------------------------------------------
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(30)
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == 'half_open'
+    assert breaker.allow()          # the probe
+    assert not breaker.allow()      # everyone else waits for it
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.retry_after() == pytest.approx(30)
+    assert not breaker.allow()
+
+
+# --- ClassifierClient ----------------------------------------------------
+
+def test_success():
+    with FakeClassifierServer() as fake:
+        client = make_client(fake)
+        assert client.predict_bytes(IMAGE, 'image/jpeg') == fake.prediction
+        assert client.predict_base64('aGVsbG8=') == fake.prediction
+    assert paths(fake) == ['/predict/upload', '/predict']
+    assert fake.requests[0][1:] == ('image/jpeg', len(IMAGE))
+    stats = client.stats()
+    assert stats['calls'] == 2 and stats['errors'] == 0 and stats['circuit_state'] == 'closed'
+
+
+def test_retryable_503_is_retried_until_success():
+    with FakeClassifierServer(fail_times=2, fail_status=503) as fake:
+        client = make_client(fake, max_retries=2)
+        assert client.predict_bytes(IMAGE) == fake.prediction
+    assert len(fake.requests) == 3
+    stats = client.stats()
+    assert stats['retries'] == 2 and stats['errors'] == 2 and stats['circuit_state'] == 'closed'
+
+
+def test_retries_exhausted_raises_unavailable():
+    with FakeClassifierServer(fail_times=10, fail_status=503) as fake:
+        client = make_client(fake, max_retries=1)
+        with pytest.raises(ClassifierUnavailable, match='503'):
+            client.predict_bytes(IMAGE)
+    assert len(fake.requests) == 2
+
+
+def test_non_retryable_error_is_not_retried_and_keeps_circuit_closed():
+    with FakeClassifierServer(fail_times=10, fail_status=400) as fake:
+        client = make_client(fake, max_retries=2, failure_threshold=1)
+        with pytest.raises(RuntimeError, match='400'):
+            client.predict_bytes(IMAGE)
+    assert len(fake.requests) == 1
+    assert client.breaker.state == 'closed'
+
+
+def test_read_timeout_is_not_retried():
+    with FakeClassifierServer(delay=0.5) as fake:
+        client = make_client(fake, read_timeout=0.1, max_retries=3)
+        with pytest.raises(ClassifierUnavailable, match='timed out'):
+            client.predict_bytes(IMAGE)
+        assert len(fake.requests) == 1
+
+
+def test_open_circuit_short_circuits_without_calling_the_space():
+    with FakeClassifierServer(fail_times=100, fail_status=503) as fake:
+        client = make_client(fake, max_retries=0, failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with pytest.raises(ClassifierUnavailable):
+                client.predict_bytes(IMAGE)
+        assert client.breaker.state == 'open'
+        with pytest.raises(ClassifierUnavailable, match='circuit is open'):
+            client.predict_bytes(IMAGE)
+        assert len(fake.requests) == 2
+    assert client.stats()['short_circuited'] == 1
+
+
+def test_probe_after_reset_timeout_closes_circuit(clock):
+    with FakeClassifierServer(fail_times=1, fail_status=503) as fake:
+        client = make_client(fake, max_retries=0, failure_threshold=1, reset_timeout=30)
+        with pytest.raises(ClassifierUnavailable):
+            client.predict_bytes(IMAGE)
+        clock.now += 30
+        assert client.predict_bytes(IMAGE) == fake.prediction
+    assert client.breaker.state == 'closed'
+
+
+@pytest.mark.parametrize('status', [404, 405])
+def test_missing_upload_endpoint_falls_back_to_base64(status):
+    with FakeClassifierServer(upload_endpoint=False, missing_upload_status=status) as fake:
+        client = make_client(fake)
+        assert client.predict_bytes(IMAGE) == fake.prediction
+    assert paths(fake) == ['/predict/upload', '/predict']
+    assert client.breaker.state == 'closed'
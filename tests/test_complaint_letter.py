@@ -0,0 +1,276 @@
+"""
+Golden check: render_complaint_letter must match, character for character, the
+generate_formal_complaint it replaced, over every issue type and priority,
+with and without coordinates, addresses with and without a recognizable state,
+brackets and blank lines in user text, ...
+
+legacy_generate_formal_complaint below is that function as it was (only its
+nested-quote f-string expressions are hoisted so it runs on Python < 3.12);
+benchmarks/bench_letter.py times it against the current renderer.
+"""
+
+import itertools
+import re
+from datetime import datetime
+
+from complaint_letter import DEFAULT_DESCRIPTIONS, render_complaint_letter
+
+NOW = datetime(2024, 3, 9, 14, 30)
+
+
+def legacy_generate_formal_complaint(issue_type, description, location, latitude=None, longitude=None, priority='normal', department=None, user_id='anonymous', now=None):
+    """
+    Generate a professional, formal complaint letter with actual details.
+    Uses 100% template-based approach - NO placeholders, all actual data.
+
+    Args:
+        issue_type: Type of issue (e.g., 'potholes')
+        description: User description of the issue
+        location: Full address
+        latitude: GPS latitude
+        longitude: GPS longitude
+        priority: Priority level (low, normal, high, urgent)
+        department: Assigned department name
+        user_id: User identifier
+
+    Returns:
+        str: Complete complaint letter with no placeholders
+    """
+
+    # Format issue type for display
+    issue_type_display = issue_type.replace('_', ' ').title()
+
+    # Extract city and state from location if available
+    # Format: "Jajmau, Kanpur, Kanpur Nagar, Uttar Pradesh, 208015, India"
+    location_parts = [part.strip() for part in location.split(',')] if location else []
+
+    # Try to extract city and state from location parts
+    city = "Kanpur"  # Default
+    state = "Uttar Pradesh"  # Default
+
+    if len(location_parts) >= 4:
+        # Usually format: Area, City, District, State, Pincode, Country
+        for i, part in enumerate(location_parts):
+            # Check for common state names in India
+            state_names = ['Uttar Pradesh', 'Maharashtra', 'Karnataka', 'Gujarat', 'Rajasthan', 'Punjab',
+                          'West Bengal', 'Tamil Nadu', 'Andhra Pradesh', 'Madhya Pradesh', 'Bihar', 'Odisha',
+                          'Assam', 'Haryana', 'Kerala', 'Jharkhand', 'Chhattisgarh', 'Delhi',
+                          'Himachal Pradesh', 'Uttarakhand', 'Goa', 'Manipur', 'Meghalaya', 'Mizoram',
+                          'Nagaland', 'Sikkim', 'Tripura', 'Arunachal Pradesh', 'Telangana']
+            if any(state_name in part for state_name in state_names):
+                state = part
+                # City is usually the part before state
+                if i > 0:
+                    city = location_parts[i-1]
+                break
+
+    # Fallback: use index-based extraction
+    if city == "Kanpur" and len(location_parts) >= 2:
+        # Try to find city (usually second to last before pincode)
+        for i, part in enumerate(location_parts):
+            if part.lower() in ['kanpur', 'delhi', 'mumbai', 'bangalore', 'chennai', 'kolkata', 'hyderabad', 'pune', 'ahmedabad']:
+                city = part
+                break
+        if city == "Kanpur" and len(location_parts) >= 2:
+            city = location_parts[-3] if len(location_parts) >= 3 else location_parts[-2]
+
+    if state == "Uttar Pradesh" and len(location_parts) >= 2:
+        # Skip pincode and country, get state
+        for part in reversed(location_parts):
+            if not part.isdigit() and part.lower() not in ['india', 'indian']:
+                if any(s in part for s in ['Pradesh', 'Bengal', 'Nadu', 'Kerala', 'Gujarat', 'Rajasthan']):
+                    state = part
+                    break
+
+    # Format coordinates
+    coordinates_text = ""
+    if latitude and longitude:
+        coordinates_text = f"Latitude: {latitude:.6f}° N\nLongitude: {longitude:.6f}° E"
+
+    # Priority mapping
+    priority_map = {
+        'low': 'Low',
+        'normal': 'Normal',
+        'high': 'High',
+        'urgent': 'Urgent'
+    }
+    priority_display = priority_map.get(priority, 'Normal')
+
+    # Department name
+    dept_name = department
+
+    # Current date
+    current_date = (now or datetime.now()).strftime('%B %d, %Y')
+
+    # Build description text
+    if description:
+        description_text = description
+    else:
+        # Generate default description based on issue type
+        issue_descriptions = {
+            'potholes': f'The road surface in {location} has multiple potholes that are causing significant disruption to traffic flow and posing safety risks to vehicles and pedestrians.',
+            'damaged_signs': f'Traffic signs or road signs in {location} are damaged, missing, or illegible, which poses safety risks to motorists and pedestrians.',
+            'fallen_trees': f'Fallen trees or tree branches in {location} are blocking roads or pathways, creating obstacles and potential safety hazards.',
+            'garbage': f'Garbage and waste accumulation in {location} is causing health and environmental concerns, requiring immediate cleanup and waste management.',
+            'graffiti': f'Unauthorized graffiti and vandalism in {location} is affecting the aesthetic appearance of public spaces and may indicate security concerns.',
+            'illegal_parking': f'Illegal parking in {location} is obstructing traffic flow and creating safety hazards for vehicles and pedestrians.',
+            'street_light': f'Street lights in {location} are not functioning properly, creating safety concerns especially during nighttime hours.',
+            'water_leak': f'Water leaks in {location} are causing water wastage and potential damage to infrastructure and surrounding areas.',
+            'traffic_signal': f'Traffic signals in {location} are malfunctioning or not working, creating traffic congestion and safety risks.',
+            'sidewalk_damage': f'Sidewalk damage in {location} is creating hazards for pedestrians and requires immediate repair.',
+            'drainage': f'Drainage issues in {location} are causing water accumulation and potential flooding risks.',
+        }
+        description_text = issue_descriptions.get(issue_type, f'Civic infrastructure issue of type {issue_type_display.lower()} has been identified in {location} and requires immediate attention to ensure public safety.')
+
+    # (nested-quote f-string expressions hoisted so this runs before Python 3.12)
+    coordinates_line = '**Coordinates:**\n' + coordinates_text if coordinates_text else ''
+    gps_line = '- **GPS Coordinates:** ' + coordinates_text if coordinates_text else ''
+    captured_line = "- **Captured from user's device GPS**" if coordinates_text else ''
+
+    # Build complaint letter using template (NO placeholders - all actual data)
+    complaint_letter = f"""Nagrik Nivedan Platform
+Complaint Reference: {user_id}
+
+{current_date}
+
+To,
+The Municipal Commissioner,
+{city} Municipal Corporation,
+{city}, {state}, India.
+
+**Subject: Formal Complaint Regarding {issue_type_display} Issue in {location}**
+
+Dear Sir/Madam,
+
+This letter serves as a formal complaint regarding a {issue_type_display.lower()} issue that has been identified in {location} and requires immediate attention.
+
+**COMPLAINT DETAILS:**
+
+**Issue Type:** {issue_type_display} (AI-Identified)
+**Priority:** {priority_display} Priority
+**Location:** {location}
+{coordinates_line}
+**Date:** {current_date}
+**Assigned Department:** {dept_name}
+**Complaint ID:** {user_id}
+
+**DESCRIPTION:**
+
+{description_text}
+
+**LOCATION DETAILS:**
+
+- **Full Address:** {location}
+{gps_line}
+{captured_line}
+
+**URGENCY ASSESSMENT:**
+
+We consider this issue to be of **{priority_display.lower()} priority**. The condition of the {issue_type_display.lower()} in {location} requires attention to ensure public safety and maintain service standards. {'Given the ' + priority_display.lower() + ' priority level, we request immediate action to address this matter.' if priority in ['high', 'urgent'] else 'Prompt action is necessary to prevent further deterioration and ensure the safety of residents and commuters.'}
+
+**POTENTIAL SAFETY CONCERNS:**
+
+The presence of this {issue_type_display.lower()} issue presents several potential safety concerns, including:
+- Increased risk of accidents, particularly for vehicles and pedestrians
+- Potential damage to vehicles and infrastructure
+- Disruption to traffic flow and public safety
+- Risk of injury to residents and commuters
+
+**REQUEST FOR IMMEDIATE ACTION:**
+
+We respectfully request that the {dept_name} take immediate action to address this critical issue. Specifically, we request the following:
+
+1. **Immediate Inspection:** Conduct a thorough inspection of the location in {location} to assess the extent of the {issue_type_display.lower()} issue.
+
+2. **Assessment and Remediation:** Implement appropriate measures to resolve the {issue_type_display.lower()} issue and restore the area to a safe and usable condition.
+
+3. **Preventative Measures:** Explore and implement preventative measures to prevent the recurrence of similar issues in the future, such as improved maintenance and use of durable materials.
+
+4. **Status Updates:** Provide updates on the progress through our tracking system (Complaint ID: {user_id}).
+
+We believe that prompt action is essential to mitigate any risks associated with this issue and ensure the safety and well-being of the residents and commuters in {location}. We look forward to a timely response and a concrete plan of action to address this matter.
+
+Thank you for your attention to this important issue.
+
+Respectfully,
+
+Nagrik Nivedan Platform
+Complaint ID: {user_id}
+{current_date}"""
+
+    # Final cleanup - remove any remaining brackets or placeholder-like text (shouldn't be any, but just in case)
+    complaint_letter = re.sub(r'\[.*?\]', '', complaint_letter)
+    complaint_letter = re.sub(r'\n{3,}', '\n\n', complaint_letter)
+
+    return complaint_letter.strip()
+
+
+ADDRESSES = [
+    "Jajmau, Kanpur, Kanpur Nagar, Uttar Pradesh, 208015, India",
+    "Connaught Place, New Delhi, Delhi, 110001, India",
+    "MG Road, Bengaluru, Bangalore Urban, Karnataka, 560001, India",
+    "Salt Lake, Kolkata, North 24 Parganas, West Bengal, 700091, India",
+    "T Nagar, Chennai, Chennai District, Tamil Nadu, 600017, India",
+    "Kanpur, Kanpur Nagar, Uttar Pradesh, 208001, India",
+    "Sector 18, Noida, Gautam Buddha Nagar, 201301, India",
+    "Andheri East, Mumbai, 400069, India",
+    "Banjara Hills, Hyderabad",
+    "Pune, 411001",
+    "Some Street, Some Town, Himachal Pradesh Region, India",
+    "Kerala Bhavan, Kochi, Ernakulam, 682001, India",
+    "kanpur, uttar pradesh",
+    "Near Gate 2 [landmark], Lucknow, Lucknow District, Uttar Pradesh, 226001, India",
+    "Line one\n\n\nLine two, Indore, Madhya Pradesh, 452001, India",
+    "Address not found",
+    "Location not provided",
+    "  ,  , , ",
+    "India",
+    "",
+    None,
+]
+
+DESCRIPTIONS = [
+    None,
+    "",
+    "Large pothole near the bus stop, two scooters have already fallen.",
+    "Reported twice before [ref 12] and [ref 15] with no response.",
+    "Unclosed [bracket in the text",
+    "First paragraph.\n\n\n\nSecond paragraph after blank lines.\n",
+    "Curly {braces} and %s and {0} must pass through untouched.",
+]
+
+COORDINATES = [(26.4499, 80.3319), (0.0, 80.3319), (None, None), (-12.5, 0.000001)]
+PRIORITIES = ['low', 'normal', 'high', 'urgent', 'unknown']
+ISSUE_TYPES = sorted(DEFAULT_DESCRIPTIONS) + ['other', 'open_manhole']
+USER_IDS = ['anonymous', 'user-42', '-NxYz123[abc]']
+
+
+def golden_cases():
+    rows = itertools.product(ISSUE_TYPES, DESCRIPTIONS[:3], ADDRESSES, COORDINATES[:3], PRIORITIES[:4])
+    for index, (issue_type, description, location, (lat, lon), priority) in enumerate(rows):
+        yield dict(issue_type=issue_type, description=description, location=location, latitude=lat,
+                   longitude=lon, priority=priority, department='Public Works', user_id=USER_IDS[index % 3])
+    rows = itertools.product(DESCRIPTIONS, ADDRESSES, COORDINATES, PRIORITIES, USER_IDS)
+    for index, (description, location, (lat, lon), priority, user_id) in enumerate(rows):
+        yield dict(issue_type=ISSUE_TYPES[index % len(ISSUE_TYPES)], description=description,
+                   location=location, latitude=lat, longitude=lon, priority=priority,
+                   department='Sanitation Department' if index % 2 else 'Traffic Police', user_id=user_id)
+
+
+def describe_mismatch(kwargs, expected, actual):
+    for number, (old, new) in enumerate(itertools.zip_longest(expected.splitlines(), actual.splitlines()), 1):
+        if old != new:
+            return f"{kwargs!r}\n  line {number}:\n    legacy:  {old!r}\n    current: {new!r}"
+    return repr(kwargs)
+
+
+def test_letters_match_legacy_renderer():
+    cases = 0
+    mismatches = []
+    for kwargs in golden_cases():
+        cases += 1
+        expected = legacy_generate_formal_complaint(now=NOW, **kwargs)
+        actual = render_complaint_letter(now=NOW, **kwargs)
+        if actual != expected:
+            mismatches.append(describe_mismatch(kwargs, expected, actual))
+    assert not mismatches, f"{len(mismatches)}/{cases} golden letters differ, e.g.\n" + '\n'.join(mismatches[:3])
@@ -0,0 +1,184 @@
+"""
+ComplaintMirror liveness against a stand-in for firebase_admin's listener:
+events are delivered on the registration's own thread, keep-alives (null data)
+never reach the callback, and the thread exits when a reconnect fails.
+"""
+
+import queue
+import threading
+
+import pytest
+
+import complaint_mirror
+from complaint_mirror import ComplaintMirror
+
+STOP = object()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Event:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class Registration:
+    """Like db.ListenerRegistration: a thread feeding SSE events to the callback."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.events = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._listen, daemon=True)
+        self.thread.start()
+
+    def _listen(self):
+        while True:
+            event = self.events.get()
+            try:
+                if event is STOP:
+                    return
+                if event is not None:  # the SSE client returns None for null-data events
+                    self.callback(event)
+            finally:
+                self.events.task_done()
+
+    def send(self, event_type, path='/', data=None):
+        # keep-alive, cancel, ... carry data 'null' and are dropped before the callback
+        self.events.put(Event(event_type, path, data) if data is not None else None)
+        self.events.join()
+
+    def die(self):
+        """A reconnect that fails outright ends the listener thread."""
+        self.events.put(STOP)
+        self.thread.join(5)
+
+    def close(self):
+        self.closed = True
+        if self.thread.is_alive():
+            self.die()
+
+
+class Reference:
+    def __init__(self):
+        self.registrations = []
+        self.fail = False
+
+    def listen(self, callback):
+        if self.fail:
+            raise ConnectionError('listen failed')
+        self.registrations.append(Registration(callback))
+        return self.registrations[-1]
+
+    @property
+    def stream(self):
+        return self.registrations[-1]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(complaint_mirror.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def mirror(clock):
+    reference = Reference()
+    mirror = ComplaintMirror(lambda: reference, lambda complaint_id, payload: dict(payload, id=complaint_id),
+                             resync_interval=900)
+    mirror.reference = reference
+    mirror._connect()
+    reference.stream.send('put', '/', {'a': {'status': 'pending'}})
+    assert mirror.ready and mirror.connected()
+    yield mirror
+    mirror.stop()
+
+
+def test_quiet_stream_stays_ready(mirror, clock):
+    for _ in range(14):
+        clock.now += 60
+        mirror.reference.stream.send('keep-alive')
+        mirror._check()
+    assert mirror.ready and mirror.connected()
+    assert mirror.reconnects == 0 and mirror.last_error is None
+    assert len(mirror.reference.registrations) == 1
+
+
+def test_changes_are_applied(mirror):
+    mirror.reference.stream.send('patch', '/a', {'status': 'resolved'})
+    mirror.reference.stream.send('put', '/b', {'status': 'pending'})
+    assert mirror.get('a')['status'] == 'resolved'
+    assert mirror.get('b') is not None and len(mirror) == 2
+
+
+def test_sse_reconnect_resyncs_from_its_root_put(mirror):
+    mirror.reference.stream.send('put', '/', {'c': {'status': 'pending'}})
+    assert mirror.ready and mirror.resyncs == 2
+    assert mirror.get('a') is None and mirror.get('c') is not None
+    assert len(mirror.reference.registrations) == 1
+
+
+def test_dead_listener_thread_is_not_ready_and_reconnects(mirror):
+    mirror.reference.stream.die()
+    assert not mirror.connected()
+    mirror._check()
+    assert not mirror.ready
+    assert mirror.reconnects == 1 and mirror.last_error == 'Listener thread exited'
+    assert len(mirror.reference.registrations) == 2
+
+    mirror.reference.stream.send('put', '/', {'a': {'status': 'resolved'}})
+    assert mirror.ready and mirror.get('a')['status'] == 'resolved'
+
+
+def test_failed_listen_leaves_mirror_not_ready(mirror):
+    mirror.reference.stream.die()
+    mirror.reference.fail = True
+    mirror._check()
+    assert not mirror.ready and not mirror.connected()
+    assert 'listen failed' in mirror.last_error
+
+    mirror.reference.fail = False
+    mirror._check()
+    mirror.reference.stream.send('put', '/', {})
+    assert mirror.ready
+
+
+def test_periodic_resync_keeps_serving_until_the_new_snapshot(mirror, clock):
+    clock.now += 901
+    mirror._check()
+    assert len(mirror.reference.registrations) == 2
+    assert mirror.reference.registrations[0].closed
+    assert mirror.ready  # old snapshot still served while the new one is on its way
+
+    mirror.reference.stream.send('put', '/', {'a': {'status': 'resolved'}})
+    assert mirror.ready and mirror.get('a')['status'] == 'resolved'
+    clock.now += 600
+    mirror._check()
+    assert len(mirror.reference.registrations) == 2
+
+
+def test_resync_that_never_arrives_marks_not_ready(mirror, clock):
+    clock.now += 901
+    mirror._check()
+    assert mirror.ready
+    clock.now += 901
+    mirror._check()
+    assert not mirror.ready
+    assert len(mirror.reference.registrations) == 3
+
+
+def test_events_from_a_replaced_stream_are_ignored(mirror):
+    old = mirror.reference.stream
+    mirror.reference.stream.die()
+    mirror._check()
+    old.callback(Event('put', '/', {'stale': {'status': 'pending'}}))
+    assert mirror.get('stale') is None and not mirror.ready
@@ -0,0 +1,105 @@
+"""ReverseGeocoder: not-found versus lookups that could not be made."""
+
+import threading
+
+import pytest
+
+from geocoding import (
+    ADDRESS_NOT_FOUND, GeocodingProvider, GeocodingUnavailable, ReverseGeocoder, StaticProvider, TokenBucket,
+)
+
+
+class ScriptedProvider(GeocodingProvider):
+    """Answers from a list of results; an Exception instance is raised."""
+
+    name = 'scripted'
+
+    def __init__(self, *results, gate=None):
+        self.results = list(results)
+        self.gate = gate
+        self.calls = 0
+
+    def reverse(self, lat, lon):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_found_address_is_cached():
+    provider = StaticProvider({(28.6110, 77.2010): 'Connaught Place'})
+    geocoder = ReverseGeocoder(provider)
+    assert geocoder.lookup(28.61101, 77.20099) == 'Connaught Place'
+    assert geocoder.lookup(28.611, 77.201) == 'Connaught Place'
+    assert provider.calls == 1
+
+
+def test_cached_never_calls_the_provider():
+    provider = ScriptedProvider('Connaught Place')
+    geocoder = ReverseGeocoder(provider)
+    assert geocoder.cached(1, 2) is None
+    assert provider.calls == 0
+    geocoder.lookup(1, 2)
+    assert geocoder.cached(1, 2) == 'Connaught Place'
+    assert geocoder.cached('bad', 2) is None
+    assert provider.calls == 1
+
+
+def test_not_found_is_returned_and_not_cached():
+    provider = ScriptedProvider(None, 'Found later')
+    geocoder = ReverseGeocoder(provider)
+    assert geocoder.lookup(1, 2) == ADDRESS_NOT_FOUND
+    assert geocoder.lookup(1, 2) == 'Found later'
+
+
+def test_provider_error_raises_unavailable():
+    provider = ScriptedProvider(TimeoutError('read timed out'), 'Somewhere')
+    geocoder = ReverseGeocoder(provider)
+    with pytest.raises(GeocodingUnavailable, match='read timed out'):
+        geocoder.lookup(1, 2)
+    assert geocoder.counters['errors'] == 1
+    assert geocoder.lookup(1, 2) == 'Somewhere'
+
+
+def test_rate_limited_lookup_raises_unavailable():
+    provider = StaticProvider()
+    geocoder = ReverseGeocoder(provider, limiter=TokenBucket(rate=0.01, capacity=1), wait_timeout=0.05)
+    geocoder.lookup(1, 2)
+    with pytest.raises(GeocodingUnavailable, match='rate limit'):
+        geocoder.lookup(3, 4)
+    assert geocoder.counters['rate_limited'] == 1
+    assert provider.calls == 1
+
+
+def test_reverse_keeps_returning_not_found_when_unavailable():
+    geocoder = ReverseGeocoder(ScriptedProvider(RuntimeError('502')))
+    assert geocoder.reverse(1, 2) == ADDRESS_NOT_FOUND
+
+
+def test_coalesced_callers_share_the_failure():
+    gate = threading.Event()
+    provider = ScriptedProvider(ConnectionError('down'), gate=gate)
+    geocoder = ReverseGeocoder(provider)
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(geocoder.lookup(1, 2))
+        except GeocodingUnavailable as exc:
+            outcomes.append(type(exc))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if geocoder.counters['coalesced'] == 2:
+            break
+        threading.Event().wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert outcomes == [GeocodingUnavailable] * 3
+    assert provider.calls == 1
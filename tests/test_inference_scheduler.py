@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from shared.inference_scheduler import InferenceScheduler
+
+
+class PickyClassifier:
+    """classify_batch() fails for the whole batch if any image is 'bad'."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def classify_batch(self, images):
+        with self.lock:
+            self.calls.append(list(images))
+        if 'bad' in images:
+            raise RuntimeError('cannot decode image')
+        return [{'issue_type': image, 'confidence': 1.0} for image in images]
+
+
+def test_failed_batch_only_fails_the_bad_request():
+    classifier = PickyClassifier()
+    scheduler = InferenceScheduler(classifier, max_batch_size=8, max_wait_ms=200)
+    try:
+        futures = [scheduler.submit(image) for image in ('a', 'bad', 'c', 'd')]
+        assert futures[0].result(timeout=5) == {'issue_type': 'a', 'confidence': 1.0}
+        with pytest.raises(RuntimeError, match='cannot decode'):
+            futures[1].result(timeout=5)
+        assert [f.result(timeout=5)['issue_type'] for f in futures[2:]] == ['c', 'd']
+    finally:
+        scheduler.close(timeout=5)
+
+    assert classifier.calls[0] == ['a', 'bad', 'c', 'd']
+    assert classifier.calls[1:] == [['a'], ['bad'], ['c'], ['d']]
+    assert scheduler.stats()['failed_batches_retried'] == 1
+
+
+def test_healthy_batch_is_one_call():
+    classifier = PickyClassifier()
+    scheduler = InferenceScheduler(classifier, max_batch_size=3, max_wait_ms=200)
+    try:
+        futures = [scheduler.submit(image) for image in ('a', 'b', 'c')]
+        assert [f.result(timeout=5)['issue_type'] for f in futures] == ['a', 'b', 'c']
+    finally:
+        scheduler.close(timeout=5)
+    assert classifier.calls == [['a', 'b', 'c']]
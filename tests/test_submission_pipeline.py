@@ -0,0 +1,57 @@
+"""SubmissionPipeline retries and the recovery sweep for jobs an earlier process lost."""
+
+import threading
+
+from submission_pipeline import SubmissionPipeline
+
+
+def wait_for(event):
+    assert event.wait(5)
+
+
+def test_failed_job_is_retried_then_handed_to_on_failure():
+    attempts = []
+    failed = threading.Event()
+
+    def handler(job):
+        attempts.append(job['attempts'])
+        raise RuntimeError('firebase down')
+
+    pipeline = SubmissionPipeline(handler, workers=1, max_attempts=3, retry_backoff=0.01,
+                                  on_failure=lambda job, error: failed.set())
+    assert pipeline.submit({'id': 'a'})
+    wait_for(failed)
+    assert attempts == [1, 2, 3]
+    assert pipeline.stats()['failed'] == 1
+
+
+def test_recovered_jobs_are_queued_when_workers_start():
+    handled = []
+    done = threading.Event()
+    sweeps = []
+
+    def recover():
+        sweeps.append(1)
+        return [{'id': 'lost-1'}, {'id': 'lost-2'}] if len(sweeps) == 1 else []
+
+    def handler(job):
+        handled.append(job['id'])
+        if len(handled) == 2:
+            done.set()
+
+    pipeline = SubmissionPipeline(handler, workers=1, recover=recover, recover_interval=60)
+    pipeline.ensure_started()
+    wait_for(done)
+    assert sorted(handled) == ['lost-1', 'lost-2']
+    assert pipeline.stats()['recovered'] == 2
+
+
+def test_recovery_errors_do_not_stop_the_workers():
+    done = threading.Event()
+
+    def recover():
+        raise ConnectionError('firebase unreachable')
+
+    pipeline = SubmissionPipeline(lambda job: done.set(), workers=1, recover=recover, recover_interval=60)
+    assert pipeline.submit({'id': 'a'})
+    wait_for(done)